@@ -94,6 +94,10 @@ def create_app(config_name=None):
     app.register_blueprint(jobs_bp, url_prefix='/api/jobs')
     app.register_blueprint(cross_entity_bp, url_prefix='/api/cross-entity')
     app.register_blueprint(health_bp, url_prefix='/api')
+
+    # Warm the in-process payment package catalog
+    from app.services.package_catalog import package_catalog
+    package_catalog.warm()
     
     # Error handlers
     @app.errorhandler(404)
@@ -78,8 +78,11 @@ def add_performance_headers(response):
     """
     Add performance-related headers
     """
-    response.headers['Cache-Control'] = 'public, max-age=300'  # 5 minutes cache
-    response.headers['ETag'] = hashlib.md5(response.get_data()).hexdigest()
+    response.headers.setdefault('Cache-Control', 'public, max-age=300')  # 5 minutes cache
+    # File responses carry their own validators; hashing them here would read
+    # the whole file into the worker (or hash an empty X-Accel-Redirect body)
+    if not response.direct_passthrough and 'ETag' not in response.headers:
+        response.headers['ETag'] = hashlib.md5(response.get_data()).hexdigest()
     return response
 
 def log_performance():
@@ -1,7 +1,11 @@
 from app.firebase_init import db
+from app.services.employer_snapshot import refresh_employer_snapshot
 from datetime import datetime
 import bcrypt
 
+# User fields copied into the employer snapshot on job postings
+SNAPSHOT_USER_FIELDS = {'first_name', 'last_name', 'email', 'phone_number', 'profile_photo_url'}
+
 class BaseModel:
     """Base class to allow keyword argument initialization similar to SQLAlchemy"""
     def __init__(self, **kwargs):
@@ -71,6 +75,8 @@ class User(BaseModel):
         if hasattr(self, 'id'):
             self.updated_at = datetime.utcnow()
             db.collection('users').document(self.id).update(kwargs)
+            if getattr(self, 'user_type', None) == 'employer' and SNAPSHOT_USER_FIELDS.intersection(kwargs):
+                refresh_employer_snapshot(self.id)
         return True
     
     def get_full_profile_data(self):
@@ -1,6 +1,8 @@
 from flask import Blueprint, request, jsonify
 from app.services.auth_service import firebase_auth_required, admin_required
 from app.firebase_init import db
+from app.services.package_catalog import package_catalog
+from app.services.payment_stages import MAX_REPORT_DAYS, latency_report
 from app.utils.audit_log import write_audit_log, ACTION_USER_DEACTIVATED, ACTION_USER_ACTIVATED, ACTION_AGENCY_VERIFIED, ACTION_DATA_EXPORT
 from datetime import datetime, timedelta
 import json
@@ -35,7 +37,7 @@ def get_dashboard_stats():
         verified_agencies = sum(1 for a in agencies_ref if a.to_dict().get('verification_status') == 'verified')
         
         # Payment statistics
-        total_packages = len(list(db.collection('payment_packages').stream()))
+        total_packages = len(package_catalog.all())
         
         purchases_ref = list(db.collection('user_purchases').stream())
         total_purchases = len(purchases_ref)
@@ -531,3 +533,45 @@ def get_analytics():
         return jsonify({
             'error': 'Something went wrong. Please try again.'
         }), 500
+
+@admin_bp.route('/payment-packages/bump-version', methods=['POST'])
+@firebase_auth_required
+@admin_required
+def bump_payment_package_version():
+    """Force every worker to reload the payment package catalog"""
+    try:
+        admin_user = getattr(request, 'current_user', None)
+        admin_id = getattr(admin_user, 'id', 'unknown_admin')
+        version = package_catalog.bump_version(updated_by=admin_id)
+        logger.info(f'Payment package catalog bumped to version {version} by {admin_id}')
+        return jsonify({
+            'message': 'Payment package catalog refreshed',
+            'version': version,
+            'packages': len(package_catalog.all())
+        }), 200
+    except Exception as e:
+        logger.error(f'Error: {str(e)}')
+        return jsonify({
+            'error': 'Something went wrong. Please try again.'
+        }), 500
+
+@admin_bp.route('/payments/latency-report', methods=['GET'])
+@firebase_auth_required
+@admin_required
+def get_payment_latency_report():
+    """Per-day p50/p95/p99 of each payment stage interval, in seconds"""
+    try:
+        days = int(request.args.get('days', 7))
+        if days < 1 or days > MAX_REPORT_DAYS:
+            return jsonify({'error': f'days must be between 1 and {MAX_REPORT_DAYS}'}), 400
+
+        return jsonify({
+            'days': days,
+            'unit': 'seconds',
+            'report': latency_report(days)
+        }), 200
+    except Exception as e:
+        logger.error(f'Error: {str(e)}')
+        return jsonify({
+            'error': 'Something went wrong. Please try again.'
+        }), 500
@@ -1,6 +1,9 @@
 from flask import Blueprint, request, jsonify
 from app.services.auth_service import firebase_auth_required
 from app.firebase_init import db
+from app.utils.pagination import (
+    DEFAULT_SORT, InvalidCursor, resolve_sort, apply_order, take_page, page_info,
+)
 from datetime import datetime
 import uuid
 import logging
@@ -32,12 +35,56 @@ def agencies_health():
             'timestamp': datetime.utcnow().isoformat()
         }), 500
 
+def serialize_agency(agency):
+    """Shape an agency document for API responses"""
+    return {
+        'id': agency.get('id'),
+        'name': agency.get('name'),
+        'license_number': agency.get('license_number'),
+        'verification_status': agency.get('verification_status'),
+        'subscription_tier': agency.get('subscription_tier'),
+        'rating': agency.get('rating'),
+        'services': agency.get('services', []),
+        'location': agency.get('location'),
+        'monthly_fee': agency.get('monthly_fee'),
+        'commission_rate': agency.get('commission_rate'),
+        'verified_workers': agency.get('verified_workers'),
+        'successful_placements': agency.get('successful_placements'),
+        'description': agency.get('description'),
+        'contact_email': agency.get('contact_email'),
+        'contact_phone': agency.get('contact_phone'),
+        'website': agency.get('website'),
+        'created_at': agency.get('created_at'),
+        'updated_at': agency.get('updated_at')
+    }
+
 @agencies_bp.route('/', methods=['GET'])
 def get_agencies():
     """Get all agencies"""
     try:
         page = int(request.args.get('page', 1))
         per_page = int(request.args.get('per_page', 20))
+        sort_name = request.args.get('sort')
+        cursor = request.args.get('cursor')
+
+        if sort_name or cursor:
+            # Index-backed ordering with cursor pagination
+            if per_page < 1 or per_page > 100:
+                return jsonify({'error': 'Invalid pagination parameters'}), 400
+            order = resolve_sort('agencies', sort_name)
+            if not order:
+                return jsonify({'error': f"Unsupported sort '{sort_name}'"}), 400
+            field, direction = order
+            try:
+                query = apply_order(db.collection('agencies'), field, direction, cursor)
+            except InvalidCursor:
+                return jsonify({'error': 'Invalid cursor'}), 400
+            rows = [(doc.id, doc.to_dict()) for doc in query.limit(per_page + 1).stream()]
+            page_rows, has_next = take_page(rows, per_page)
+            return jsonify({
+                'agencies': [serialize_agency(agency) for _, agency in page_rows],
+                'pagination': page_info(page_rows, per_page, has_next, cursor, field, sort_name or DEFAULT_SORT)
+            }), 200
         
         # Paginate results manually for Firestore
         docs = list(db.collection('agencies').stream())
@@ -48,28 +95,7 @@ def get_agencies():
         end_idx = start_idx + per_page
         paginated = all_agencies[start_idx:end_idx]
         
-        result = []
-        for agency in paginated:
-            result.append({
-                'id': agency.get('id'),
-                'name': agency.get('name'),
-                'license_number': agency.get('license_number'),
-                'verification_status': agency.get('verification_status'),
-                'subscription_tier': agency.get('subscription_tier'),
-                'rating': agency.get('rating'),
-                'services': agency.get('services', []),
-                'location': agency.get('location'),
-                'monthly_fee': agency.get('monthly_fee'),
-                'commission_rate': agency.get('commission_rate'),
-                'verified_workers': agency.get('verified_workers'),
-                'successful_placements': agency.get('successful_placements'),
-                'description': agency.get('description'),
-                'contact_email': agency.get('contact_email'),
-                'contact_phone': agency.get('contact_phone'),
-                'website': agency.get('website'),
-                'created_at': agency.get('created_at'),
-                'updated_at': agency.get('updated_at')
-            })
+        result = [serialize_agency(agency) for agency in paginated]
         
         return jsonify({
             'agencies': result,
@@ -102,26 +128,7 @@ def get_agency(agency_id):
             
         agency = agency_doc.to_dict()
         
-        return jsonify({
-            'id': agency.get('id'),
-            'name': agency.get('name'),
-            'license_number': agency.get('license_number'),
-            'verification_status': agency.get('verification_status'),
-            'subscription_tier': agency.get('subscription_tier'),
-            'rating': agency.get('rating'),
-            'services': agency.get('services', []),
-            'location': agency.get('location'),
-            'monthly_fee': agency.get('monthly_fee'),
-            'commission_rate': agency.get('commission_rate'),
-            'verified_workers': agency.get('verified_workers'),
-            'successful_placements': agency.get('successful_placements'),
-            'description': agency.get('description'),
-            'contact_email': agency.get('contact_email'),
-            'contact_phone': agency.get('contact_phone'),
-            'website': agency.get('website'),
-            'created_at': agency.get('created_at'),
-            'updated_at': agency.get('updated_at')
-        }), 200
+        return jsonify(serialize_agency(agency)), 200
         
     except Exception as e:
         logger.error(f'Error: {str(e)}')
@@ -6,6 +6,7 @@ from app.middleware.security import rate_limit, rate_limit_by_email, validate_js
 from app.middleware.performance import cache_response, compress_response
 from app.middleware.logging import log_request, log_error, log_user_action
 from app.utils.audit_log import write_audit_log, ACTION_ROLE_CHANGED
+from app.services.photo_store import foreign_photo_url, is_own_photo_url
 import uuid
 import bcrypt
 from datetime import datetime
@@ -183,6 +184,8 @@ def verify_phone_auth():
         
         timestamp = datetime.utcnow().isoformat()
         user_id = f"user_{uid}"
+        if not is_own_photo_url(photo_url_safe, user_id):
+            photo_url_safe = ''
         user_doc_ref = db.collection('users').document(user_id)
         user_doc = user_doc_ref.get()
 
@@ -533,6 +536,10 @@ def update_user_profile():
         user = request.current_user
         data = request.get_json()
 
+        invalid_photo = foreign_photo_url(data or {}, getattr(user, 'id', None))
+        if invalid_photo:
+            return jsonify({'error': f'{invalid_photo} must be one of your own photos'}), 400
+
         # Use BaseModel method to update profile
         user.update_profile(**data)
 
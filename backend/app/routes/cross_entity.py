@@ -1,6 +1,9 @@
 from flask import Blueprint, request, jsonify
 from app.services.auth_service import firebase_auth_required
 from app.firebase_init import db
+from app.services.employer_snapshot import employer_snapshot_for
+from app.services.applications import applications_for_housegirl, count_matching
+from app.utils.signed_urls import sign_photo_url
 import logging
 
 
@@ -154,7 +157,7 @@ def get_housegirls_for_employer(include_unavailable=False):
                 'accommodation_type': hg_profile.get('accommodation_type'),
                 'tribe': hg_profile.get('tribe'),
                 'is_available': profile_is_available,
-                'profile_photo_url': hg_profile.get('profile_photo_url') or user_data.get('photo_url'),
+                'profile_photo_url': sign_photo_url(hg_profile.get('profile_photo_url') or user_data.get('photo_url')),
                 'first_name': first_name,
                 'last_name': last_name,
                 'email': user_data.get('email', ''),
@@ -235,25 +238,8 @@ def get_job_opportunities_for_housegirl():
     for doc in job_docs:
         job = doc.to_dict()
         emp_id = job.get('employer_id')
-        emp_name = "Unknown"
-        comp_name = None
-        comp_loc = None
-        
-        if emp_id:
-            user_doc = db.collection('users').document(emp_id).get()
-            if user_doc.exists:
-                u = user_doc.to_dict()
-                emp_name = f"{u.get('first_name', '')} {u.get('last_name', '')}".strip()
-                
-            prof_docs = list(db.collection('profiles').where('user_id', '==', emp_id).limit(1).stream())
-            if prof_docs:
-                p_id = prof_docs[0].to_dict().get('id')
-                emp_prof_docs = list(db.collection('employer_profiles').where('profile_id', '==', p_id).limit(1).stream())
-                if emp_prof_docs:
-                    ep = emp_prof_docs[0].to_dict()
-                    comp_name = ep.get('company_name')
-                    comp_loc = ep.get('location')
-                    
+        employer = employer_snapshot_for(job, doc.reference)
+
         result.append({
             'id': job.get('id'),
             'employer_id': emp_id,
@@ -270,9 +256,10 @@ def get_job_opportunities_for_housegirl():
             'status': job.get('status'),
             'application_deadline': job.get('application_deadline'),
             'employer': {
-                'name': emp_name,
-                'company_name': comp_name,
-                'location': comp_loc
+                'name': employer.get('name') or "Unknown",
+                'company_name': employer.get('company_name'),
+                'location': employer.get('company_location'),
+                'photo': employer.get('photo')
             },
             'created_at': job.get('created_at'),
             'updated_at': job.get('updated_at')
@@ -464,4 +451,4 @@ def get_total_applications_for_employer(employer_id):
     return total
 
 def get_my_applications_count(housegirl_id):
-    return len(list(db.collection('job_applications').where('housegirl_id', '==', housegirl_id).stream()))
+    return count_matching(applications_for_housegirl(housegirl_id))
@@ -1,6 +1,8 @@
 from flask import Blueprint, request, jsonify
 from app.services.auth_service import firebase_auth_required
 from app.firebase_init import db
+from app.services.employer_snapshot import refresh_employer_snapshot
+from app.services.photo_store import foreign_photo_url
 from datetime import datetime
 import uuid
 import logging
@@ -282,6 +284,9 @@ def update_employer(employer_id):
             return jsonify({'error': 'Unauthorized'}), 403
             
         data = request.get_json() or {}
+        invalid_photo = None if getattr(user, 'is_admin', False) else foreign_photo_url(data, getattr(user, 'id'))
+        if invalid_photo:
+            return jsonify({'error': f'{invalid_photo} must be one of your own photos'}), 400
         updates = {}
         
         fields = ['company_name', 'location', 'description', 'full_name', 'phone']
@@ -327,6 +332,13 @@ def update_employer(employer_id):
                 })
             logger.info(f'Profile saved: {doc_ref.path} -> {updates}')
 
+            # Keep the employer details embedded on their job postings current
+            owner_id = emp.get('user_id') if emp_doc.exists else getattr(user, 'id')
+            if not owner_id and emp.get('profile_id'):
+                prof_doc = db.collection('profiles').document(emp.get('profile_id')).get()
+                owner_id = prof_doc.to_dict().get('user_id') if prof_doc.exists else None
+            refresh_employer_snapshot(owner_id)
+
         # Refetch and verify write
         updated_doc = doc_ref.get()
         if not updated_doc.exists:
@@ -5,6 +5,7 @@ from flask import Blueprint, jsonify
 from app.firebase_init import db
 from app.middleware.performance import get_cache_stats
 from app.middleware.logging import logger
+from app.utils.latency import render_prometheus
 import time
 import os
 
@@ -224,7 +225,8 @@ cache_misses_total {cache_stats.get('misses', 0)}
 # HELP cache_size Current cache size
 # TYPE cache_size gauge
 cache_size {cache_stats.get('cache_size', 0)}
-"""
+
+""" + render_prometheus()
         
         return metrics_text, 200, {'Content-Type': 'text/plain; charset=utf-8'}
         
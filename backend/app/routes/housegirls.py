@@ -1,6 +1,18 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app
 from app.services.auth_service import firebase_auth_required, verify_firebase_token
 from app.firebase_init import db
+from app.services.skills_vocabulary import (
+    SKILLS, LANGUAGES, encode_fields, parse_filter, matches_all, mask_of,
+    housegirl_skills_index, housegirl_languages_index,
+)
+from app.services.similarity import similar_workers
+from app.services.facets import housegirl_facets
+from app.services.photo_store import foreign_photo_url
+from app.utils.firestore_batch import get_all_by_id
+from app.utils.signed_urls import photo_url_for
+from app.utils.pagination import (
+    DEFAULT_SORT, InvalidCursor, resolve_sort, apply_order, take_page, page_info,
+)
 from datetime import datetime
 import uuid
 import logging
@@ -111,6 +123,48 @@ def get_unlock_count(housegirl_id, target_profile_id=None):
         )
     )
 
+def build_listing_item(user_id, user_data, hg_profile, current_user_id):
+    """Shape one housegirl for the listing endpoint"""
+    first_name = user_data.get('first_name') or hg_profile.get('first_name', '')
+    last_name = user_data.get('last_name') or hg_profile.get('last_name', '')
+    full_name = f"{first_name} {last_name}".strip()
+    expected_salary = hg_profile.get('expected_salary', 0)
+    profile_is_available = hg_profile.get('is_available', True)
+    unlock_count = get_unlock_count(user_id, hg_profile.get('profile_id'))
+    can_view_contact = has_contact_access(current_user_id, user_id)
+
+    return {
+        'id': user_id,
+        'profile_id': hg_profile.get('profile_id') or user_id,
+        'name': full_name,
+        'role': hg_profile.get('role', 'housegirl'),
+        'skills': hg_profile.get('skills', []),
+        'rate': expected_salary,
+        'photo': photo_url_for(hg_profile.get('profile_photo_url') or user_data.get('photo_url'), current_user_id),
+        'availability': profile_is_available,
+        'age': hg_profile.get('age'),
+        'bio': hg_profile.get('bio'),
+        'current_location': hg_profile.get('current_location') or user_data.get('location'),
+        'location': hg_profile.get('location') or user_data.get('location'),
+        'education': hg_profile.get('education'),
+        'experience': hg_profile.get('experience'),
+        'expected_salary': expected_salary,
+        'accommodation_type': hg_profile.get('accommodation_type'),
+        'tribe': hg_profile.get('tribe'),
+        'is_available': profile_is_available,
+        'unlock_count': unlock_count,
+        'in_demand_alert': hg_profile.get('in_demand_alert', False),
+        'activation_fee_paid': hg_profile.get('activation_fee_paid', False),
+        'profile_photo_url': photo_url_for(hg_profile.get('profile_photo_url') or user_data.get('photo_url'), current_user_id),
+        'first_name': first_name,
+        'last_name': last_name,
+        'phone': user_data.get('phone_number') if can_view_contact else 'Unlock to view',
+        'email': user_data.get('email') if can_view_contact else 'Unlock to view',
+        'created_at': hg_profile.get('created_at') or user_data.get('created_at'),
+        'updated_at': hg_profile.get('updated_at') or user_data.get('updated_at')
+    }
+
+
 @housegirls_bp.route('/', methods=['GET'])
 def get_housegirls():
     """Get all housegirl profiles with filtering"""
@@ -124,139 +178,243 @@ def get_housegirls():
         min_salary = request.args.get('min_salary', type=int)
         max_salary = request.args.get('max_salary', type=int)
         is_available_param = request.args.get('is_available')
-        
-        # Super-Universal Visibility Logic:
-        # We merge results from both 'users' collection (filtered by type) 
-        # and 'housegirl_profiles' collection (all entries).
-        
-        user_docs_map = {}
-        
-        # 1. Start with 'users' collection
-        users_ref = db.collection('users')
-        users_query = users_ref.where('user_type', '==', 'housegirl')
-        for doc in users_query.stream():
-            user_docs_map[doc.id] = {'user_data': doc.to_dict(), 'hg_profile': {}}
-            
-        # 2. Also check 'housegirl_profiles' collection to catch those missing the 'user_type' link
-        hg_profiles_ref = db.collection('housegirl_profiles')
-        for doc in hg_profiles_ref.stream():
-            hg_data = doc.to_dict()
-            doc_id = doc.id
-            uid = hg_data.get('user_id') or doc_id
-            
-            if uid not in user_docs_map:
-                # Catch case where user doc exists but type is wrong or missing
-                u_doc = users_ref.document(uid).get()
-                user_docs_map[uid] = {
-                    'user_data': u_doc.to_dict() if u_doc.exists else {},
-                    'hg_profile': hg_data
-                }
-            else:
-                user_docs_map[uid]['hg_profile'] = hg_data
+        include_facets = str(request.args.get('facets', '')).lower() in ['true', '1', 'yes']
+        required_skills, skill_terms, unknown_skills = parse_filter(request.args.get('skills'), SKILLS)
+        required_languages, language_terms, unknown_languages = parse_filter(request.args.get('languages'), LANGUAGES)
+        # A filter naming a skill outside the vocabulary can never match
+        no_match_possible = bool(unknown_skills or unknown_languages)
+        sort_name = request.args.get('sort')
+        cursor = request.args.get('cursor')
+        page = int(request.args.get('page', 1))
+        per_page = int(request.args.get('per_page', 20))
 
-        logger.info(f"get_housegirls: Found {len(user_docs_map)} unique housegirl candidate IDs")
-        
-        all_results = []
-        current_user_id = get_authenticated_user_id_from_request()
-        
-        for user_id, data_bundle in user_docs_map.items():
-            user_data = data_bundle['user_data']
-            hg_profile = data_bundle['hg_profile']
-            
-            if not hg_profile:
-                # Final check for profile via profile_id link
-                fallback_profile = find_housegirl_doc_for_user(user_id)
-                if fallback_profile:
-                    hg_profile = fallback_profile.to_dict()
-            
-            # Combine data attributes
-            first_name = user_data.get('first_name') or hg_profile.get('first_name', '')
-            last_name = user_data.get('last_name') or hg_profile.get('last_name', '')
-            full_name = f"{first_name} {last_name}".strip()
-            
+        def matches(user_id, user_data, hg_profile):
             # Local filtering (Firestore's limitations make in-memory filtering cleaner here)
             if location:
                 loc = (hg_profile.get('location') or user_data.get('location') or '').lower()
                 curr_loc = hg_profile.get('current_location', '').lower()
                 if location not in loc and location not in curr_loc:
-                    continue
+                    return False
             
             if tribe:
                 hg_tribe = hg_profile.get('tribe', '').lower()
                 if tribe not in hg_tribe:
-                    continue
+                    return False
             
             if education and education.lower() not in hg_profile.get('education', '').lower():
-                continue
+                return False
                 
             if experience and experience.lower() not in hg_profile.get('experience', '').lower():
-                continue
+                return False
                 
             if accommodation_type and accommodation_type != hg_profile.get('accommodation_type'):
-                continue
+                return False
+
+            if no_match_possible:
+                return False
+            # Re-checked on the doc itself: the index may lag writes made by other workers
+            if required_skills and not matches_all(mask_of(hg_profile, 'skills'), required_skills):
+                return False
+            if required_languages and not matches_all(mask_of(hg_profile, 'languages'), required_languages):
+                return False
 
             expected_salary = hg_profile.get('expected_salary', 0)
             if min_salary is not None and expected_salary < min_salary:
-                continue
+                return False
             if max_salary is not None and expected_salary > max_salary:
-                continue
+                return False
             
             # Availability logic: Universal visibility requested.
-            # We still show the status, but we don't hide them from the list.
-            unlock_count = get_unlock_count(user_id, hg_profile.get('profile_id'))
-            
             # Use explicit availability flag if set, otherwise default to true
             # We ignore the 3-unlock limit for VISIBILITY, but can still track it.
-            profile_is_available = hg_profile.get('is_available', True)
-            
             if is_available_param is not None:
                 is_avail_bool = str(is_available_param).lower() in ['true', '1', 't', 'y', 'yes']
-                if profile_is_available != is_avail_bool:
+                if hg_profile.get('is_available', True) != is_avail_bool:
+                    return False
+            return True
+
+        def facet_block():
+            facet_filters = {
+                'location': location,
+                'education': education,
+                'experience': experience,
+                'accommodation_type': accommodation_type,
+                'tribe': tribe,
+                'min_salary': min_salary,
+                'max_salary': max_salary,
+                'skills': skill_terms,
+                'languages': language_terms,
+            }
+            # Same universe as the listing: everyone unless is_available is given
+            facet_availability = None
+            if is_available_param is not None:
+                facet_availability = str(is_available_param).lower() in ['true', '1', 't', 'y', 'yes']
+            return housegirl_facets.counts(facet_filters, is_available=facet_availability)['facets']
+
+        def indexed_matches():
+            """housegirl_profiles ids with every required skill and language, or None if the index can't say."""
+            if no_match_possible:
+                return set()
+            doc_ids = None
+            for index, required in ((housegirl_skills_index, required_skills),
+                                    (housegirl_languages_index, required_languages)):
+                if not required:
                     continue
+                if not index.ready():
+                    return None
+                # Pick up profiles other workers edited since the index loaded
+                index.sync()
+                matched = index.match_all(required)
+                doc_ids = matched if doc_ids is None else doc_ids & matched
+            return doc_ids
+
+        current_user_id = get_authenticated_user_id_from_request()
+        indexed_ids = indexed_matches()
+
+        if sort_name or cursor:
+            # Index-backed ordering with cursor pagination: only the rows needed
+            # for this page (plus one look-ahead) are read from Firestore.
+            # Unlike the scan below this walks housegirl_profiles only (with
+            # each row's users doc merged in): a housegirl user without a
+            # profile doc has nothing to sort on, and
+            # scripts/backfill_sort_fields.py gives every such user one.
+            if per_page < 1 or per_page > 100:
+                return jsonify({'error': 'Invalid pagination parameters'}), 400
+            order = resolve_sort('housegirl_profiles', sort_name)
+            if not order:
+                return jsonify({'error': f"Unsupported sort '{sort_name}'"}), 400
+            field, direction = order
+
+            query = db.collection('housegirl_profiles')
+            if accommodation_type:
+                query = query.where('accommodation_type', '==', accommodation_type)
+            if field == 'expected_salary':
+                # Range filters can only be pushed down on the ordered field
+                if min_salary is not None:
+                    query = query.where('expected_salary', '>=', min_salary)
+                if max_salary is not None:
+                    query = query.where('expected_salary', '<=', max_salary)
+            try:
+                query = apply_order(query, field, direction, cursor)
+            except InvalidCursor:
+                return jsonify({'error': 'Invalid cursor'}), 400
+
+            resolved_users = {}
 
-            can_view_contact = has_contact_access(current_user_id, user_id)
+            def resolve_chunk(chunk):
+                user_refs = [
+                    db.collection('users').document(doc.to_dict().get('user_id') or doc.id)
+                    for doc in chunk
+                ]
+                users_by_id = {u.id: u.to_dict() for u in db.get_all(user_refs) if u.exists}
+                for doc in chunk:
+                    hg_profile = doc.to_dict()
+                    user_id = hg_profile.get('user_id') or doc.id
+                    user_data = users_by_id.get(user_id, {})
+                    if matches(user_id, user_data, hg_profile):
+                        resolved_users[doc.id] = (user_id, user_data)
+                        yield doc.id, hg_profile
+
+            def candidate_rows():
+                if no_match_possible:
+                    return
+                chunk = []
+                for doc in query.stream():
+                    if indexed_ids is not None and doc.id not in indexed_ids:
+                        continue
+                    chunk.append(doc)
+                    if len(chunk) > per_page:
+                        yield from resolve_chunk(chunk)
+                        chunk = []
+                if chunk:
+                    yield from resolve_chunk(chunk)
+
+            page_rows, has_next = take_page(candidate_rows(), per_page)
+            response = {
+                'housegirls': [
+                    build_listing_item(*resolved_users[doc_id], hg_profile, current_user_id)
+                    for doc_id, hg_profile in page_rows
+                ],
+                'pagination': page_info(page_rows, per_page, has_next, cursor, field, sort_name or DEFAULT_SORT)
+            }
+            if include_facets:
+                response['facets'] = facet_block()
+            return jsonify(response), 200
+        
+        # Super-Universal Visibility Logic:
+        # We merge results from both 'users' collection (filtered by type) 
+        # and 'housegirl_profiles' collection (all entries).
+        
+        user_docs_map = {}
+        full_pass = indexed_ids is None
+
+        if not full_pass:
+            # The skills/languages index already picked the profiles. Users
+            # without a housegirl profile have no skills, so none can match.
+            hg_by_id = get_all_by_id('housegirl_profiles', sorted(indexed_ids))
+            users_by_id = get_all_by_id('users', [hg.get('user_id') or doc_id for doc_id, hg in hg_by_id.items()])
+            for doc_id, hg_data in hg_by_id.items():
+                uid = hg_data.get('user_id') or doc_id
+                user_docs_map[uid] = {'user_data': users_by_id.get(uid, {}), 'hg_profile': hg_data}
+        else:
+            # 1. Start with 'users' collection
+            users_ref = db.collection('users')
+            users_query = users_ref.where('user_type', '==', 'housegirl')
+            for doc in users_query.stream():
+                user_docs_map[doc.id] = {'user_data': doc.to_dict(), 'hg_profile': {}}
+
+            # 2. Also check 'housegirl_profiles' collection to catch those missing the 'user_type' link
+            hg_profiles_ref = db.collection('housegirl_profiles')
+            for doc in hg_profiles_ref.stream():
+                hg_data = doc.to_dict()
+                doc_id = doc.id
+                uid = hg_data.get('user_id') or doc_id
+
+                if uid not in user_docs_map:
+                    # Catch case where user doc exists but type is wrong or missing
+                    u_doc = users_ref.document(uid).get()
+                    user_docs_map[uid] = {
+                        'user_data': u_doc.to_dict() if u_doc.exists else {},
+                        'hg_profile': hg_data
+                    }
+                else:
+                    user_docs_map[uid]['hg_profile'] = hg_data
+
+        logger.info(f"get_housegirls: Found {len(user_docs_map)} unique housegirl candidate IDs")
+        
+        filtered = []
+        
+        for user_id, data_bundle in user_docs_map.items():
+            user_data = data_bundle['user_data']
+            hg_profile = data_bundle['hg_profile']
             
-            all_results.append({
-                'id': user_id,
-                'profile_id': hg_profile.get('profile_id') or user_id,
-                'name': full_name,
-                'role': hg_profile.get('role', 'housegirl'),
-                'skills': hg_profile.get('skills', []),
-                'rate': expected_salary,
-                'photo': hg_profile.get('profile_photo_url') or user_data.get('photo_url'),
-                'availability': profile_is_available,
-                'age': hg_profile.get('age'),
-                'bio': hg_profile.get('bio'),
-                'current_location': hg_profile.get('current_location') or user_data.get('location'),
-                'location': hg_profile.get('location') or user_data.get('location'),
-                'education': hg_profile.get('education'),
-                'experience': hg_profile.get('experience'),
-                'expected_salary': expected_salary,
-                'accommodation_type': hg_profile.get('accommodation_type'),
-                'tribe': hg_profile.get('tribe'),
-                'is_available': profile_is_available,
-                'unlock_count': unlock_count,
-                'in_demand_alert': hg_profile.get('in_demand_alert', False),
-                'activation_fee_paid': hg_profile.get('activation_fee_paid', False),
-                'profile_photo_url': hg_profile.get('profile_photo_url') or user_data.get('photo_url'),
-                'first_name': first_name,
-                'last_name': last_name,
-                'phone': user_data.get('phone_number') if can_view_contact else 'Unlock to view',
-                'email': user_data.get('email') if can_view_contact else 'Unlock to view',
-                'created_at': hg_profile.get('created_at') or user_data.get('created_at'),
-                'updated_at': hg_profile.get('updated_at') or user_data.get('updated_at')
-            })
+            if not hg_profile:
+                # Final check for profile via profile_id link
+                fallback_profile = find_housegirl_doc_for_user(user_id)
+                if fallback_profile:
+                    hg_profile = fallback_profile.to_dict()
+
+            # Keep the facet postings in step with the docs we already hold
+            if full_pass:
+                housegirl_facets.update(user_id, hg_profile, user_data)
+
+            if matches(user_id, user_data, hg_profile):
+                filtered.append((user_id, user_data, hg_profile))
+
+        if full_pass:
+            housegirl_facets.retain(user_docs_map.keys())
 
         # Pagination
-        page = int(request.args.get('page', 1))
-        per_page = int(request.args.get('per_page', 20))
-        
-        total = len(all_results)
+        total = len(filtered)
         start_idx = (page - 1) * per_page
         end_idx = start_idx + per_page
-        paginated = all_results[start_idx:end_idx]
+        # Unlock counts and contact access are only resolved for the rows returned
+        paginated = [
+            build_listing_item(user_id, user_data, hg_profile, current_user_id)
+            for user_id, user_data, hg_profile in filtered[start_idx:end_idx]
+        ]
         
-        return jsonify({
+        response = {
             'housegirls': paginated,
             'pagination': {
                 'page': page,
@@ -266,7 +424,11 @@ def get_housegirls():
                 'has_next': end_idx < total,
                 'has_prev': page > 1
             }
-        }), 200
+        }
+        if include_facets:
+            response['facets'] = facet_block()
+        
+        return jsonify(response), 200
         
     except Exception as e:
         logger.error(f'Error: {str(e)}')
@@ -354,7 +516,7 @@ def get_housegirl(housegirl_id):
             'role': housegirl.get('role', 'housegirl'),
             'skills': housegirl.get('skills', []),
             'rate': housegirl.get('expected_salary'),
-            'photo': profile_photo_url or housegirl.get('profile_photo_url'),
+            'photo': photo_url_for(profile_photo_url or housegirl.get('profile_photo_url'), current_user_id),
             'availability': computed_is_available,
             'age': housegirl.get('age'),
             'bio': housegirl.get('bio'),
@@ -369,7 +531,7 @@ def get_housegirl(housegirl_id):
             'unlock_count': unlock_count,
             'in_demand_alert': housegirl.get('in_demand_alert', False),
             'activation_fee_paid': housegirl.get('activation_fee_paid', False),
-            'profile_photo_url': profile_photo_url or housegirl.get('profile_photo_url'),
+            'profile_photo_url': photo_url_for(profile_photo_url or housegirl.get('profile_photo_url'), current_user_id),
             'first_name': first_name,
             'last_name': last_name,
             'phone': phone_number if can_view_contact else 'Unlock to view',
@@ -384,6 +546,76 @@ def get_housegirl(housegirl_id):
             'error': 'Something went wrong. Please try again.'
         }), 500
 
+@housegirls_bp.route('/<housegirl_id>/similar', methods=['GET'])
+def get_similar_housegirls(housegirl_id):
+    """Suggest workers similar to the given housegirl (TF-IDF cosine similarity)"""
+    try:
+        k = request.args.get('k', 10, type=int)
+        if k is None or k < 1 or k > 50:
+            return jsonify({'error': 'k must be between 1 and 50'}), 400
+
+        normalized_id = normalize_id(housegirl_id)
+        current_user_id = get_authenticated_user_id_from_request()
+        index = similar_workers.get(
+            current_app.config.get('SIMILARITY_INDEX_DIR', 'instance/similarity'),
+            current_app.config.get('SIMILARITY_REBUILD_SECONDS', 900)
+        )
+        if index is None:
+            # First build is still running in the background
+            response = jsonify({'error': 'Suggestions are not ready yet. Please try again shortly.'})
+            response.headers['Retry-After'] = '30'
+            return response, 503
+
+        if normalized_id not in index:
+            # Profile written since the last rebuild (possibly by another worker)
+            hg_doc = db.collection('housegirl_profiles').document(normalized_id).get()
+            if not hg_doc.exists:
+                hg_doc = find_housegirl_doc_for_user(normalized_id)
+            if not hg_doc:
+                return jsonify({'error': 'Housegirl not found'}), 404
+            normalized_id = hg_doc.id
+            index.upsert(hg_doc.id, hg_doc.to_dict())
+
+        matches = index.similar(normalized_id, k) or []
+        scores = dict(matches)
+
+        hg_refs = [db.collection('housegirl_profiles').document(doc_id) for doc_id, _ in matches]
+        hg_docs = {doc.id: doc.to_dict() for doc in db.get_all(hg_refs) if doc.exists} if hg_refs else {}
+        user_refs = [
+            db.collection('users').document(hg.get('user_id') or doc_id)
+            for doc_id, hg in hg_docs.items()
+        ]
+        user_docs = {doc.id: doc.to_dict() for doc in db.get_all(user_refs) if doc.exists} if user_refs else {}
+
+        result = []
+        for doc_id, _ in matches:
+            hg_profile = hg_docs.get(doc_id)
+            if not hg_profile:
+                continue
+            user_data = user_docs.get(hg_profile.get('user_id') or doc_id, {})
+            first_name = user_data.get('first_name') or hg_profile.get('first_name', '')
+            last_name = user_data.get('last_name') or hg_profile.get('last_name', '')
+            result.append({
+                'id': doc_id,
+                'profile_id': hg_profile.get('profile_id') or doc_id,
+                'name': f"{first_name} {last_name}".strip() or hg_profile.get('full_name', 'Househelp'),
+                'skills': hg_profile.get('skills', []),
+                'experience': hg_profile.get('experience'),
+                'location': hg_profile.get('location'),
+                'expected_salary': hg_profile.get('expected_salary'),
+                'profile_photo_url': photo_url_for(hg_profile.get('profile_photo_url') or user_data.get('photo_url'), current_user_id),
+                'is_available': hg_profile.get('is_available', True),
+                'score': round(scores[doc_id], 4)
+            })
+
+        return jsonify({'housegirl_id': normalized_id, 'similar': result}), 200
+
+    except Exception as e:
+        logger.error(f'Error: {str(e)}')
+        return jsonify({
+            'error': 'Something went wrong. Please try again.'
+        }), 500
+
 @housegirls_bp.route('/', methods=['POST'])
 @firebase_auth_required
 def create_housegirl():
@@ -409,6 +641,10 @@ def create_housegirl():
         
         if prof_data.get('user_id') != getattr(user, 'id') and not getattr(user, 'is_admin', False):
             return jsonify({'error': 'Unauthorized'}), 403
+
+        invalid_photo = foreign_photo_url(data, prof_data.get('user_id'))
+        if invalid_photo:
+            return jsonify({'error': f'{invalid_photo} must be one of your own photos'}), 400
             
         # Create housegirl profile
         housegirl_id = str(uuid.uuid4())
@@ -429,11 +665,18 @@ def create_housegirl():
             'in_demand_alert': data.get('in_demand_alert', False),
             'activation_fee_paid': data.get('activation_fee_paid', False),
             'profile_photo_url': data.get('profile_photo_url'),
+            'skills': data.get('skills', []),
+            'languages': data.get('languages', []),
             'created_at': datetime.utcnow().isoformat(),
             'updated_at': datetime.utcnow().isoformat()
         }
+        housegirl_data.update(encode_fields(housegirl_data))
         
         db.collection('housegirl_profiles').document(housegirl_id).set(housegirl_data)
+        housegirl_skills_index.update(housegirl_id, housegirl_data)
+        housegirl_languages_index.update(housegirl_id, housegirl_data)
+        similar_workers.upsert(housegirl_id, housegirl_data)
+        housegirl_facets.update(housegirl_id, housegirl_data)
         
         return jsonify(housegirl_data), 201
         
@@ -468,6 +711,9 @@ def update_housegirl(housegirl_id):
             return jsonify({'error': 'Forbidden'}), 403
             
         data = request.get_json() or {}
+        invalid_photo = None if is_admin else foreign_photo_url(data, getattr(user, 'id'))
+        if invalid_photo:
+            return jsonify({'error': f'{invalid_photo} must be one of your own photos'}), 400
         BLOCKED_FIELDS = ['unlock_count', 'is_available', 'in_demand_alert']
         for field in BLOCKED_FIELDS:
             data.pop(field, None)
@@ -494,6 +740,7 @@ def update_housegirl(housegirl_id):
         if updates:
             timestamp = datetime.utcnow().isoformat()
             updates['updated_at'] = timestamp
+            updates.update(encode_fields(updates))
             user_updates = {}
             full_name = (data.get('full_name') or '').strip()
             if full_name:
@@ -533,7 +780,13 @@ def update_housegirl(housegirl_id):
         if not updated_doc.exists:
             logger.error(f'Write verification failed: {doc_ref.path}')
             return jsonify({'error': 'Save failed — profile could not be verified after write.'}), 500
-        return jsonify(updated_doc.to_dict()), 200
+        updated_profile = updated_doc.to_dict()
+        index_id = updated_profile.get('user_id') or updated_doc.id
+        housegirl_skills_index.update(updated_doc.id, updated_profile)
+        housegirl_languages_index.update(updated_doc.id, updated_profile)
+        similar_workers.upsert(updated_doc.id, updated_profile)
+        housegirl_facets.update(index_id, updated_profile)
+        return jsonify(updated_profile), 200
 
     except Exception as e:
         logger.error(f'Error: {str(e)}')
@@ -567,6 +820,10 @@ def delete_housegirl(housegirl_id):
             return jsonify({'error': 'Unauthorized'}), 403
             
         db.collection('housegirl_profiles').document(housegirl_id).delete()
+        housegirl_skills_index.remove(housegirl_id)
+        housegirl_languages_index.remove(housegirl_id)
+        similar_workers.remove(housegirl_id)
+        housegirl_facets.remove(housegirl.get('user_id') or housegirl_id)
         
         return jsonify({'message': 'Housegirl profile deleted successfully'}), 200
         
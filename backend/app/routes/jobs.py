@@ -1,18 +1,94 @@
 from flask import Blueprint, request, jsonify
 from app.services.auth_service import firebase_auth_required
 from app.firebase_init import db
+from firebase_admin import firestore
+from app.services.skills_vocabulary import (
+    SKILLS, LANGUAGES, ARRAY_CONTAINS_ANY_LIMIT, encode_fields, parse_filter, mask_of, matches_all,
+)
+from app.utils.pagination import (
+    DEFAULT_SORT, InvalidCursor, resolve_sort, apply_order, take_page, page_info,
+)
+from app.services.employer_snapshot import build_employer_snapshot, employer_snapshot_for, snapshots_for_jobs
+from app.services.applications import applications_for_housegirl, count_matching
+from app.utils.firestore_batch import MAX_BATCH_OPS, get_all_by_id
+from app.utils.query_planner import RangeFilter, plan_ranges, apply_ranges
+from app.utils.signed_urls import sign_photo_url
 import logging
 # Commenting out middlewares that might rely on SQLAlchemy or need separate refactoring
 # from app.middleware.security import rate_limit, validate_json_input, JOB_POSTING_SCHEMA
 # from app.middleware.performance import cache_response, compress_response
 # from app.middleware.logging import log_request, log_error, log_user_action
 from datetime import datetime
+from itertools import islice
 import uuid
 
 
 logger = logging.getLogger(__name__)
 jobs_bp = Blueprint('jobs', __name__)
 
+APPLICATION_STATUSES = ('pending', 'reviewed', 'shortlisted', 'rejected')
+ALLOWED_STATUS_TRANSITIONS = {
+    'pending': ('reviewed', 'shortlisted', 'rejected'),
+    'reviewed': ('shortlisted', 'rejected'),
+    'shortlisted': ('reviewed', 'rejected'),
+    'rejected': ('reviewed',),
+}
+MAX_BULK_APPLICATIONS = 500
+
+
+def applicant_profile_summary(hg_profile, user_data):
+    """Compact housegirl profile shown next to an application"""
+    return {
+        'age': hg_profile.get('age'),
+        'location': hg_profile.get('location') or user_data.get('location'),
+        'current_location': hg_profile.get('current_location'),
+        'education': hg_profile.get('education'),
+        'experience': hg_profile.get('experience'),
+        'expected_salary': hg_profile.get('expected_salary'),
+        'skills': hg_profile.get('skills', []),
+        'languages': hg_profile.get('languages', []),
+        'is_available': hg_profile.get('is_available', True),
+        'profile_photo_url': sign_photo_url(hg_profile.get('profile_photo_url') or user_data.get('profile_photo_url'))
+    }
+
+def serialize_job_listing(job, doc_ref=None):
+    """Shape a job posting (plus employer details) for listing responses"""
+    emp_id = job.get('employer_id')
+    employer = employer_snapshot_for(job, doc_ref)
+
+    # Get apps count
+    apps_count = job.get('applications_count')
+    if apps_count is None:
+        apps_count = len(list(db.collection('job_applications').where('job_id', '==', job.get('id')).stream()))
+    
+    return {
+        'id': job.get('id'),
+        'title': job.get('title'),
+        'description': job.get('description'),
+        'location': job.get('location'),
+        'salary_min': job.get('salary_min'),
+        'salary_max': job.get('salary_max'),
+        'accommodation_type': job.get('accommodation_type'),
+        'required_experience': job.get('required_experience'),
+        'required_education': job.get('required_education'),
+        'skills_required': job.get('skills_required', []),
+        'languages_required': job.get('languages_required', []),
+        'status': job.get('status'),
+        'application_deadline': job.get('application_deadline'),
+        'created_at': job.get('created_at'),
+        'updated_at': job.get('updated_at'),
+        'employer': {
+            'id': emp_id,
+            'name': employer.get('name', ''),
+            'email': employer.get('email'),
+            'phone_number': employer.get('phone_number'),
+            'company_name': employer.get('company_name'),
+            'company_location': employer.get('company_location'),
+            'photo': employer.get('photo')
+        },
+        'applications_count': apps_count
+    }
+
 @jobs_bp.route('/', methods=['GET'])
 def get_jobs():
     """Get all job postings with filtering"""
@@ -25,6 +101,10 @@ def get_jobs():
         experience = request.args.get('experience')
         education = request.args.get('education')
         status = request.args.get('status', 'active')
+        required_skills, skill_terms, unknown_skills = parse_filter(request.args.get('skills'), SKILLS)
+        required_languages, _, unknown_languages = parse_filter(request.args.get('languages'), LANGUAGES)
+        sort_name = request.args.get('sort')
+        cursor = request.args.get('cursor')
         page = int(request.args.get('page', 1))
         per_page = int(request.args.get('per_page', 20))
         
@@ -32,101 +112,180 @@ def get_jobs():
         if page < 1 or per_page < 1 or per_page > 100:
             return jsonify({'error': 'Invalid pagination parameters'}), 400
         
-        query = db.collection('job_postings').where('status', '==', status)
-        
+        # Query planner: equality and array filters always go to Firestore; salary
+        # ranges go too when firestore.indexes.json declares a covering index,
+        # otherwise they are evaluated on the stream with the other residuals.
+        order = resolve_sort('job_postings', sort_name)
+        if not order:
+            return jsonify({'error': f"Unsupported sort '{sort_name}'"}), 400
+        field, direction = order
+
+        equalities = [('status', status)]
         if accommodation_type:
-            query = query.where('accommodation_type', '==', accommodation_type)
+            equalities.append(('accommodation_type', accommodation_type))
         if experience:
-            query = query.where('required_experience', '==', experience)
+            equalities.append(('required_experience', experience))
         if education:
-            query = query.where('required_education', '==', education)
-            
-        docs = list(query.stream())
-        all_jobs = [doc.to_dict() for doc in docs]
-        
-        # In-memory filtering for ranges and ilike
-        filtered_jobs = []
-        for job in all_jobs:
+            equalities.append(('required_education', education))
+
+        ranges = []
+        if salary_min:
+            ranges.append(RangeFilter('salary_min', '>=', salary_min))
+        if salary_max:
+            ranges.append(RangeFilter('salary_max', '<=', salary_max))
+
+        prefix_fields = [name for name, _ in equalities]
+        if skill_terms:
+            prefix_fields.append('skills_required_terms')
+        pushed, residual = plan_ranges('job_postings', prefix_fields, field, ranges)
+
+        query = db.collection('job_postings')
+        for name, value in equalities:
+            query = query.where(name, '==', value)
+        if skill_terms:
+            # Coarse pushdown: Firestore returns jobs sharing at least one
+            # requested skill; the bitmask check below enforces "all of them".
+            query = query.where('skills_required_terms', 'array_contains_any', skill_terms[:ARRAY_CONTAINS_ANY_LIMIT])
+        query = apply_ranges(query, pushed)
+        unordered_query = query
+        try:
+            query = apply_order(query, field, direction, cursor)
+        except InvalidCursor:
+            return jsonify({'error': 'Invalid cursor'}), 400
+
+        def matches(job):
+            # In-memory filtering for whatever could not be pushed down
             if location and location not in job.get('location', '').lower():
-                continue
-            if salary_min and job.get('salary_min', 0) < salary_min:
-                continue
-            if salary_max and job.get('salary_max', float('inf')) > salary_max:
-                continue
-            filtered_jobs.append(job)
-            
-        # sort by created_at desc
-        filtered_jobs.sort(key=lambda x: x.get('created_at', ''), reverse=True)
-            
-        total = len(filtered_jobs)
-        start_idx = (page - 1) * per_page
-        end_idx = start_idx + per_page
-        paginated = filtered_jobs[start_idx:end_idx]
+                return False
+            for range_filter in residual:
+                if not range_filter.matches(job):
+                    return False
+            if required_skills and not matches_all(mask_of(job, 'skills_required'), required_skills):
+                return False
+            if required_languages and not matches_all(mask_of(job, 'languages_required'), required_languages):
+                return False
+            return True
+
+        def candidate_rows():
+            if unknown_skills or unknown_languages:
+                return
+            for doc in query.stream():
+                job = doc.to_dict()
+                if matches(job):
+                    yield doc.id, job
+
+        rows = candidate_rows()
+        start_idx = 0 if cursor else (page - 1) * per_page
+        # Lazy pipeline: stops reading as soon as per_page + 1 matches are seen
+        page_rows, has_next = take_page(islice(rows, start_idx, None), per_page)
+        rows.close()
+
+        pagination = page_info(page_rows, per_page, has_next, cursor, field, sort_name or DEFAULT_SORT)
+        if not cursor:
+            # Page-number clients still get a total when Firestore can count the
+            # result exactly (no residual predicates); otherwise it is omitted.
+            exact = not (location or residual or required_languages or len(skill_terms) > 1 or
+                         unknown_skills or unknown_languages)
+            total = unordered_query.count(alias='total').get()[0][0].value if exact else None
+            pagination.update({
+                'page': page,
+                'total': total,
+                'pages': (total + per_page - 1) // per_page if total is not None else None,
+                'has_prev': page > 1
+            })
+
+        return jsonify({
+            'jobs': [
+                serialize_job_listing(job, db.collection('job_postings').document(doc_id))
+                for doc_id, job in page_rows
+            ],
+            'pagination': pagination
+        }), 200
         
+    except Exception as e:
+        logger.error(f'Error: {str(e)}')
+        return jsonify({
+            'error': 'Something went wrong. Please try again.'
+        }), 500
+
+@jobs_bp.route('/my-applications', methods=['GET'])
+@firebase_auth_required
+def get_my_applications():
+    """List the current housegirl's applications with job details"""
+    try:
+        user = request.current_user
+        if not user:
+            return jsonify({'error': 'Unauthorized'}), 401
+        if getattr(user, 'user_type', '') != 'housegirl':
+            return jsonify({'error': 'Only housegirls have job applications'}), 403
+
+        status = request.args.get('status')
+        sort_name = request.args.get('sort')
+        cursor = request.args.get('cursor')
+        per_page = int(request.args.get('per_page', 20))
+        if per_page < 1 or per_page > 100:
+            return jsonify({'error': 'Invalid pagination parameters'}), 400
+        if status and status not in APPLICATION_STATUSES:
+            return jsonify({'error': f"status must be one of: {', '.join(APPLICATION_STATUSES)}"}), 400
+        order = resolve_sort('job_applications', sort_name)
+        if not order:
+            return jsonify({'error': f"Unsupported sort '{sort_name}'"}), 400
+        field, direction = order
+
+        # The count and the page come from the same base query
+        base_query = applications_for_housegirl(getattr(user, 'id'), status)
+        try:
+            query = apply_order(base_query, field, direction, cursor)
+        except InvalidCursor:
+            return jsonify({'error': 'Invalid cursor'}), 400
+
+        page_rows, has_next = take_page(
+            ((doc.id, doc.to_dict()) for doc in query.limit(per_page + 1).stream()),
+            per_page
+        )
+
+        jobs_by_id = get_all_by_id('job_postings', [app.get('job_id') for _, app in page_rows])
+        employers = snapshots_for_jobs(jobs_by_id)
+
         result = []
-        for job in paginated:
-            # Get employer info
-            emp_id = job.get('employer_id')
-            emp_data = {}
-            comp_name = None
-            comp_loc = None
-            
-            if emp_id:
-                user_doc = db.collection('users').document(emp_id).get()
-                if user_doc.exists:
-                    emp_data = user_doc.to_dict()
-                    
-                prof_docs = list(db.collection('profiles').where('user_id', '==', emp_id).limit(1).stream())
-                if prof_docs:
-                    prof_id = prof_docs[0].to_dict().get('id')
-                    emp_prof_docs = list(db.collection('employer_profiles').where('profile_id', '==', prof_id).limit(1).stream())
-                    if emp_prof_docs:
-                        e_prof = emp_prof_docs[0].to_dict()
-                        comp_name = e_prof.get('company_name')
-                        comp_loc = e_prof.get('location')
-                        
-            # Get apps count
-            apps_count = len(list(db.collection('job_applications').where('job_id', '==', job.get('id')).stream()))
-            
+        for _, app in page_rows:
+            job_id = app.get('job_id')
+            job = jobs_by_id.get(job_id)
+            employer = employers.get(job_id, {})
             result.append({
-                'id': job.get('id'),
-                'title': job.get('title'),
-                'description': job.get('description'),
-                'location': job.get('location'),
-                'salary_min': job.get('salary_min'),
-                'salary_max': job.get('salary_max'),
-                'accommodation_type': job.get('accommodation_type'),
-                'required_experience': job.get('required_experience'),
-                'required_education': job.get('required_education'),
-                'skills_required': job.get('skills_required', []),
-                'languages_required': job.get('languages_required', []),
-                'status': job.get('status'),
-                'application_deadline': job.get('application_deadline'),
-                'created_at': job.get('created_at'),
-                'updated_at': job.get('updated_at'),
-                'employer': {
-                    'id': emp_id,
-                    'name': f"{emp_data.get('first_name', '')} {emp_data.get('last_name', '')}".strip(),
-                    'email': emp_data.get('email'),
-                    'phone_number': emp_data.get('phone_number'),
-                    'company_name': comp_name,
-                    'company_location': comp_loc
-                },
-                'applications_count': apps_count
+                'id': app.get('id'),
+                'job_id': job_id,
+                'cover_letter': app.get('cover_letter'),
+                'status': app.get('status'),
+                'applied_at': app.get('applied_at'),
+                'reviewed_at': app.get('reviewed_at'),
+                'job': {
+                    'id': job_id,
+                    'title': job.get('title'),
+                    'location': job.get('location'),
+                    'salary_min': job.get('salary_min'),
+                    'salary_max': job.get('salary_max'),
+                    'accommodation_type': job.get('accommodation_type'),
+                    'status': job.get('status'),
+                    'application_deadline': job.get('application_deadline'),
+                    'employer': {
+                        'id': job.get('employer_id'),
+                        'name': employer.get('name', ''),
+                        'company_name': employer.get('company_name'),
+                        'company_location': employer.get('company_location'),
+                        'photo': employer.get('photo')
+                    }
+                } if job else None
             })
-        
+
+        pagination = page_info(page_rows, per_page, has_next, cursor, field, sort_name or DEFAULT_SORT)
+        pagination['total'] = count_matching(base_query)
+
         return jsonify({
-            'jobs': result,
-            'pagination': {
-                'page': page,
-                'per_page': per_page,
-                'total': total,
-                'pages': (total + per_page - 1) // per_page if per_page else 0,
-                'has_next': end_idx < total,
-                'has_prev': page > 1
-            }
+            'applications': result,
+            'pagination': pagination
         }), 200
-        
+
     except Exception as e:
         logger.error(f'Error: {str(e)}')
         return jsonify({
@@ -141,56 +300,7 @@ def get_job(job_id):
         if not job_doc.exists:
             return jsonify({'error': 'Job not found'}), 404
             
-        job = job_doc.to_dict()
-        
-        # Get employer info
-        emp_id = job.get('employer_id')
-        emp_data = {}
-        comp_name = None
-        comp_loc = None
-        
-        if emp_id:
-            user_doc = db.collection('users').document(emp_id).get()
-            if user_doc.exists:
-                emp_data = user_doc.to_dict()
-                
-            prof_docs = list(db.collection('profiles').where('user_id', '==', emp_id).limit(1).stream())
-            if prof_docs:
-                prof_id = prof_docs[0].to_dict().get('id')
-                emp_prof_docs = list(db.collection('employer_profiles').where('profile_id', '==', prof_id).limit(1).stream())
-                if emp_prof_docs:
-                    e_prof = emp_prof_docs[0].to_dict()
-                    comp_name = e_prof.get('company_name')
-                    comp_loc = e_prof.get('location')
-                    
-        apps_count = len(list(db.collection('job_applications').where('job_id', '==', job_id).stream()))
-        
-        return jsonify({
-            'id': job.get('id'),
-            'title': job.get('title'),
-            'description': job.get('description'),
-            'location': job.get('location'),
-            'salary_min': job.get('salary_min'),
-            'salary_max': job.get('salary_max'),
-            'accommodation_type': job.get('accommodation_type'),
-            'required_experience': job.get('required_experience'),
-            'required_education': job.get('required_education'),
-            'skills_required': job.get('skills_required', []),
-            'languages_required': job.get('languages_required', []),
-            'status': job.get('status'),
-            'application_deadline': job.get('application_deadline'),
-            'created_at': job.get('created_at'),
-            'updated_at': job.get('updated_at'),
-            'employer': {
-                'id': emp_id,
-                'name': f"{emp_data.get('first_name', '')} {emp_data.get('last_name', '')}".strip(),
-                'email': emp_data.get('email'),
-                'phone_number': emp_data.get('phone_number'),
-                'company_name': comp_name,
-                'company_location': comp_loc
-            },
-            'applications_count': apps_count
-        }), 200
+        return jsonify(serialize_job_listing(job_doc.to_dict(), job_doc.reference)), 200
         
     except Exception as e:
         logger.error(f'Error: {str(e)}')
@@ -234,9 +344,13 @@ def create_job():
             'languages_required': data.get('languages_required', []),
             'status': data.get('status', 'active'),
             'application_deadline': data.get('application_deadline'),
+            'applications_count': 0,
+            'status_counts': {status: 0 for status in APPLICATION_STATUSES},
+            'employer_snapshot': build_employer_snapshot(getattr(user, 'id')),
             'created_at': datetime.utcnow().isoformat(),
             'updated_at': datetime.utcnow().isoformat()
         }
+        job_data.update(encode_fields(job_data))
         
         db.collection('job_postings').document(job_id).set(job_data)
         
@@ -282,6 +396,12 @@ def update_job(job_id):
                 
         if updates:
             updates['updated_at'] = datetime.utcnow().isoformat()
+            if updates.get('status', job.get('status')) != job.get('status'):
+                # The sweeper archives closed jobs by closed_at
+                closing = updates['status'] == 'closed'
+                updates['closed_at'] = updates['updated_at'] if closing else None
+                updates['closed_reason'] = 'employer' if closing else None
+            updates.update(encode_fields(updates))
             job_doc_ref.update(updates)
             
         updated_doc = job_doc_ref.get()
@@ -368,7 +488,27 @@ def apply_to_job(job_id):
             'applied_at': datetime.utcnow().isoformat()
         }
         
-        db.collection('job_applications').document(app_id).set(application_data)
+        job_ref = db.collection('job_postings').document(job_id)
+        app_ref = db.collection('job_applications').document(app_id)
+
+        @firestore.transactional
+        def record(transaction):
+            # Reading the job makes a concurrent apply retry, so the seed below happens once
+            current = job_ref.get(transaction=transaction).to_dict() or {}
+            if current.get('applications_count') is None:
+                # Legacy job without a counter: seed it from the applications stored so far
+                stored = count_matching(db.collection('job_applications').where('job_id', '==', job_id))
+                applications_count = stored + 1
+            else:
+                applications_count = firestore.Increment(1)
+            job_updates = {'applications_count': applications_count}
+            if isinstance(current.get('status_counts'), dict):
+                # Legacy jobs get status_counts seeded on their first bulk review
+                job_updates['status_counts.pending'] = firestore.Increment(1)
+            transaction.set(app_ref, application_data)
+            transaction.update(job_ref, job_updates)
+
+        record(db.transaction())
         
         return jsonify(application_data), 201
         
@@ -396,24 +536,43 @@ def get_job_applications(job_id):
         # Check if user owns this job posting
         if job.get('employer_id') != getattr(user, 'id'):
             return jsonify({'error': 'You can only view applications for your own job postings'}), 403
-        
-        apps_docs = db.collection('job_applications').where('job_id', '==', job_id).stream()
-        
+
+        status = request.args.get('status')
+        sort_name = request.args.get('sort')
+        cursor = request.args.get('cursor')
+        per_page = int(request.args.get('per_page', 20))
+        if per_page < 1 or per_page > 100:
+            return jsonify({'error': 'Invalid pagination parameters'}), 400
+        if status and status not in APPLICATION_STATUSES:
+            return jsonify({'error': f"status must be one of: {', '.join(APPLICATION_STATUSES)}"}), 400
+        order = resolve_sort('job_applications', sort_name)
+        if not order:
+            return jsonify({'error': f"Unsupported sort '{sort_name}'"}), 400
+        field, direction = order
+
+        query = db.collection('job_applications').where('job_id', '==', job_id)
+        if status:
+            query = query.where('status', '==', status)
+        try:
+            query = apply_order(query, field, direction, cursor)
+        except InvalidCursor:
+            return jsonify({'error': 'Invalid cursor'}), 400
+
+        page_rows, has_next = take_page(
+            ((doc.id, doc.to_dict()) for doc in query.limit(per_page + 1).stream()),
+            per_page
+        )
+
+        # Resolve every applicant on the page in two batched reads
+        hg_ids = [app.get('housegirl_id') for _, app in page_rows]
+        users_by_id = get_all_by_id('users', hg_ids)
+        profiles_by_id = get_all_by_id('housegirl_profiles', hg_ids)
+
         result = []
-        for doc in apps_docs:
-            app = doc.to_dict()
+        for _, app in page_rows:
             hg_id = app.get('housegirl_id')
-            hg_name = ""
-            hg_email = ""
-            hg_phone = ""
-            
-            if hg_id:
-                hg_user_doc = db.collection('users').document(hg_id).get()
-                if hg_user_doc.exists:
-                    hg_u = hg_user_doc.to_dict()
-                    hg_name = f"{hg_u.get('first_name', '')} {hg_u.get('last_name', '')}".strip()
-                    hg_email = hg_u.get('email', '')
-                    hg_phone = hg_u.get('phone_number', '')
+            hg_u = users_by_id.get(hg_id, {})
+            hg_profile = profiles_by_id.get(hg_id)
                     
             result.append({
                 'id': app.get('id'),
@@ -425,16 +584,135 @@ def get_job_applications(job_id):
                 'reviewed_at': app.get('reviewed_at'),
                 'housegirl': {
                     'id': hg_id,
-                    'name': hg_name,
-                    'email': hg_email,
-                    'phone_number': hg_phone
+                    'name': f"{hg_u.get('first_name', '')} {hg_u.get('last_name', '')}".strip(),
+                    'email': hg_u.get('email', ''),
+                    'phone_number': hg_u.get('phone_number', ''),
+                    'profile': applicant_profile_summary(hg_profile, hg_u) if hg_profile else None
                 }
             })
         
-        return jsonify({'applications': result}), 200
+        return jsonify({
+            'applications': result,
+            'status_counts': job.get('status_counts'),
+            'pagination': page_info(page_rows, per_page, has_next, cursor, field, sort_name or DEFAULT_SORT)
+        }), 200
         
     except Exception as e:
         logger.error(f'Error: {str(e)}')
         return jsonify({
             'error': 'Something went wrong. Please try again.'
         }), 500
+
+@jobs_bp.route('/<job_id>/applications/bulk-status', methods=['POST'])
+@firebase_auth_required
+def bulk_update_application_status(job_id):
+    """Change the status of many applications for one job (employer only)"""
+    try:
+        user = request.current_user
+        if not user:
+            return jsonify({'error': 'Unauthorized'}), 401
+
+        data = request.get_json() or {}
+        new_status = data.get('status')
+        application_ids = data.get('application_ids') or []
+        if new_status not in APPLICATION_STATUSES:
+            return jsonify({'error': f"status must be one of: {', '.join(APPLICATION_STATUSES)}"}), 400
+        if not isinstance(application_ids, list) or not application_ids:
+            return jsonify({'error': 'application_ids must be a non-empty list'}), 400
+        if len(application_ids) > MAX_BULK_APPLICATIONS:
+            return jsonify({'error': f'At most {MAX_BULK_APPLICATIONS} applications can be updated per request'}), 400
+
+        job_ref = db.collection('job_postings').document(job_id)
+        job_doc = job_ref.get()
+        if not job_doc.exists:
+            return jsonify({'error': 'Job not found'}), 404
+        job = job_doc.to_dict()
+
+        # Ownership is checked once for the whole request
+        if job.get('employer_id') != getattr(user, 'id'):
+            return jsonify({'error': 'You can only review applications for your own job postings'}), 403
+
+        @firestore.transactional
+        def apply_chunk(transaction, chunk_ids):
+            # Statuses are re-read inside the transaction, so overlapping
+            # requests never both count the same application's change
+            refs = [db.collection('job_applications').document(app_id) for app_id in chunk_ids]
+            applications = {
+                snapshot.id: snapshot.to_dict() or {}
+                for snapshot in transaction.get_all(refs) if snapshot.exists
+            }
+            current_job = job_ref.get(transaction=transaction).to_dict() or {}
+
+            changes, unchanged, skipped = [], [], []
+            for app_id in chunk_ids:
+                app = applications.get(app_id)
+                if not app or app.get('job_id') != job_id:
+                    skipped.append({'id': app_id, 'reason': 'not_found'})
+                    continue
+                current = app.get('status', 'pending')
+                if current == new_status:
+                    unchanged.append(app_id)
+                    continue
+                if new_status not in ALLOWED_STATUS_TRANSITIONS.get(current, ()):
+                    skipped.append({'id': app_id, 'reason': f'cannot move from {current} to {new_status}'})
+                    continue
+                changes.append((app_id, app, current))
+            if not changes:
+                return [], unchanged, skipped
+
+            # Legacy jobs have no status_counts yet: seed it from the current
+            # applications so the deltas below start from the right baseline.
+            baseline = None
+            if not isinstance(current_job.get('status_counts'), dict):
+                baseline = {status: 0 for status in APPLICATION_STATUSES}
+                for doc in transaction.get(db.collection('job_applications').where('job_id', '==', job_id)):
+                    status = doc.to_dict().get('status', 'pending')
+                    baseline[status] = baseline.get(status, 0) + 1
+
+            timestamp = datetime.utcnow().isoformat()
+            deltas = {}
+            for app_id, app, current in changes:
+                updates = {'status': new_status, 'status_updated_at': timestamp}
+                if not app.get('reviewed_at'):
+                    updates['reviewed_at'] = timestamp
+                transaction.update(db.collection('job_applications').document(app_id), updates)
+                deltas[current] = deltas.get(current, 0) - 1
+                deltas[new_status] = deltas.get(new_status, 0) + 1
+
+            # The aggregate commits together with the status changes it counts
+            if baseline is not None:
+                for status, delta in deltas.items():
+                    baseline[status] = baseline.get(status, 0) + delta
+                transaction.update(job_ref, {'status_counts': baseline})
+            else:
+                transaction.update(job_ref, {
+                    f'status_counts.{status}': firestore.Increment(delta)
+                    for status, delta in deltas.items() if delta
+                })
+            return [app_id for app_id, _, _ in changes], unchanged, skipped
+
+        app_ids = list(dict.fromkeys(str(app_id) for app_id in application_ids))
+        per_transaction = MAX_BATCH_OPS - 1  # leave room for the job aggregate update
+        updated, unchanged, skipped = [], [], []
+        for start in range(0, len(app_ids), per_transaction):
+            chunk_updated, chunk_unchanged, chunk_skipped = apply_chunk(
+                db.transaction(), app_ids[start:start + per_transaction]
+            )
+            updated.extend(chunk_updated)
+            unchanged.extend(chunk_unchanged)
+            skipped.extend(chunk_skipped)
+
+        logger.info(f'Bulk status update on job {job_id}: {len(updated)} -> {new_status}')
+
+        return jsonify({
+            'status': new_status,
+            'updated': updated,
+            'unchanged': unchanged,
+            'skipped': skipped
+        }), 200
+
+    except Exception as e:
+        logger.error(f'Error: {str(e)}')
+        return jsonify({
+            'error': 'Something went wrong. Please try again.'
+        }), 500
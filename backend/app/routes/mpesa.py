@@ -6,8 +6,10 @@ from datetime import datetime
 from flask import Blueprint, request, jsonify
 from app.services.auth_service import firebase_auth_required
 from app.firebase_init import db
+from app.utils.latency import observe, timed
 import uuid
 import logging
+import time
 
 
 logger = logging.getLogger(__name__)
@@ -44,10 +46,11 @@ def get_access_token():
         auth_bytes = auth_string.encode('ascii')
         auth_b64 = base64.b64encode(auth_bytes).decode('ascii')
 
-        response = requests.get(
-            MPESA_URLS[MPESA_CONFIG['ENVIRONMENT']]['auth'],
-            headers={'Authorization': f'Basic {auth_b64}'}
-        )
+        with timed('daraja_request_seconds', endpoint='oauth'):
+            response = requests.get(
+                MPESA_URLS[MPESA_CONFIG['ENVIRONMENT']]['auth'],
+                headers={'Authorization': f'Basic {auth_b64}'}
+            )
 
         if response.status_code == 200:
             return response.json()['access_token']
@@ -118,14 +121,15 @@ def stk_push():
         }
         
         # Make STK Push request
-        response = requests.post(
-            MPESA_URLS[MPESA_CONFIG['ENVIRONMENT']]['stkPush'],
-            headers={
-                'Authorization': f'Bearer {access_token}',
-                'Content-Type': 'application/json'
-            },
-            json=payload
-        )
+        with timed('daraja_request_seconds', endpoint='stk_push'):
+            response = requests.post(
+                MPESA_URLS[MPESA_CONFIG['ENVIRONMENT']]['stkPush'],
+                headers={
+                    'Authorization': f'Bearer {access_token}',
+                    'Content-Type': 'application/json'
+                },
+                json=payload
+            )
         
         if response.status_code == 200:
             result = response.json()
@@ -178,14 +182,15 @@ def transaction_status():
         }
         
         # Make transaction status request
-        response = requests.post(
-            MPESA_URLS[MPESA_CONFIG['ENVIRONMENT']]['transactionStatus'],
-            headers={
-                'Authorization': f'Bearer {access_token}',
-                'Content-Type': 'application/json'
-            },
-            json=payload
-        )
+        with timed('daraja_request_seconds', endpoint='transaction_status'):
+            response = requests.post(
+                MPESA_URLS[MPESA_CONFIG['ENVIRONMENT']]['transactionStatus'],
+                headers={
+                    'Authorization': f'Bearer {access_token}',
+                    'Content-Type': 'application/json'
+                },
+                json=payload
+            )
         
         if response.status_code == 200:
             result = response.json()
@@ -211,6 +216,12 @@ def transaction_status():
 @mpesa_bp.route('/callback', methods=['POST'])
 def mpesa_callback():
     """Handle M-Pesa callback — webhook secret validated via URL token."""
+    started = time.perf_counter()
+    response = _process_callback()
+    observe('payment_callback_seconds', time.perf_counter() - started, route='mpesa', status=response[1])
+    return response
+
+def _process_callback():
     try:
         data = request.get_json(silent=True) or {}
 
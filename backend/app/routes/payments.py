@@ -1,13 +1,22 @@
 from flask import Blueprint, request, jsonify
 from app.services.auth_service import firebase_auth_required
 from app.firebase_init import db
-from app.utils.audit_log import write_audit_log, ACTION_PAYMENT_COMPLETED, ACTION_PAYMENT_FAILED, ACTION_CONTACT_UNLOCKED
+from app.services.package_catalog import package_catalog
+from app.services.credits import InsufficientCredits, get_balance_summary, unlock_with_credit
+from app.services.daraja import initiate_stk_push
+from app.services.payment_settlement import (
+    ACTIVATION_PACKAGE_ID, OUTCOME_ALREADY_PROCESSED, OUTCOME_FAILED, SOURCE_CALLBACK, settle_purchase
+)
+from app.services.payment_stages import STAGES_FIELD, STAGE_INITIATED, STAGE_STK_ACCEPTED
+from app.services.purchase_summaries import get_summary, create_pending
+from app.utils.pagination import DEFAULT_SORT, InvalidCursor, resolve_sort, apply_order, take_page, page_info
+from app.utils.audit_log import write_audit_log, ACTION_CONTACT_UNLOCKED
+from app.utils.latency import observe
 from datetime import datetime
 import uuid
 import logging
-import requests
-import base64
 import os
+import time
 
 
 logger = logging.getLogger(__name__)
@@ -16,87 +25,20 @@ payments_bp = Blueprint('payments', __name__)
 CONTACT_BUNDLE_PACKAGE_ID = 'contact_unlock'
 CONTACT_BUNDLE_PRICE = 200
 CONTACT_BUNDLE_CONTACTS = 3
-ACTIVATION_PACKAGE_ID = 'high_demand_activation'
 ACTIVATION_PACKAGE_PRICE = 500
+PURCHASE_STATUSES = ('pending', 'completed', 'failed')
 
-DARAJA_BASE_URL = os.getenv('DARAJA_BASE_URL', 'https://sandbox.safaricom.co.ke')
-DARAJA_SHORTCODE = os.getenv('DARAJA_SHORTCODE', '174379')
-DARAJA_PASSKEY = os.getenv('DARAJA_PASSKEY', '')
-DARAJA_CONSUMER_KEY = os.getenv('DARAJA_CONSUMER_KEY', '')
-DARAJA_CONSUMER_SECRET = os.getenv('DARAJA_CONSUMER_SECRET', '')
-DARAJA_CALLBACK_URL = os.getenv('DARAJA_CALLBACK_URL', 'https://example.com/api/payments/mpesa-callback')
 
 def get_contact_credit_summary(user_id):
-    purchases_ref = db.collection('user_purchases').where('user_id', '==', user_id).where('status', '==', 'completed').stream()
-    
-    total_credits = 0
-    for p_doc in purchases_ref:
-        p_data = p_doc.to_dict()
-        pkg_id = p_data.get('package_id')
-        if pkg_id:
-            pkg_doc = db.collection('payment_packages').document(pkg_id).get()
-            if pkg_doc.exists:
-                total_credits += pkg_doc.to_dict().get('contacts_included', 0)
-                
-    used_credits = len(list(db.collection('contact_access').where('user_id', '==', user_id).stream()))
-    remaining_credits = max(total_credits - used_credits, 0)
-
-    return {
-        'total_credits': total_credits,
-        'used_credits': used_credits,
-        'remaining_credits': remaining_credits
-    }
-
-
-def get_daraja_access_token():
-    credentials = f"{DARAJA_CONSUMER_KEY}:{DARAJA_CONSUMER_SECRET}"
-    encoded_credentials = base64.b64encode(credentials.encode('utf-8')).decode('utf-8')
-    token_response = requests.get(
-        f"{DARAJA_BASE_URL}/oauth/v1/generate?grant_type=client_credentials",
-        headers={"Authorization": f"Basic {encoded_credentials}"},
-        timeout=20
-    )
-    token_response.raise_for_status()
-    token_json = token_response.json()
-    return token_json.get('access_token')
-
-
-def initiate_stk_push(phone, amount, reference):
-    # TODO: Switch to production Daraja credentials before go-live
-    access_token = get_daraja_access_token()
-    timestamp = datetime.utcnow().strftime('%Y%m%d%H%M%S')
-    password = base64.b64encode(f"{DARAJA_SHORTCODE}{DARAJA_PASSKEY}{timestamp}".encode('utf-8')).decode('utf-8')
-    payload = {
-        "BusinessShortCode": DARAJA_SHORTCODE,
-        "Password": password,
-        "Timestamp": timestamp,
-        "TransactionType": "CustomerPayBillOnline",
-        "Amount": int(amount),
-        "PartyA": str(phone),
-        "PartyB": DARAJA_SHORTCODE,
-        "PhoneNumber": str(phone),
-        "CallBackURL": DARAJA_CALLBACK_URL,
-        "AccountReference": str(reference),
-        "TransactionDesc": "Domestic Connect contact purchase"
-    }
-    response = requests.post(
-        f"{DARAJA_BASE_URL}/mpesa/stkpush/v1/processrequest",
-        json=payload,
-        headers={"Authorization": f"Bearer {access_token}"},
-        timeout=20
-    )
-    response.raise_for_status()
-    return response.json()
+    return get_balance_summary(user_id)
+
 
 @payments_bp.route('/packages', methods=['GET'])
 def get_payment_packages():
     """Get all active payment packages"""
     try:
-        packages_ref = db.collection('payment_packages').where('is_active', '==', True).stream()
-        
         result = []
-        for doc in packages_ref:
-            p = doc.to_dict()
+        for p in package_catalog.active():
             result.append({
                 'id': p.get('id'),
                 'name': p.get('name'),
@@ -107,7 +49,7 @@ def get_payment_packages():
                 'created_at': p.get('created_at')
             })
         
-        return jsonify({'packages': result}), 200
+        return jsonify({'packages': result, 'catalog_version': package_catalog.version}), 200
         
     except Exception as e:
         logger.error(f'Error: {str(e)}')
@@ -134,8 +76,8 @@ def create_purchase():
         if not package_id or not amount or not phone_number:
             return jsonify({'error': 'Package ID, amount and phone number required'}), 400
         
-        package_doc = db.collection('payment_packages').document(package_id).get()
-        if not package_doc.exists:
+        package_dict = package_catalog.get(package_id)
+        if not package_dict:
             if package_id == CONTACT_BUNDLE_PACKAGE_ID:
                 package_data = {
                     'id': CONTACT_BUNDLE_PACKAGE_ID,
@@ -146,8 +88,7 @@ def create_purchase():
                     'is_active': True,
                     'created_at': datetime.utcnow().isoformat()
                 }
-                db.collection('payment_packages').document(CONTACT_BUNDLE_PACKAGE_ID).set(package_data)
-                package_dict = package_data
+                package_dict = package_catalog.put(package_data)
             elif package_id == ACTIVATION_PACKAGE_ID:
                 package_data = {
                     'id': ACTIVATION_PACKAGE_ID,
@@ -158,13 +99,11 @@ def create_purchase():
                     'is_active': True,
                     'created_at': datetime.utcnow().isoformat()
                 }
-                db.collection('payment_packages').document(ACTIVATION_PACKAGE_ID).set(package_data)
-                package_dict = package_data
+                package_dict = package_catalog.put(package_data)
             else:
                 return jsonify({'error': 'Payment package not found'}), 404
-        else:
-            package_dict = package_doc.to_dict()
         
+        initiated_at = datetime.utcnow().isoformat()
         stk_response = initiate_stk_push(
             phone=phone_number,
             amount=amount,
@@ -185,12 +124,17 @@ def create_purchase():
             'amount': amount,
             'payment_reference': payment_reference,
             'phone_number': phone_number,
+            'contacts_included': package_dict.get('contacts_included', 0),
             'status': 'pending',
             'checkout_request_id': checkout_request_id,
             'merchant_request_id': stk_response.get('MerchantRequestID'),
-            'purchase_date': datetime.utcnow().isoformat()
+            'purchase_date': initiated_at,
+            STAGES_FIELD: {
+                STAGE_INITIATED: initiated_at,
+                STAGE_STK_ACCEPTED: datetime.utcnow().isoformat()
+            }
         }
-        db.collection('user_purchases').document(purchase_id).set(purchase_data)
+        create_pending(db.collection('user_purchases').document(purchase_id), purchase_data)
         
         return jsonify({
             'message': 'Purchase initiated successfully',
@@ -209,6 +153,13 @@ def create_purchase():
 
 @payments_bp.route('/mpesa-callback', methods=['POST'])
 def mpesa_callback():
+    started = time.perf_counter()
+    response = _process_mpesa_callback(datetime.utcnow().isoformat())
+    observe('payment_callback_seconds', time.perf_counter() - started, route='payments', status=response[1])
+    return response
+
+
+def _process_mpesa_callback(received_at):
     try:
         # --- Webhook secret verification ---
         # The callback URL should include ?token=<MPESA_WEBHOOK_SECRET>
@@ -236,81 +187,24 @@ def mpesa_callback():
         if not purchases:
             return jsonify({'message': 'No pending purchase found for callback'}), 200
 
-        purchase_doc = purchases[0]
-        purchase_data = purchase_doc.to_dict()
-
-        if int(result_code or 1) != 0:
-            db.collection('user_purchases').document(purchase_doc.id).update({
-                'status': 'failed',
-                'result_code': result_code,
-                'result_desc': stk_callback.get('ResultDesc', callback_data.get('ResultDesc')),
-                'updated_at': datetime.utcnow().isoformat()
-            })
-            write_audit_log(
-                user_id=purchase_data.get('user_id', 'unknown'),
-                action=ACTION_PAYMENT_FAILED,
-                details={
-                    'purchase_id': purchase_doc.id,
-                    'checkout_request_id': checkout_request_id,
-                    'result_code': result_code,
-                },
-            )
-            return jsonify({'message': 'Payment callback recorded as failed'}), 200
-
         callback_items = stk_callback.get('CallbackMetadata', {}).get('Item', [])
         metadata = {item.get('Name'): item.get('Value') for item in callback_items if isinstance(item, dict)}
-        amount = metadata.get('Amount', callback_data.get('Amount'))
-        receipt = metadata.get('MpesaReceiptNumber', callback_data.get('MpesaReceiptNumber'))
-        phone_number = metadata.get('PhoneNumber', callback_data.get('PhoneNumber'))
-
-        db.collection('user_purchases').document(purchase_doc.id).update({
-            'status': 'completed',
-            'result_code': result_code,
-            'mpesa_receipt_number': receipt,
-            'amount_paid': amount,
-            'phone_number': phone_number or purchase_data.get('phone_number'),
-            'completed_at': datetime.utcnow().isoformat(),
-            'updated_at': datetime.utcnow().isoformat()
-        })
-
-        if purchase_data.get('package_id') == ACTIVATION_PACKAGE_ID:
-            user_id = purchase_data.get('user_id')
-            if user_id:
-                profiles = list(
-                    db.collection('profiles')
-                    .where('user_id', '==', user_id)
-                    .limit(1)
-                    .stream()
-                )
-                if profiles:
-                    profile_id = profiles[0].to_dict().get('id')
-                    if profile_id:
-                        housegirl_profiles = list(
-                            db.collection('housegirl_profiles')
-                            .where('profile_id', '==', profile_id)
-                            .limit(1)
-                            .stream()
-                        )
-                        if housegirl_profiles:
-                            db.collection('housegirl_profiles').document(housegirl_profiles[0].id).set({
-                                'unlock_count': 0,
-                                'is_available': True,
-                                'in_demand_alert': False,
-                                'activation_fee_paid': True,
-                                'updated_at': datetime.utcnow().isoformat()
-                            }, merge=True)
-
-        write_audit_log(
-            user_id=purchase_data.get('user_id', 'unknown'),
-            action=ACTION_PAYMENT_COMPLETED,
-            details={
-                'purchase_id': purchase_doc.id,
-                'checkout_request_id': checkout_request_id,
-                'mpesa_receipt': receipt,
-                'amount': amount,
-                'package_id': purchase_data.get('package_id'),
-            },
+        for name in ('Amount', 'MpesaReceiptNumber', 'PhoneNumber'):
+            if metadata.get(name) is None and callback_data.get(name) is not None:
+                metadata[name] = callback_data.get(name)
+
+        outcome = settle_purchase(
+            purchases[0],
+            result_code,
+            result_desc=stk_callback.get('ResultDesc', callback_data.get('ResultDesc')),
+            metadata=metadata,
+            source=SOURCE_CALLBACK,
+            received_at=received_at
         )
+        if outcome == OUTCOME_ALREADY_PROCESSED:
+            return jsonify({'message': 'Purchase already processed'}), 200
+        if outcome == OUTCOME_FAILED:
+            return jsonify({'message': 'Payment callback recorded as failed'}), 200
 
         return jsonify({
             'message': 'Payment confirmed and credits added',
@@ -365,21 +259,6 @@ def unlock_contact():
         
         user_id = getattr(user, 'id')
         
-        # Check if user already has access
-        docs = list(db.collection('contact_access').where('user_id', '==', user_id).where('target_profile_id', '==', target_profile_id).limit(1).stream())
-        if docs:
-            return jsonify({
-                'message': 'Contact already unlocked',
-                **get_contact_credit_summary(user_id)
-            }), 200
-        
-        credit_summary = get_contact_credit_summary(user_id)
-        if credit_summary['remaining_credits'] <= 0:
-            return jsonify({
-                'error': 'No contact credits available. Complete payment to unlock contacts.',
-                **credit_summary
-            }), 402
-
         # Create contact access record
         access_id = str(uuid.uuid4())
         access_data = {
@@ -389,27 +268,21 @@ def unlock_contact():
             'housegirl_id': housegirl_id,
             'accessed_at': datetime.utcnow().isoformat()
         }
-        
-        db.collection('contact_access').document(access_id).set(access_data)
-
-        if housegirl_id:
-            unlock_count = len(
-                list(
-                    db.collection('contact_access')
-                    .where('housegirl_id', '==', housegirl_id)
-                    .stream()
-                )
-            )
-            updates = {
-                'unlock_count': unlock_count,
-                'is_available': unlock_count < 3,
-                'updated_at': datetime.utcnow().isoformat()
-            }
-            if unlock_count >= 3:
-                updates['in_demand_alert'] = True
-            db.collection('housegirl_profiles').document(housegirl_id).set(updates, merge=True)
-        
-        updated_summary = get_contact_credit_summary(user_id)
+
+        # Already-unlocked check, debit, access record and the housegirl's
+        # unlock counter all happen in one transaction
+        try:
+            updated_summary = unlock_with_credit(user_id, access_id, access_data, housegirl_id)
+        except InsufficientCredits as e:
+            return jsonify({
+                'error': 'No contact credits available. Complete payment to unlock contacts.',
+                **e.summary
+            }), 402
+        if updated_summary is None:
+            return jsonify({
+                'message': 'Contact already unlocked',
+                **get_contact_credit_summary(user_id)
+            }), 200
 
         write_audit_log(
             user_id=user_id,
@@ -441,29 +314,50 @@ def get_user_purchases():
         user = request.current_user
         if not user:
             return jsonify({'error': 'Unauthorized'}), 401
-            
-        purchases_ref = db.collection('user_purchases').where('user_id', '==', getattr(user, 'id')).stream()
+
+        user_id = getattr(user, 'id')
+        status = request.args.get('status')
+        sort_name = request.args.get('sort')
+        cursor = request.args.get('cursor')
+        per_page = int(request.args.get('per_page', 20))
+        if per_page < 1 or per_page > 100:
+            return jsonify({'error': 'Invalid pagination parameters'}), 400
+        if status and status not in PURCHASE_STATUSES:
+            return jsonify({'error': f"status must be one of: {', '.join(PURCHASE_STATUSES)}"}), 400
+        order = resolve_sort('user_purchases', sort_name)
+        if not order:
+            return jsonify({'error': f"Unsupported sort '{sort_name}'"}), 400
+        field, direction = order
+
+        query = db.collection('user_purchases').where('user_id', '==', user_id)
+        if status:
+            query = query.where('status', '==', status)
+        try:
+            query = apply_order(query, field, direction, cursor)
+        except InvalidCursor:
+            return jsonify({'error': 'Invalid cursor'}), 400
+
+        page_rows, has_next = take_page(
+            ((doc.id, doc.to_dict()) for doc in query.limit(per_page + 1).stream()),
+            per_page
+        )
         
         result = []
-        for doc in purchases_ref:
-            p = doc.to_dict()
-            package_name = "Unknown Package"
-            pkg_id = p.get('package_id')
-            if pkg_id:
-                pkg_doc = db.collection('payment_packages').document(pkg_id).get()
-                if pkg_doc.exists:
-                    package_name = pkg_doc.to_dict().get('name', package_name)
-                    
+        for _, p in page_rows:
             result.append({
                 'id': p.get('id'),
-                'package_name': package_name,
+                'package_name': package_catalog.name_of(p.get('package_id')),
                 'amount': p.get('amount'),
                 'purchase_date': p.get('purchase_date'),
                 'status': p.get('status'),
                 'payment_reference': p.get('payment_reference')
             })
         
-        return jsonify({'purchases': result}), 200
+        return jsonify({
+            'purchases': result,
+            'summary': get_summary(user_id),
+            'pagination': page_info(page_rows, per_page, has_next, cursor, field, sort_name or DEFAULT_SORT)
+        }), 200
         
     except Exception as e:
         logger.error(f'Error: {str(e)}')
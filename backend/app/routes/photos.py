@@ -1,10 +1,25 @@
-from flask import Blueprint, request, jsonify, current_app, send_from_directory, abort
-from app.services.auth_service import firebase_auth_required
+from flask import Blueprint, request, jsonify, current_app, abort, redirect
+from app.services.auth_service import firebase_auth_required, firebase_user_from_request
 from app.firebase_init import db
+from firebase_admin import firestore
+from app.services import photo_primary, photo_store
+from app.services.photo_storage import get_storage
+from app.services.photo_derivatives import (
+    DEFAULT_WORKERS, MIME_TYPES, SIZES, STATUS_PENDING, STATUS_READY,
+    derivative_name, derivative_workers, preferred_format, remove as remove_derivatives
+)
 from app.utils.audit_log import write_audit_log, ACTION_FILE_DELETED
+from app.utils.file_offload import send_stored_file
+from app.utils.multipart_stream import MultipartStream
+from app.utils.signed_urls import photo_url_for, sign_photo_url, signature, verify as verify_signed_url
+import base64
+import re
+import time
 import uuid
 import os
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from werkzeug.exceptions import HTTPException
 from werkzeug.utils import secure_filename
 import logging
 
@@ -13,6 +28,18 @@ logger = logging.getLogger(__name__)
 photos_bp = Blueprint('photos', __name__)
 
 MAX_UPLOAD_BYTES = 5 * 1024 * 1024  # 5 MB
+# Boundaries, part headers and small form fields around the file
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+MAX_BATCH_FILES = 10
+# Parallel storage writes (renames locally, object uploads on S3) per batch
+BATCH_PUBLISH_WORKERS = 4
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+DEFAULT_UPLOAD_URL_TTL = 15 * 60
+
+UPLOADS = 'photo_uploads'
+UPLOAD_PENDING = 'pending'
+UPLOAD_COMPLETED = 'completed'
+_SHA256_HEX = re.compile(r'^[0-9a-f]{64}$')
 
 # Magic-byte signatures for allowed image types
 _MAGIC_SIGNATURES: dict[bytes, str] = {
@@ -39,6 +66,100 @@ def allowed_file(filename: str) -> bool:
            filename.rsplit('.', 1)[1].lower() in {'png', 'jpg', 'jpeg', 'gif', 'webp'}
 
 
+def _storage():
+    return get_storage(current_app.config)
+
+
+def _photo_record(photo_id: str, user_id: str, profile_id: str, sha256: str, ext: str, size: int,
+                  mime_type: str, is_primary: bool, original_filename: str = None) -> dict:
+    return {
+        'id': photo_id,
+        'profile_id': profile_id,
+        'photo_url': f"/api/photos/file/{user_id}/{photo_store.blob_name(sha256, ext)}",
+        'is_primary': is_primary,
+        'upload_date': datetime.utcnow().isoformat(),
+        'owner_user_id': user_id,
+        'original_filename': original_filename,
+        'sha256': sha256,
+        'size_bytes': size,
+        'mime_type': mime_type,
+        'derivatives_status': STATUS_PENDING,
+    }
+
+
+def _queue_derivatives(photo_ids: list, key: str, storage) -> None:
+    derivative_workers.submit(
+        photo_ids, key, storage, current_app.config.get('PHOTO_DERIVATIVE_WORKERS', DEFAULT_WORKERS)
+    )
+
+
+def _roll_back(photos: list, storage, temp_paths) -> None:
+    """Undo committed photo docs whose blob could not be published."""
+    for photo_data in photos:
+        try:
+            last_reference = photo_primary.delete_photo(
+                db.collection('photos').document(photo_data['id']), photo_data['sha256']
+            )
+            if last_reference:
+                photo_store.remove_blob_files(
+                    storage, photo_data['sha256'], photo_store.EXTENSIONS[photo_data['mime_type']]
+                )
+        except Exception as e:
+            logger.error(f'Rolling back photo {photo_data["id"]} failed: {str(e)}')
+    for temp_path in temp_paths:
+        photo_store.discard(temp_path)
+
+
+def _spool_parts(form: MultipartStream, field_name: str, upload_folder: str, max_files: int):
+    """
+    Spool up to `max_files` file parts named `field_name` (later ones are skipped).
+
+    Returns (spooled, None) with one dict per file, or (None, error_response)
+    after discarding everything spooled so far.
+    """
+    spooled = []
+
+    def reject(message: str, status: int, filename: str = None):
+        for entry in spooled:
+            photo_store.discard(entry['temp_path'])
+        body = {'error': message}
+        if filename is not None:
+            body['file'] = filename
+        return None, (jsonify(body), status)
+
+    filename = None
+    try:
+        for part_name, filename, chunks in form.parts():
+            if part_name != field_name or len(spooled) >= max_files:
+                continue
+            if not filename:
+                return reject('No file selected', 400)
+            if not allowed_file(filename):
+                return reject('Invalid file type. Allowed: jpg, jpeg, png, gif, webp', 400, filename)
+            # Hash while writing; identical images share one blob
+            temp_path, sha256, size, mime_type = photo_store.spool(
+                chunks, upload_folder, max_bytes=MAX_UPLOAD_BYTES, sniff=_detect_mime
+            )
+            spooled.append({
+                'filename': filename,
+                'temp_path': temp_path,
+                'sha256': sha256,
+                'size': size,
+                'mime_type': mime_type,
+                'ext': photo_store.EXTENSIONS[mime_type],
+            })
+    except photo_store.UploadTooLarge:
+        return reject('File too large. Maximum size is 5 MB.', 413, filename)
+    except photo_store.UnrecognizedContent:
+        return reject('File content does not match an allowed image type.', 400, filename)
+    except ValueError:
+        return reject('Malformed upload', 400)
+    except Exception:
+        reject('', 500)
+        raise
+    return spooled, None
+
+
 @photos_bp.route('/upload', methods=['POST'])
 @firebase_auth_required
 def upload_photo():
@@ -57,59 +178,57 @@ def upload_photo():
         profile_doc = profiles_ref[0]
         profile_data = profile_doc.to_dict()
 
-        if 'photo' not in request.files:
-            return jsonify({'error': 'No photo file provided'}), 400
-
-        file = request.files['photo']
-
-        if file.filename == '':
-            return jsonify({'error': 'No file selected'}), 400
-
-        if not allowed_file(file.filename):
-            return jsonify({'error': 'Invalid file type. Allowed: jpg, jpeg, png, gif, webp'}), 400
-
-        # --- Server-side size check ---
-        file.seek(0, 2)          # seek to end
-        file_size = file.tell()
-        file.seek(0)             # reset to start
-        if file_size > MAX_UPLOAD_BYTES:
+        # Reject declared-oversized bodies before reading a byte of them
+        if request.content_length and request.content_length > MAX_UPLOAD_BYTES + MULTIPART_OVERHEAD_BYTES:
             return jsonify({'error': 'File too large. Maximum size is 5 MB.'}), 413
 
-        # --- Server-side MIME validation via magic bytes ---
-        header = file.read(12)
-        file.seek(0)
-        detected_mime = _detect_mime(header)
-        if not detected_mime:
-            return jsonify({'error': 'File content does not match an allowed image type.'}), 400
-
-        filename = secure_filename(file.filename)
-        unique_filename = f"{uuid.uuid4()}_{filename}"
+        # Stream the multipart body: magic bytes are checked on the first
+        # chunk and the size cap while receiving, so rejected uploads stop early
+        try:
+            form = MultipartStream(request.stream, request.headers.get('Content-Type'))
+        except ValueError:
+            return jsonify({'error': 'No photo file provided'}), 400
 
-        # Save file in user-specific isolated folder
+        storage = _storage()
         upload_base_folder = current_app.config.get('UPLOAD_FOLDER', 'uploads')
-        user_upload_folder = os.path.join(upload_base_folder, str(getattr(user, 'id')))
-        os.makedirs(user_upload_folder, exist_ok=True)
-
-        file_path = os.path.join(user_upload_folder, unique_filename)
-        file.save(file_path)
+        spooled, error = _spool_parts(form, 'photo', upload_base_folder, max_files=1)
+        if error:
+            return error
+        if not spooled:
+            return jsonify({'error': 'No photo file provided'}), 400
+        upload = spooled[0]
+        temp_path, sha256, size = upload['temp_path'], upload['sha256'], upload['size']
+        detected_mime, ext = upload['mime_type'], upload['ext']
 
-        # Create photo record
+        # Create photo record and count the blob reference together
         photo_id = str(uuid.uuid4())
-        photo_data = {
-            'id': photo_id,
-            'profile_id': profile_data.get('id'),
-            'photo_url': f"/api/photos/file/{getattr(user, 'id')}/{unique_filename}",
-            'is_primary': request.form.get('is_primary', False) in ['true', 'True', '1', True],
-            'upload_date': datetime.utcnow().isoformat(),
-            'owner_user_id': getattr(user, 'id'),
-        }
+        photo_data = _photo_record(
+            photo_id, getattr(user, 'id'), profile_data.get('id'), sha256, ext, size, detected_mime,
+            form.fields.get('is_primary', False) in ['true', 'True', '1', True],
+            secure_filename(upload['filename'])
+        )
 
-        db.collection('photos').document(photo_id).set(photo_data)
+        try:
+            photo_primary.commit_photos(
+                [photo_data], {sha256: {'ext': ext, 'size': size, 'mime_type': detected_mime}},
+                getattr(user, 'id'), profile_data.get('id'), photo_id if photo_data['is_primary'] else None
+            )
+        except Exception:
+            photo_store.discard(temp_path)
+            raise
+        try:
+            key = photo_store.publish(temp_path, storage, sha256, ext, detected_mime)
+        except Exception:
+            _roll_back([photo_data], storage, [temp_path])
+            raise
+        _queue_derivatives([photo_id], key, storage)
 
         return jsonify({
             'message': 'Photo uploaded successfully',
             'photo_id': photo_id,
             'photo_url': photo_data['photo_url'],
+            'signed_url': sign_photo_url(photo_data['photo_url']),
+            'is_primary': photo_data['is_primary'],
         }), 201
 
     except Exception as e:
@@ -117,37 +236,498 @@ def upload_photo():
         return jsonify({'error': 'Something went wrong. Please try again.'}), 500
 
 
-@photos_bp.route('/file/<user_id>/<filename>', methods=['GET'])
+@photos_bp.route('/upload/batch', methods=['POST'])
 @firebase_auth_required
-def serve_photo(user_id: str, filename: str):
-    """Serve a photo — only the owning user (or an admin) may access it."""
+def upload_photos_batch():
+    """Upload several photos for the user's profile in one request.
+
+    Multipart body: up to MAX_BATCH_FILES `photos` file parts and an optional
+    `primary_index` field (0-based). Every file is validated before anything
+    is stored, so one bad file rejects the whole batch. The photo docs, blob
+    references and primary change (see photo_primary) commit together.
+    """
     try:
-        current_user = request.current_user
-        if not current_user:
-            abort(401)
+        user = request.current_user
+        if not user:
+            return jsonify({'error': 'Unauthorized'}), 401
 
-        requester_id = getattr(current_user, 'id', None)
-        is_admin = getattr(current_user, 'is_admin', False)
+        profiles_ref = list(
+            db.collection('profiles').where('user_id', '==', getattr(user, 'id')).limit(1).stream()
+        )
+        if not profiles_ref:
+            return jsonify({'error': 'Profile not found'}), 404
+        profile_id = profiles_ref[0].to_dict().get('id')
 
-        if requester_id != user_id and not is_admin:
-            abort(403)
+        if request.content_length and request.content_length > MAX_BATCH_FILES * (MAX_UPLOAD_BYTES + MULTIPART_OVERHEAD_BYTES):
+            return jsonify({'error': f'Too much data. Up to {MAX_BATCH_FILES} files of 5 MB each.'}), 413
+        try:
+            form = MultipartStream(request.stream, request.headers.get('Content-Type'))
+        except ValueError:
+            return jsonify({'error': 'No photo files provided'}), 400
 
         upload_base_folder = current_app.config.get('UPLOAD_FOLDER', 'uploads')
-        user_folder = os.path.join(upload_base_folder, user_id)
+        spooled, error = _spool_parts(form, 'photos', upload_base_folder, max_files=MAX_BATCH_FILES + 1)
+        if error:
+            return error
+
+        def reject(message: str):
+            for entry in spooled:
+                photo_store.discard(entry['temp_path'])
+            return jsonify({'error': message}), 400
+
+        if not spooled:
+            return reject('No photo files provided')
+        if len(spooled) > MAX_BATCH_FILES:
+            return reject(f'Too many files. Maximum is {MAX_BATCH_FILES} per batch.')
+        primary_index = form.fields.get('primary_index')
+        if primary_index not in (None, ''):
+            try:
+                primary_index = int(primary_index)
+            except ValueError:
+                primary_index = -1
+            if not 0 <= primary_index < len(spooled):
+                return reject('primary_index does not match an uploaded file')
+        else:
+            primary_index = None
+
+        user_id = getattr(user, 'id')
+        photos = []
+        references = {}
+        for entry in spooled:
+            photos.append(_photo_record(
+                str(uuid.uuid4()), user_id, profile_id, entry['sha256'], entry['ext'], entry['size'],
+                entry['mime_type'], False, secure_filename(entry['filename'])
+            ))
+            references.setdefault(entry['sha256'], []).append(entry)
+        blobs = {
+            sha256: {'ext': entries[0]['ext'], 'size': entries[0]['size'],
+                     'mime_type': entries[0]['mime_type'], 'count': len(entries)}
+            for sha256, entries in references.items()
+        }
+
+        try:
+            photo_primary.commit_photos(
+                photos, blobs, user_id, profile_id,
+                photos[primary_index]['id'] if primary_index is not None else None
+            )
+        except Exception:
+            for entry in spooled:
+                photo_store.discard(entry['temp_path'])
+            raise
+
+        # One upload per distinct blob; duplicates within the batch just drop their temp file
+        storage = _storage()
+        for entries in references.values():
+            for duplicate in entries[1:]:
+                photo_store.discard(duplicate['temp_path'])
+        try:
+            with ThreadPoolExecutor(max_workers=min(BATCH_PUBLISH_WORKERS, len(references))) as pool:
+                keys = dict(zip(references, pool.map(
+                    lambda entries: photo_store.publish(
+                        entries[0]['temp_path'], storage, entries[0]['sha256'], entries[0]['ext'],
+                        entries[0]['mime_type']
+                    ),
+                    references.values()
+                )))
+        except Exception:
+            # All or nothing: drop every photo of the batch, not just the failed blob's
+            _roll_back(photos, storage, [entries[0]['temp_path'] for entries in references.values()])
+            raise
+        for sha256, key in keys.items():
+            _queue_derivatives([photo_data['id'] for photo_data in photos if photo_data['sha256'] == sha256],
+                               key, storage)
+
+        return jsonify({
+            'message': 'Photos uploaded successfully',
+            'photos': [{
+                'photo_id': photo_data['id'],
+                'photo_url': photo_data['photo_url'],
+                'signed_url': sign_photo_url(photo_data['photo_url']),
+                'is_primary': photo_data['is_primary'],
+            } for photo_data in photos],
+        }), 201
 
+    except Exception as e:
+        logger.error(f'upload_photos_batch error: {str(e)}')
+        return jsonify({'error': 'Something went wrong. Please try again.'}), 500
+
+
+def _redirect_to_storage(storage, key: str, size: str):
+    """Point the client at a presigned object URL instead of streaming the bytes."""
+    content_type = None
+    if size != 'original':
+        ext = preferred_format(request.headers.get('Accept'))
+        derivative_key = f'{key}.{size}.{ext}'
+        if storage.exists(derivative_key):
+            key, content_type = derivative_key, MIME_TYPES[ext]
+    ttl = current_app.config.get('PHOTO_URL_TTL_SECONDS', 60 * 60)
+    response = redirect(storage.presign_download(key, ttl, content_type), code=302)
+    # The presigned URL outlives this redirect, so it is safe to reuse for a while
+    response.headers['Cache-Control'] = f'private, max-age={ttl // 2}'
+    response.headers['Vary'] = 'Accept'
+    return response
+
+
+def _send_photo(user_id: str, filename: str, size: str):
+    """Send an original or derivative (size already validated)."""
+    upload_base_folder = current_app.config.get('UPLOAD_FOLDER', 'uploads')
+    safe_filename = os.path.basename(filename)
+
+    blob = photo_store.parse_blob_name(safe_filename)
+    if blob:
+        storage = _storage()
+        key = photo_store.blob_key(*blob)
+        if storage.direct_transfers:
+            return _redirect_to_storage(storage, key, size)
+        # Content-addressed: the hash is the ETag
+        folder = os.path.dirname(storage.path(key))
+        etag = blob[0]
+    else:
+        folder = os.path.join(upload_base_folder, user_id)
+        etag = True
         # Prevent path traversal
-        safe_filename = os.path.basename(filename)
-        file_path = os.path.join(user_folder, safe_filename)
-        if not os.path.abspath(file_path).startswith(os.path.abspath(user_folder)):
+        file_path = os.path.join(folder, safe_filename)
+        if not os.path.abspath(file_path).startswith(os.path.abspath(folder) + os.sep):
             abort(400)
 
-        return send_from_directory(user_folder, safe_filename)
+    if size != 'original':
+        ext = preferred_format(request.headers.get('Accept'))
+        derivative = derivative_name(safe_filename, size, ext)
+        if os.path.exists(os.path.join(folder, derivative)):
+            response = send_stored_file(
+                folder, derivative, mimetype=MIME_TYPES[ext],
+                etag=f'{etag}-{size}-{ext}' if blob else True
+            )
+            response.headers['Vary'] = 'Accept'
+            return response
+
+    return send_stored_file(folder, safe_filename, etag=etag)
 
+
+def _requested_size() -> str:
+    size = request.args.get('size', 'original')
+    if size != 'original' and size not in SIZES:
+        abort(400)
+    return size
+
+
+@photos_bp.route('/file/<user_id>/<filename>', methods=['GET'])
+@firebase_auth_required
+def serve_photo(user_id: str, filename: str):
+    """Serve a photo — only the owning user (or an admin) may access it.
+
+    `?size=thumb|card|full` serves a resized derivative (WebP when the client
+    accepts it, JPEG otherwise), falling back to the original until the
+    derivatives exist.
+    """
+    size = _requested_size()
+    current_user = request.current_user
+    if not current_user:
+        abort(401)
+
+    requester_id = getattr(current_user, 'id', None)
+    is_admin = getattr(current_user, 'is_admin', False)
+
+    if requester_id != user_id and not is_admin:
+        abort(403)
+
+    try:
+        # Blobs are shared between users: the URL's user must own a photo of it.
+        # Signed URLs skip this; what gets signed was checked when it was stored.
+        blob = photo_store.parse_blob_name(os.path.basename(filename))
+        if blob and not photo_store.owns_blob(user_id, blob[0]):
+            abort(404)
+        return _send_photo(user_id, filename, size)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f'serve_photo error: {str(e)}')
         abort(500)
 
 
+@photos_bp.route('/signed/<user_id>/<filename>', methods=['GET'])
+def serve_signed_photo(user_id: str, filename: str):
+    """Serve a photo from a URL signed by the API (see app/utils/signed_urls.py).
+
+    No token verification or Firestore read: the signature and expiry are
+    the whole access check. Stored files never change under a URL, so the
+    response may be cached for good.
+    """
+    size = _requested_size()
+    if not verify_signed_url(f'{user_id}/{filename}', request.args.get('exp'), request.args.get('sig')):
+        abort(403)
+
+    try:
+        response = _send_photo(user_id, filename, size)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f'serve_signed_photo error: {str(e)}')
+        abort(500)
+    if not response.location:
+        # Shared by every viewer the URL was handed to, so edge caches may keep it;
+        # redirects keep their shorter lifetime since the presigned target expires
+        response.headers['Cache-Control'] = f'public, max-age={IMMUTABLE_MAX_AGE}, immutable'
+    return response
+
+
+def _upload_content_path(upload_id: str) -> str:
+    return f'upload/{upload_id}'
+
+
+@photos_bp.route('/uploads', methods=['POST'])
+@firebase_auth_required
+def create_upload():
+    """Start a direct upload.
+
+    The client sends the SHA-256, size and content type of the image and gets
+    back where to PUT the bytes: a presigned object-store URL, or (local
+    storage) a signed URL on this API. The bytes land on a key of their own
+    (photo_store.upload_key) and nothing is recorded in `photos` until
+    POST /uploads/<upload_id>/complete finds them there. Only when the caller
+    already has a photo of the same image is no upload needed at all.
+    """
+    try:
+        user = request.current_user
+        if not user:
+            return jsonify({'error': 'Unauthorized'}), 401
+
+        data = request.get_json(silent=True) or {}
+        sha256 = str(data.get('sha256', '')).lower()
+        content_type = data.get('content_type')
+        try:
+            size = int(data.get('size', 0))
+        except (TypeError, ValueError):
+            size = 0
+
+        if not _SHA256_HEX.match(sha256):
+            return jsonify({'error': 'sha256 must be a hex SHA-256 digest'}), 400
+        if content_type not in photo_store.EXTENSIONS:
+            return jsonify({'error': 'Invalid file type. Allowed: jpg, jpeg, png, gif, webp'}), 400
+        if size <= 0:
+            return jsonify({'error': 'size is required'}), 400
+        if size > MAX_UPLOAD_BYTES:
+            return jsonify({'error': 'File too large. Maximum size is 5 MB.'}), 413
+
+        profiles_ref = list(
+            db.collection('profiles').where('user_id', '==', getattr(user, 'id')).limit(1).stream()
+        )
+        if not profiles_ref:
+            return jsonify({'error': 'Profile not found'}), 404
+
+        storage = _storage()
+        ext = photo_store.EXTENSIONS[content_type]
+        key = photo_store.blob_key(sha256, ext)
+        ttl = current_app.config.get('PHOTO_UPLOAD_URL_TTL_SECONDS', DEFAULT_UPLOAD_URL_TTL)
+        upload_id = str(uuid.uuid4())
+        expires_at = datetime.utcnow() + timedelta(seconds=ttl)
+
+        # Knowing a hash is not holding the image: anyone without a photo of it sends the bytes
+        upload_required = not (photo_store.owns_blob(getattr(user, 'id'), sha256) and storage.exists(key))
+        upload = None
+        if upload_required:
+            sha256_b64 = base64.b64encode(bytes.fromhex(sha256)).decode('ascii')
+            upload = storage.presign_upload(photo_store.upload_key(upload_id), content_type, size, sha256_b64, ttl)
+            if upload is None:
+                exp = int(time.time()) + ttl
+                upload = {
+                    'method': 'PUT',
+                    'url': f"/api/photos/uploads/{upload_id}/content?exp={exp}"
+                           f"&sig={signature(_upload_content_path(upload_id), exp)}",
+                    'headers': {'Content-Type': content_type},
+                }
+
+        db.collection(UPLOADS).document(upload_id).set({
+            'id': upload_id,
+            'owner_user_id': getattr(user, 'id'),
+            'profile_id': profiles_ref[0].to_dict().get('id'),
+            'sha256': sha256,
+            'ext': ext,
+            'size_bytes': size,
+            'mime_type': content_type,
+            'is_primary': data.get('is_primary') in ['true', 'True', '1', True],
+            'original_filename': secure_filename(data.get('filename') or '') or None,
+            'upload_required': upload_required,
+            'status': UPLOAD_PENDING,
+            'created_at': datetime.utcnow().isoformat(),
+            'expires_at': expires_at.isoformat(),
+        })
+
+        return jsonify({
+            'upload_id': upload_id,
+            'upload_required': upload_required,
+            'upload': upload,
+            'expires_at': expires_at.isoformat(),
+            'complete_url': f'/api/photos/uploads/{upload_id}/complete',
+        }), 201
+
+    except Exception as e:
+        logger.error(f'create_upload error: {str(e)}')
+        return jsonify({'error': 'Something went wrong. Please try again.'}), 500
+
+
+@photos_bp.route('/uploads/<upload_id>/content', methods=['PUT'])
+def put_upload_content(upload_id: str):
+    """Receive the bytes of a direct upload when storage is local (signed URL, no token)."""
+    if not verify_signed_url(_upload_content_path(upload_id), request.args.get('exp'), request.args.get('sig')):
+        abort(403)
+    if request.content_length and request.content_length > MAX_UPLOAD_BYTES:
+        return jsonify({'error': 'File too large. Maximum size is 5 MB.'}), 413
+
+    temp_path = None
+    try:
+        upload_doc = db.collection(UPLOADS).document(upload_id).get()
+        if not upload_doc.exists or upload_doc.to_dict().get('status') != UPLOAD_PENDING:
+            return jsonify({'error': 'Upload not found'}), 404
+        upload = upload_doc.to_dict()
+
+        upload_base_folder = current_app.config.get('UPLOAD_FOLDER', 'uploads')
+        try:
+            temp_path, sha256, size, detected_mime = photo_store.spool(
+                photo_store.read_chunks(request.stream), upload_base_folder,
+                max_bytes=upload['size_bytes'], sniff=_detect_mime
+            )
+        except photo_store.UploadTooLarge:
+            return jsonify({'error': 'Uploaded bytes do not match the declared sha256/size'}), 400
+        except photo_store.UnrecognizedContent:
+            return jsonify({'error': 'File content does not match an allowed image type.'}), 400
+        if sha256 != upload['sha256'] or size != upload['size_bytes'] or detected_mime != upload['mime_type']:
+            photo_store.discard(temp_path)
+            return jsonify({'error': 'Uploaded bytes do not match the declared sha256/size'}), 400
+
+        _storage().put_file(temp_path, photo_store.upload_key(upload_id), upload['mime_type'])
+        return '', 204
+
+    except Exception as e:
+        photo_store.discard(temp_path)
+        logger.error(f'put_upload_content error: {str(e)}')
+        return jsonify({'error': 'Something went wrong. Please try again.'}), 500
+
+
+@photos_bp.route('/uploads/<upload_id>/complete', methods=['POST'])
+@firebase_auth_required
+def complete_upload(upload_id: str):
+    """Confirm a direct upload: verify the uploaded object, record the photo, then move it into its blob key."""
+    try:
+        user = request.current_user
+        if not user:
+            return jsonify({'error': 'Unauthorized'}), 401
+
+        upload_ref = db.collection(UPLOADS).document(upload_id)
+        upload_doc = upload_ref.get()
+        if not upload_doc.exists:
+            return jsonify({'error': 'Upload not found'}), 404
+        upload = upload_doc.to_dict()
+        if upload.get('owner_user_id') != getattr(user, 'id'):
+            return jsonify({'error': 'Unauthorized'}), 403
+        if upload.get('status') == UPLOAD_COMPLETED:
+            photo_url = upload.get('photo_url')
+            return jsonify({
+                'message': 'Photo uploaded successfully',
+                'photo_id': upload.get('photo_id'),
+                'photo_url': photo_url,
+                'signed_url': sign_photo_url(photo_url),
+            }), 200
+        if upload.get('expires_at', '') < (datetime.utcnow() - timedelta(hours=1)).isoformat():
+            return jsonify({'error': 'Upload expired'}), 410
+
+        storage = _storage()
+        sha256, ext, mime_type = upload['sha256'], upload['ext'], upload['mime_type']
+        key = photo_store.blob_key(sha256, ext)
+        # Only bytes sent for this upload count (their SHA-256 was checked on
+        # the way in), never a blob someone else stored under the same hash
+        uploaded_key = photo_store.upload_key(upload_id) if upload.get('upload_required', True) else key
+        stored_size = storage.size(uploaded_key)
+        if stored_size is None:
+            return jsonify({'error': 'Upload has not been received yet'}), 409
+        if stored_size != upload['size_bytes']:
+            return jsonify({'error': 'Stored size does not match the declared size'}), 400
+        if _detect_mime(storage.read_range(uploaded_key, 0, 12)) != mime_type:
+            return jsonify({'error': 'File content does not match an allowed image type.'}), 400
+
+        photo_id = str(uuid.uuid4())
+        photo_data = _photo_record(
+            photo_id, getattr(user, 'id'), upload.get('profile_id'), sha256, ext, stored_size, mime_type,
+            upload.get('is_primary', False), upload.get('original_filename')
+        )
+
+        @firestore.transactional
+        def record(transaction):
+            # Re-check inside the transaction so a retried confirmation counts once
+            current = upload_ref.get(transaction=transaction).to_dict() or {}
+            if current.get('status') != UPLOAD_PENDING:
+                return current.get('photo_id'), False
+            employer_mirrored = photo_primary.add_photos(
+                transaction, [photo_data],
+                {sha256: {'ext': ext, 'size': stored_size, 'mime_type': mime_type}},
+                getattr(user, 'id'), upload.get('profile_id'),
+                photo_id if upload.get('is_primary') else None
+            )
+            transaction.update(upload_ref, {
+                'status': UPLOAD_COMPLETED,
+                'photo_id': photo_id,
+                'photo_url': photo_data['photo_url'],
+                'completed_at': datetime.utcnow().isoformat(),
+            })
+            return photo_id, employer_mirrored
+
+        recorded_id, employer_mirrored = record(db.transaction())
+        if recorded_id == photo_id:
+            if uploaded_key != key:
+                # Moved only once the reference is counted, like photo_store.publish
+                try:
+                    storage.move(uploaded_key, key)
+                except Exception:
+                    _roll_back([photo_data], storage, [])
+                    upload_ref.update({'status': UPLOAD_PENDING, 'photo_id': None, 'photo_url': None})
+                    raise
+            if employer_mirrored:
+                photo_primary.refresh_employer_jobs(getattr(user, 'id'))
+            _queue_derivatives([photo_id], key, storage)
+            photo_url = photo_data['photo_url']
+        else:
+            photo_url = f"/api/photos/file/{getattr(user, 'id')}/{photo_store.blob_name(sha256, ext)}"
+
+        return jsonify({
+            'message': 'Photo uploaded successfully',
+            'photo_id': recorded_id,
+            'photo_url': photo_url,
+            'signed_url': sign_photo_url(photo_url),
+        }), 201
+
+    except Exception as e:
+        logger.error(f'complete_upload error: {str(e)}')
+        return jsonify({'error': 'Something went wrong. Please try again.'}), 500
+
+
+@photos_bp.route('/<photo_id>/primary', methods=['PUT'])
+@firebase_auth_required
+def set_primary_photo(photo_id):
+    """Make a photo the primary one of its profile (mirrored to profile_photo_url)."""
+    try:
+        user = request.current_user
+        if not user:
+            return jsonify({'error': 'Unauthorized'}), 401
+
+        try:
+            photo = photo_primary.set_primary(
+                photo_id, getattr(user, 'id'), is_admin=getattr(user, 'is_admin', False)
+            )
+        except photo_primary.PhotoNotFound:
+            return jsonify({'error': 'Photo not found'}), 404
+
+        return jsonify({
+            'message': 'Primary photo updated',
+            'photo_id': photo_id,
+            'photo_url': photo.get('photo_url'),
+            'signed_url': sign_photo_url(photo.get('photo_url')),
+        }), 200
+
+    except Exception as e:
+        logger.error(f'set_primary_photo error: {str(e)}')
+        return jsonify({'error': 'Something went wrong. Please try again.'}), 500
+
+
 @photos_bp.route('/<photo_id>', methods=['DELETE'])
 @firebase_auth_required
 def delete_photo(photo_id):
@@ -174,19 +754,26 @@ def delete_photo(photo_id):
         if not is_owner and not getattr(user, 'is_admin', False):
             return jsonify({'error': 'Unauthorized'}), 403
 
-        # Delete file from filesystem
         photo_url = photo.get('photo_url', '')
-        if photo_url:
-            upload_base_folder = current_app.config.get('UPLOAD_FOLDER', 'uploads')
+        upload_base_folder = current_app.config.get('UPLOAD_FOLDER', 'uploads')
+        blob = photo_store.parse_blob_name(photo_url.split('/')[-1]) if photo_url else None
+
+        # Drop the doc and its blob reference, promoting another photo if this was the primary
+        last_reference = photo_primary.delete_photo(photo_doc.reference, blob[0] if blob else None)
+        if blob:
+            # The blob goes once no photo points at it
+            if last_reference:
+                photo_store.remove_blob_files(_storage(), *blob)
+        elif photo_url:
+            # Legacy per-user upload: delete file from filesystem
             parts = photo_url.split('/')
             if len(parts) >= 2:
                 file_owner_id = parts[-2]
-                fname = parts[-1]
+                fname = os.path.basename(parts[-1])
                 file_path = os.path.join(upload_base_folder, file_owner_id, fname)
                 if os.path.exists(file_path):
                     os.remove(file_path)
-
-        db.collection('photos').document(photo_id).delete()
+                remove_derivatives(file_path)
 
         write_audit_log(
             user_id=getattr(user, 'id'),
@@ -203,19 +790,28 @@ def delete_photo(photo_id):
 
 @photos_bp.route('/profile/<profile_id>', methods=['GET'])
 def get_profile_photos(profile_id):
-    """Get all photos for a profile (public metadata only — no raw files)"""
+    """Get all photos for a profile (public metadata only — no raw files).
+
+    Signed URLs are included for signed-in viewers only.
+    """
     try:
+        firebase_user = firebase_user_from_request()
+        viewer_id = firebase_user.get('uid') if firebase_user else None
         photos_ref = db.collection('photos').where('profile_id', '==', profile_id).stream()
 
         result = []
         for doc in photos_ref:
             photo = doc.to_dict()
-            result.append({
+            item = {
                 'id': photo.get('id'),
                 'photo_url': photo.get('photo_url'),
+                'signed_url': photo_url_for(photo.get('photo_url'), viewer_id),
                 'is_primary': photo.get('is_primary', False),
                 'upload_date': photo.get('upload_date'),
-            })
+            }
+            if viewer_id and photo.get('derivatives_status') == STATUS_READY and photo.get('photo_url'):
+                item['sizes'] = {size: sign_photo_url(f"{photo['photo_url']}?size={size}") for size in SIZES}
+            result.append(item)
 
         return jsonify({'photos': result}), 200
 
@@ -2,6 +2,8 @@ from flask import Blueprint, request, jsonify
 from app.services.auth_service import firebase_auth_required
 from app.models import User, Profile, EmployerProfile, HousegirlProfile, AgencyProfile
 from app.firebase_init import db
+from app.services.employer_snapshot import refresh_employer_snapshot
+from app.services.photo_store import foreign_photo_url
 import uuid
 from datetime import datetime
 import logging
@@ -203,6 +205,10 @@ def create_profile():
             return jsonify({'error': 'Unauthorized'}), 401
             
         data = request.get_json()
+
+        invalid_photo = foreign_photo_url(data or {}, getattr(user, 'id'))
+        if invalid_photo:
+            return jsonify({'error': f'{invalid_photo} must be one of your own photos'}), 400
         
         # Check if profile already exists
         existing_profiles = list(db.collection('profiles').where('user_id', '==', getattr(user, 'id')).limit(1).stream())
@@ -298,6 +304,10 @@ def update_profile(profile_id):
             
         if profile_doc.to_dict().get('user_id') != getattr(user, 'id'):
             return jsonify({'error': 'Unauthorized'}), 403
+
+        invalid_photo = foreign_photo_url(data or {}, getattr(user, 'id'))
+        if invalid_photo:
+            return jsonify({'error': f'{invalid_photo} must be one of your own photos'}), 400
         
         user_type = getattr(user, 'user_type', '')
         
@@ -305,17 +315,20 @@ def update_profile(profile_id):
         def update_typed_doc(collection_name, allowed_fields):
             docs = list(db.collection(collection_name).where('profile_id', '==', profile_id).limit(1).stream())
             if not docs:
-                return
+                return False
             
             doc_id = docs[0].id
             updates = {k: data[k] for k in allowed_fields if k in data}
             if updates:
                 updates['updated_at'] = datetime.utcnow().isoformat()
                 db.collection(collection_name).document(doc_id).update(updates)
+            return bool(updates)
                 
         # Update type-specific profile
         if user_type == 'employer':
-            update_typed_doc('employer_profiles', ['company_name', 'location', 'description'])
+            if update_typed_doc('employer_profiles', ['company_name', 'location', 'description']):
+                # Keep the employer details embedded on their job postings current
+                refresh_employer_snapshot(getattr(user, 'id'))
                 
         elif user_type == 'housegirl':
             update_typed_doc('housegirl_profiles', ['age', 'bio', 'current_location', 'location', 
@@ -0,0 +1,21 @@
+"""
+Shared query paths for job applications.
+
+The "my applications" list and the dashboard count both start from
+`applications_for_housegirl`, so they always agree on what is counted.
+Counts use Firestore aggregation queries rather than streaming every
+application document.
+"""
+from app.firebase_init import db
+
+
+def applications_for_housegirl(housegirl_id: str, status: str = None):
+    query = db.collection('job_applications').where('housegirl_id', '==', housegirl_id)
+    if status:
+        query = query.where('status', '==', status)
+    return query
+
+
+def count_matching(query) -> int:
+    """Server-side count of the documents a query matches."""
+    return query.count(alias='total').get()[0][0].value
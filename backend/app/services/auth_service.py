@@ -94,6 +94,13 @@ def verify_firebase_token(token):
         print(f"Firebase token verification error: {e}")
         return None
 
+def firebase_user_from_request():
+    """Verified Firebase token of the caller, or None for anonymous requests"""
+    auth_header = request.headers.get('Authorization', '')
+    if not auth_header.startswith('Bearer '):
+        return None
+    return verify_firebase_token(auth_header.split(' ')[1])
+
 def firebase_auth_required(f):
     """Decorator to require Firebase authentication"""
     @wraps(f)
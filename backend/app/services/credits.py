@@ -0,0 +1,229 @@
+"""
+Contact-credit balances backed by an append-only ledger.
+
+Each user has one `credit_balances/{user_id}` document holding running
+totals, so reading a balance is a single document get. Every change to a
+balance is made inside a Firestore transaction that also appends an entry to
+`credit_ledger`, which makes the ledger the audit trail the balance can be
+rebuilt from.
+
+- Purchases are credited in the same transaction that flips the purchase
+  from 'pending' to 'completed' (and updates the user's purchase summary),
+  so a repeated M-Pesa callback cannot credit twice.
+- Unlocks debit the balance, create the `contact_access` document and bump
+  the housegirl's `unlock_count` in one transaction, so two concurrent
+  unlocks cannot both spend the last credit.
+
+Users whose balance predates this module are seeded once from their
+completed purchases and existing unlocks.
+"""
+import logging
+import uuid
+from datetime import datetime
+
+from firebase_admin import firestore
+from google.api_core.exceptions import AlreadyExists
+
+from app.firebase_init import db
+from app.services.package_catalog import package_catalog
+from app.services.purchase_summaries import summary_ref, completion_increments, failure_increments
+
+logger = logging.getLogger(__name__)
+
+BALANCES = 'credit_balances'
+LEDGER = 'credit_ledger'
+
+ENTRY_SEED = 'seed'
+ENTRY_PURCHASE = 'purchase_credit'
+ENTRY_UNLOCK = 'unlock_debit'
+
+# Unlocks after which a housegirl is flagged as in demand and hidden
+IN_DEMAND_UNLOCKS = 3
+
+
+class InsufficientCredits(Exception):
+    """Raised inside an unlock transaction when the user has no credits left."""
+
+    def __init__(self, summary: dict):
+        super().__init__('No contact credits available')
+        self.summary = summary
+
+
+def summary_of(balance: dict) -> dict:
+    return {
+        'total_credits': balance.get('total_credits', 0),
+        'used_credits': balance.get('used_credits', 0),
+        'remaining_credits': max(balance.get('remaining_credits', 0), 0)
+    }
+
+
+def _legacy_totals(user_id: str) -> dict:
+    """Recompute a balance from purchases and unlocks (only used to seed a new balance doc)."""
+    purchases = db.collection('user_purchases').where('user_id', '==', user_id).where('status', '==', 'completed').stream()
+    total_credits = 0
+    for p_doc in purchases:
+        p_data = p_doc.to_dict()
+        contacts = p_data.get('contacts_included')
+        if contacts is None:
+            contacts = package_catalog.contacts_for(p_data.get('package_id'))
+        total_credits += contacts or 0
+
+    used_query = db.collection('contact_access').where('user_id', '==', user_id)
+    used_credits = used_query.count(alias='total').get()[0][0].value
+    return {
+        'total_credits': total_credits,
+        'used_credits': used_credits,
+        'remaining_credits': max(total_credits - used_credits, 0)
+    }
+
+
+def _ledger_entry(user_id: str, entry_type: str, delta: int, balance_after: dict, reference: str = None) -> tuple:
+    entry_id = str(uuid.uuid4())
+    return db.collection(LEDGER).document(entry_id), {
+        'id': entry_id,
+        'user_id': user_id,
+        'type': entry_type,
+        'delta': delta,
+        'reference': reference,
+        'balance_after': balance_after.get('remaining_credits', 0),
+        'created_at': datetime.utcnow().isoformat()
+    }
+
+
+def ensure_balance(user_id: str) -> dict:
+    """Return the user's balance doc, seeding it from legacy data the first time."""
+    ref = db.collection(BALANCES).document(user_id)
+    snapshot = ref.get()
+    if snapshot.exists:
+        return snapshot.to_dict()
+
+    totals = _legacy_totals(user_id)
+    balance = {'user_id': user_id, **totals, 'updated_at': datetime.utcnow().isoformat()}
+    entry_ref, entry = _ledger_entry(user_id, ENTRY_SEED, totals['remaining_credits'], balance)
+    try:
+        ref.create(balance)
+    except AlreadyExists:
+        # Another request seeded it first; theirs wins
+        return ref.get().to_dict()
+    entry_ref.set(entry)
+    return balance
+
+
+def get_balance_summary(user_id: str) -> dict:
+    return summary_of(ensure_balance(user_id))
+
+
+def complete_purchase(purchase_ref, purchase_updates: dict, contacts: int) -> bool:
+    """
+    Mark a pending purchase completed and credit its contacts atomically.
+
+    Returns False (and writes nothing) when the purchase is no longer pending,
+    which makes duplicate callbacks harmless.
+    """
+    purchase = purchase_ref.get().to_dict() or {}
+    user_id = purchase.get('user_id')
+    if user_id and contacts:
+        ensure_balance(user_id)
+    balance_ref = db.collection(BALANCES).document(user_id) if user_id else None
+    amount = purchase_updates.get('amount_paid') or purchase.get('amount')
+
+    @firestore.transactional
+    def run(transaction):
+        current = purchase_ref.get(transaction=transaction)
+        if not current.exists or current.to_dict().get('status') != 'pending':
+            return False
+        balance_snapshot = balance_ref.get(transaction=transaction) if balance_ref and contacts else None
+        summary_snapshot = summary_ref(user_id).get(transaction=transaction) if user_id else None
+
+        transaction.update(purchase_ref, purchase_updates)
+        if summary_snapshot is not None and summary_snapshot.exists:
+            transaction.update(summary_ref(user_id), completion_increments(amount, contacts))
+        if balance_snapshot is not None:
+            balance = balance_snapshot.to_dict() or {'user_id': user_id}
+            balance = {
+                **balance,
+                'total_credits': balance.get('total_credits', 0) + contacts,
+                'remaining_credits': balance.get('remaining_credits', 0) + contacts,
+                'updated_at': datetime.utcnow().isoformat()
+            }
+            transaction.set(balance_ref, balance)
+            entry_ref, entry = _ledger_entry(user_id, ENTRY_PURCHASE, contacts, balance, purchase_ref.id)
+            transaction.set(entry_ref, entry)
+        return True
+
+    return run(db.transaction())
+
+
+def fail_purchase(purchase_ref, purchase_updates: dict) -> bool:
+    """Mark a pending purchase failed; returns False if it was already settled."""
+
+    @firestore.transactional
+    def run(transaction):
+        current = purchase_ref.get(transaction=transaction)
+        if not current.exists or current.to_dict().get('status') != 'pending':
+            return False
+        user_id = current.to_dict().get('user_id')
+        summary_snapshot = summary_ref(user_id).get(transaction=transaction) if user_id else None
+
+        transaction.update(purchase_ref, purchase_updates)
+        if summary_snapshot is not None and summary_snapshot.exists:
+            transaction.update(summary_ref(user_id), failure_increments())
+        return True
+
+    return run(db.transaction())
+
+
+def unlock_with_credit(user_id: str, access_id: str, access_data: dict, housegirl_id: str = None) -> dict:
+    """
+    Spend one credit to create a contact_access record.
+
+    Raises InsufficientCredits if the balance is empty. Returns the updated
+    credit summary, or None if the contact was already unlocked (checked
+    inside the transaction so a double submit cannot spend twice).
+    """
+    ensure_balance(user_id)
+    balance_ref = db.collection(BALANCES).document(user_id)
+    access_ref = db.collection('contact_access').document(access_id)
+    existing_query = (
+        db.collection('contact_access')
+        .where('user_id', '==', user_id)
+        .where('target_profile_id', '==', access_data.get('target_profile_id'))
+        .limit(1)
+    )
+    housegirl_ref = db.collection('housegirl_profiles').document(housegirl_id) if housegirl_id else None
+
+    @firestore.transactional
+    def run(transaction):
+        balance = balance_ref.get(transaction=transaction).to_dict() or {}
+        if list(transaction.get(existing_query)):
+            return None
+        housegirl_snapshot = housegirl_ref.get(transaction=transaction) if housegirl_ref else None
+        if balance.get('remaining_credits', 0) <= 0:
+            raise InsufficientCredits(summary_of(balance))
+
+        timestamp = datetime.utcnow().isoformat()
+        balance = {
+            **balance,
+            'used_credits': balance.get('used_credits', 0) + 1,
+            'remaining_credits': balance.get('remaining_credits', 0) - 1,
+            'updated_at': timestamp
+        }
+        transaction.set(balance_ref, balance)
+        transaction.set(access_ref, access_data)
+        entry_ref, entry = _ledger_entry(user_id, ENTRY_UNLOCK, -1, balance, access_id)
+        transaction.set(entry_ref, entry)
+
+        if housegirl_snapshot is not None and housegirl_snapshot.exists:
+            housegirl = housegirl_snapshot.to_dict()
+            unlock_count = housegirl.get('unlock_count', 0) + 1
+            updates = {
+                'unlock_count': unlock_count,
+                'is_available': unlock_count < IN_DEMAND_UNLOCKS,
+                'updated_at': timestamp
+            }
+            if unlock_count >= IN_DEMAND_UNLOCKS:
+                updates['in_demand_alert'] = True
+            transaction.set(housegirl_ref, updates, merge=True)
+        return summary_of(balance)
+
+    return run(db.transaction())
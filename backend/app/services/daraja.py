@@ -0,0 +1,151 @@
+"""
+Safaricom Daraja (M-Pesa) API client used by the payments blueprint and the
+pending-payment reconciler.
+
+`DARAJA_BASE_URL` points every call at the sandbox, production, or a local
+stub server (see scripts/stub_daraja.py), so the whole payment flow can be
+exercised without Safaricom.
+"""
+import base64
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+
+import requests
+
+from app.utils.latency import timed
+
+logger = logging.getLogger(__name__)
+
+DARAJA_BASE_URL = os.getenv('DARAJA_BASE_URL', 'https://sandbox.safaricom.co.ke')
+DARAJA_SHORTCODE = os.getenv('DARAJA_SHORTCODE', '174379')
+DARAJA_PASSKEY = os.getenv('DARAJA_PASSKEY', '')
+DARAJA_CONSUMER_KEY = os.getenv('DARAJA_CONSUMER_KEY', '')
+DARAJA_CONSUMER_SECRET = os.getenv('DARAJA_CONSUMER_SECRET', '')
+DARAJA_CALLBACK_URL = os.getenv('DARAJA_CALLBACK_URL', 'https://example.com/api/payments/mpesa-callback')
+
+REQUEST_TIMEOUT = 20
+# Refresh the OAuth token this many seconds before Daraja says it expires
+TOKEN_EXPIRY_MARGIN = 60
+
+# STK query outcomes
+STATUS_COMPLETED = 'completed'
+STATUS_FAILED = 'failed'
+STATUS_PROCESSING = 'processing'
+STATUS_UNKNOWN = 'unknown'
+
+# Daraja answers a query for a transaction the customer has not finished yet
+# with an HTTP error carrying this code instead of a ResultCode.
+PROCESSING_ERROR_CODE = '500.001.1001'
+
+
+class DarajaClient:
+    """Thin wrapper over the Daraja endpoints with a cached OAuth token."""
+
+    def __init__(self, base_url: str = DARAJA_BASE_URL, shortcode: str = DARAJA_SHORTCODE,
+                 passkey: str = DARAJA_PASSKEY, consumer_key: str = DARAJA_CONSUMER_KEY,
+                 consumer_secret: str = DARAJA_CONSUMER_SECRET, callback_url: str = DARAJA_CALLBACK_URL,
+                 timeout: float = REQUEST_TIMEOUT):
+        self.base_url = base_url.rstrip('/')
+        self.shortcode = shortcode
+        self.passkey = passkey
+        self.consumer_key = consumer_key
+        self.consumer_secret = consumer_secret
+        self.callback_url = callback_url
+        self.timeout = timeout
+        self.session = requests.Session()
+        self._token_lock = threading.Lock()
+        self._token = None
+        self._token_expires_at = 0.0
+
+    def access_token(self) -> str:
+        with self._token_lock:
+            if self._token and time.monotonic() < self._token_expires_at:
+                return self._token
+            credentials = f"{self.consumer_key}:{self.consumer_secret}"
+            encoded_credentials = base64.b64encode(credentials.encode('utf-8')).decode('utf-8')
+            with timed('daraja_request_seconds', endpoint='oauth'):
+                token_response = self.session.get(
+                    f"{self.base_url}/oauth/v1/generate?grant_type=client_credentials",
+                    headers={"Authorization": f"Basic {encoded_credentials}"},
+                    timeout=self.timeout
+                )
+            token_response.raise_for_status()
+            token_json = token_response.json()
+            expires_in = int(token_json.get('expires_in') or 0)
+            self._token = token_json.get('access_token')
+            self._token_expires_at = time.monotonic() + max(expires_in - TOKEN_EXPIRY_MARGIN, 0)
+            return self._token
+
+    def _password(self) -> tuple:
+        timestamp = datetime.utcnow().strftime('%Y%m%d%H%M%S')
+        password = base64.b64encode(f"{self.shortcode}{self.passkey}{timestamp}".encode('utf-8')).decode('utf-8')
+        return password, timestamp
+
+    def _post(self, endpoint: str, path: str, payload: dict) -> requests.Response:
+        headers = {"Authorization": f"Bearer {self.access_token()}"}
+        with timed('daraja_request_seconds', endpoint=endpoint):
+            return self.session.post(f"{self.base_url}{path}", json=payload, headers=headers, timeout=self.timeout)
+
+    def stk_push(self, phone, amount, reference) -> dict:
+        # TODO: Switch to production Daraja credentials before go-live
+        password, timestamp = self._password()
+        response = self._post('stk_push', '/mpesa/stkpush/v1/processrequest', {
+            "BusinessShortCode": self.shortcode,
+            "Password": password,
+            "Timestamp": timestamp,
+            "TransactionType": "CustomerPayBillOnline",
+            "Amount": int(amount),
+            "PartyA": str(phone),
+            "PartyB": self.shortcode,
+            "PhoneNumber": str(phone),
+            "CallBackURL": self.callback_url,
+            "AccountReference": str(reference),
+            "TransactionDesc": "Domestic Connect contact purchase"
+        })
+        response.raise_for_status()
+        return response.json()
+
+    def stk_query(self, checkout_request_id: str) -> dict:
+        """
+        Ask Daraja for the outcome of an STK push.
+
+        Returns {'status', 'result_code', 'result_desc'} where status is one of
+        completed / failed / processing / unknown. Never raises for a Daraja
+        error response; network errors propagate.
+        """
+        password, timestamp = self._password()
+        response = self._post('stk_query', '/mpesa/stkpushquery/v1/query', {
+            "BusinessShortCode": self.shortcode,
+            "Password": password,
+            "Timestamp": timestamp,
+            "CheckoutRequestID": checkout_request_id
+        })
+        try:
+            body = response.json()
+        except ValueError:
+            body = {}
+
+        if body.get('errorCode') == PROCESSING_ERROR_CODE:
+            return {'status': STATUS_PROCESSING, 'result_code': None, 'result_desc': body.get('errorMessage')}
+        result_code = body.get('ResultCode')
+        if response.status_code != 200 or result_code is None:
+            return {
+                'status': STATUS_UNKNOWN,
+                'result_code': None,
+                'result_desc': body.get('errorMessage') or f'HTTP {response.status_code}'
+            }
+        return {
+            'status': STATUS_COMPLETED if str(result_code) == '0' else STATUS_FAILED,
+            'result_code': int(result_code) if str(result_code).lstrip('-').isdigit() else result_code,
+            'result_desc': body.get('ResultDesc')
+        }
+
+
+daraja = DarajaClient()
+
+
+def initiate_stk_push(phone, amount, reference) -> dict:
+    return daraja.stk_push(phone, amount, reference)
@@ -0,0 +1,139 @@
+"""
+Denormalized employer details embedded on job postings.
+
+Rendering a job used to cost three sequential lookups per posting (users,
+profiles, employer_profiles). Each `job_postings` doc now carries an
+`employer_snapshot` with the fields listings display, written when the job
+is created and re-propagated to all of an employer's jobs whenever their
+profile or name changes. Legacy jobs without a snapshot are filled in
+lazily the first time they are rendered.
+"""
+import logging
+from datetime import datetime
+
+from app.firebase_init import db
+from app.utils.firestore_batch import get_all_by_id
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_FIELD = 'employer_snapshot'
+BATCH_SIZE = 500
+
+
+def _employer_profile_for(employer_id: str) -> dict:
+    by_user_id = next(
+        db.collection('employer_profiles').where('user_id', '==', employer_id).limit(1).stream(),
+        None
+    )
+    if by_user_id:
+        return by_user_id.to_dict()
+    prof_docs = list(db.collection('profiles').where('user_id', '==', employer_id).limit(1).stream())
+    if not prof_docs:
+        return {}
+    prof_id = prof_docs[0].to_dict().get('id')
+    emp_prof_docs = list(db.collection('employer_profiles').where('profile_id', '==', prof_id).limit(1).stream())
+    return emp_prof_docs[0].to_dict() if emp_prof_docs else {}
+
+
+def build_employer_snapshot(employer_id: str, user_data: dict = None, employer_profile: dict = None) -> dict:
+    """Resolve the display fields for an employer; pass docs already in hand to skip reads."""
+    if user_data is None:
+        user_doc = db.collection('users').document(employer_id).get()
+        user_data = user_doc.to_dict() if user_doc.exists else {}
+    if employer_profile is None:
+        employer_profile = _employer_profile_for(employer_id)
+
+    name = f"{user_data.get('first_name', '')} {user_data.get('last_name', '')}".strip()
+    return {
+        'name': name or (employer_profile.get('full_name') or '').strip(),
+        'email': user_data.get('email'),
+        'phone_number': user_data.get('phone_number') or employer_profile.get('phone'),
+        'company_name': employer_profile.get('company_name'),
+        'company_location': employer_profile.get('location'),
+        'photo': employer_profile.get('profile_photo_url') or user_data.get('profile_photo_url') or user_data.get('photo_url'),
+        'updated_at': datetime.utcnow().isoformat()
+    }
+
+
+def _same(a: dict, b: dict) -> bool:
+    strip = lambda snap: {k: v for k, v in (snap or {}).items() if k != 'updated_at'}
+    return strip(a) == strip(b)
+
+
+def propagate_employer_snapshot(employer_id: str, snapshot: dict = None) -> int:
+    """Write the employer's current snapshot onto all of their jobs. Returns jobs updated."""
+    if not employer_id:
+        return 0
+    snapshot = snapshot or build_employer_snapshot(employer_id)
+    batch = db.batch()
+    pending = 0
+    updated = 0
+    for doc in db.collection('job_postings').where('employer_id', '==', employer_id).stream():
+        if _same(doc.to_dict().get(SNAPSHOT_FIELD), snapshot):
+            continue
+        batch.update(doc.reference, {SNAPSHOT_FIELD: snapshot})
+        pending += 1
+        updated += 1
+        if pending >= BATCH_SIZE:
+            batch.commit()
+            batch = db.batch()
+            pending = 0
+    if pending:
+        batch.commit()
+    logger.info(f'Propagated employer snapshot for {employer_id} to {updated} jobs')
+    return updated
+
+
+def refresh_employer_snapshot(employer_id: str) -> None:
+    """Best-effort propagation used from write paths; never fails the caller's request."""
+    try:
+        propagate_employer_snapshot(employer_id)
+    except Exception as e:
+        logger.error(f'Employer snapshot propagation failed for {employer_id}: {str(e)}')
+
+
+def employer_snapshot_for(job: dict, doc_ref=None) -> dict:
+    """Return the job's embedded snapshot, building and storing one for legacy jobs."""
+    snapshot = job.get(SNAPSHOT_FIELD)
+    if snapshot:
+        return snapshot
+    employer_id = job.get('employer_id')
+    if not employer_id:
+        return {}
+    snapshot = build_employer_snapshot(employer_id)
+    ref = doc_ref or (db.collection('job_postings').document(job['id']) if job.get('id') else None)
+    if ref is not None:
+        try:
+            ref.set({SNAPSHOT_FIELD: snapshot}, merge=True)
+        except Exception as e:
+            logger.warning(f'Could not store employer snapshot on job {job.get("id")}: {str(e)}')
+    return snapshot
+
+
+def snapshots_for_jobs(jobs: dict) -> dict:
+    """
+    Return {job_id: snapshot} for many jobs at once.
+
+    Jobs that already embed a snapshot cost nothing; the employers of the
+    remaining legacy jobs are resolved with one batched users read and one
+    batched employer_profiles read instead of three lookups per job.
+    """
+    snapshots = {}
+    missing = {}
+    for job_id, job in jobs.items():
+        if job.get(SNAPSHOT_FIELD):
+            snapshots[job_id] = job[SNAPSHOT_FIELD]
+        elif job.get('employer_id'):
+            missing.setdefault(job['employer_id'], []).append(job_id)
+
+    if missing:
+        users = get_all_by_id('users', missing.keys())
+        employer_profiles = get_all_by_id('employer_profiles', missing.keys())
+        for employer_id, job_ids in missing.items():
+            employer_profile = employer_profiles.get(employer_id)
+            if employer_profile is None:
+                employer_profile = _employer_profile_for(employer_id)
+            snapshot = build_employer_snapshot(employer_id, users.get(employer_id, {}), employer_profile)
+            for job_id in job_ids:
+                snapshots[job_id] = snapshot
+    return snapshots
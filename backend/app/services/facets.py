@@ -0,0 +1,343 @@
+"""
+Faceted filter counts for the housegirl browse page.
+
+Every indexed profile gets a dense ordinal, and every facet value keeps a
+posting bitmap (a Python int with one bit per ordinal). Counting "how many
+workers match the current filters AND have value v" is then a couple of
+big-int ANDs plus `int.bit_count()`, with no Firestore reads.
+
+Counts are disjunctive: the count for a facet ignores that facet's own
+filter, so users can see what switching to a different value would give.
+
+The index loads itself from Firestore on first use (that request waits for
+it) and reloads in the background every FACET_MAX_AGE_SECONDS, so counts do
+not depend on which listing path has run in this worker. Profile writes and
+the full-scan listing keep it current in between.
+"""
+import logging
+import re
+import threading
+import time
+
+from app.services.skills_vocabulary import LANGUAGES, SKILLS
+
+logger = logging.getLogger(__name__)
+
+FACET_MAX_AGE_SECONDS = 300
+FIRST_LOAD_TIMEOUT_SECONDS = 30
+
+# (low inclusive, high exclusive or None, label). Mirrors SALARY_RANGES in the
+# frontend constants; keep them in sync.
+SALARY_BANDS = (
+    (0, 10000, 'Below KES 10,000'),
+    (10000, 15000, 'KES 10,000 - 15,000'),
+    (15000, 20000, 'KES 15,000 - 20,000'),
+    (20000, 25000, 'KES 20,000 - 25,000'),
+    (25000, 30000, 'KES 25,000 - 30,000'),
+    (30000, 35000, 'KES 30,000 - 35,000'),
+    (35000, None, 'KES 35,000+'),
+)
+
+FACETS = ('location', 'education', 'experience', 'accommodation_type', 'tribe', 'salary_band', 'skills',
+          'languages')
+
+_SPACE_RE = re.compile(r'\s+')
+
+
+def _key(value) -> str:
+    return _SPACE_RE.sub(' ', str(value or '')).strip().lower()
+
+
+def _salary_of(profile: dict):
+    try:
+        return float(profile.get('expected_salary') or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def salary_band_key(salary) -> str:
+    for low, high, _label in SALARY_BANDS:
+        if salary >= low and (high is None or salary < high):
+            return f'{low}-{high or ""}'
+    return ''
+
+
+_BAND_LABELS = {f'{low}-{high or ""}': label for low, high, label in SALARY_BANDS}
+
+
+def facet_values(profile: dict, user_data: dict = None) -> dict:
+    """Return {facet: ((key, label), ...)} for a profile; facets may be multi-valued."""
+    user_data = user_data or {}
+    values = {}
+
+    locations = []
+    for raw in (profile.get('location') or user_data.get('location'), profile.get('current_location')):
+        if _key(raw) and _key(raw) not in [key for key, _ in locations]:
+            locations.append((_key(raw), str(raw).strip()))
+    values['location'] = tuple(locations)
+
+    for facet in ('education', 'experience', 'accommodation_type', 'tribe'):
+        raw = profile.get(facet)
+        values[facet] = ((_key(raw), str(raw).strip()),) if _key(raw) else ()
+
+    band = salary_band_key(_salary_of(profile))
+    values['salary_band'] = ((band, _BAND_LABELS[band]),) if band else ()
+
+    values['skills'] = tuple((term, term) for term in SKILLS.canonicalize(profile.get('skills')))
+    values['languages'] = tuple((term, term) for term in LANGUAGES.canonicalize(profile.get('languages')))
+    return values
+
+
+def _iter_bits(bitmap: int):
+    while bitmap:
+        low = bitmap & -bitmap
+        yield low.bit_length() - 1
+        bitmap ^= low
+
+
+class FacetIndex:
+    """Per-facet-value posting bitmaps, maintained incrementally from profile writes."""
+
+    def __init__(self, source=None, max_age_seconds: int = FACET_MAX_AGE_SECONDS):
+        self._source = source   # iterable of (doc_id, profile, user_data)
+        self.max_age_seconds = max_age_seconds
+        self._loaded_at = None
+        self._loading = False
+        self._loaded = threading.Event()
+        self._changes = None    # writes seen while a load is running, replayed onto it
+        self._lock = threading.Lock()
+        self._ordinals = {}     # doc_id -> ordinal
+        self._free = []         # ordinals released by removed docs
+        self._docs = {}         # ordinal -> (facet values, salary, is_available)
+        self._postings = {facet: {} for facet in FACETS}
+        self._labels = {facet: {} for facet in FACETS}
+        self._all = 0
+        self._available = 0
+
+    def __len__(self) -> int:
+        return len(self._ordinals)
+
+    def update(self, doc_id: str, profile: dict, user_data: dict = None) -> None:
+        with self._lock:
+            if self._changes is not None:
+                self._changes[doc_id] = (profile, user_data)
+        self._apply(doc_id, profile, user_data)
+
+    def _apply(self, doc_id: str, profile: dict, user_data: dict = None) -> None:
+        values = facet_values(profile, user_data)
+        salary = _salary_of(profile)
+        is_available = bool(profile.get('is_available', True))
+        entry = (values, salary, is_available)
+
+        with self._lock:
+            ordinal = self._ordinals.get(doc_id)
+            if ordinal is not None and self._docs.get(ordinal) == entry:
+                return
+            if ordinal is None:
+                ordinal = self._free.pop() if self._free else len(self._ordinals)
+                self._ordinals[doc_id] = ordinal
+            else:
+                self._clear(ordinal)
+
+            bit = 1 << ordinal
+            for facet, pairs in values.items():
+                postings = self._postings[facet]
+                for key, label in pairs:
+                    postings[key] = postings.get(key, 0) | bit
+                    self._labels[facet].setdefault(key, label)
+            self._all |= bit
+            if is_available:
+                self._available |= bit
+            self._docs[ordinal] = entry
+
+    def remove(self, doc_id: str) -> None:
+        with self._lock:
+            if self._changes is not None:
+                self._changes[doc_id] = None
+        self._remove(doc_id)
+
+    def _remove(self, doc_id: str) -> None:
+        with self._lock:
+            ordinal = self._ordinals.pop(doc_id, None)
+            if ordinal is None:
+                return
+            self._clear(ordinal)
+            self._docs.pop(ordinal, None)
+            self._free.append(ordinal)
+
+    def retain(self, doc_ids) -> None:
+        """Drop every indexed doc not in doc_ids (used after a full listing pass)."""
+        keep = set(doc_ids)
+        for doc_id in [doc_id for doc_id in self._ordinals if doc_id not in keep]:
+            self.remove(doc_id)
+
+    def load(self) -> None:
+        """Re-read every profile from `source`, then replay writes made meanwhile."""
+        with self._lock:
+            if self._loading:
+                return
+            self._loading = True
+            self._changes = {}
+        try:
+            started = time.time()
+            seen = set()
+            for doc_id, profile, user_data in self._source():
+                self._apply(doc_id, profile, user_data)
+                seen.add(doc_id)
+            for doc_id in [doc_id for doc_id in self._ordinals if doc_id not in seen]:
+                self._remove(doc_id)
+            with self._lock:
+                changes, self._changes = self._changes, None
+            for doc_id, change in changes.items():
+                if change is None:
+                    self._remove(doc_id)
+                else:
+                    self._apply(doc_id, *change)
+            self._loaded_at = time.time()
+            logger.info(f'housegirl facets: loaded {len(seen)} profiles in {time.time() - started:.2f}s')
+        except Exception as e:
+            logger.error(f'housegirl facets load failed: {str(e)}')
+        finally:
+            with self._lock:
+                self._loading = False
+                self._changes = None
+            self._loaded.set()
+
+    def _ensure_loaded(self) -> None:
+        if self._source is None:
+            return
+        if self._loaded_at is None:
+            # Nothing to count from yet: this request waits for the first load
+            self.load()
+            self._loaded.wait(FIRST_LOAD_TIMEOUT_SECONDS)
+        elif time.time() - self._loaded_at > self.max_age_seconds and not self._loading:
+            threading.Thread(target=self.load, daemon=True).start()
+
+    def _clear(self, ordinal: int) -> None:
+        entry = self._docs.get(ordinal)
+        if not entry:
+            return
+        mask = ~(1 << ordinal)
+        for facet, pairs in entry[0].items():
+            postings = self._postings[facet]
+            for key, _label in pairs:
+                remaining = postings.get(key, 0) & mask
+                if remaining:
+                    postings[key] = remaining
+                else:
+                    postings.pop(key, None)
+        self._all &= mask
+        self._available &= mask
+
+    # ------------------------------------------------------------------
+    # Filters -> bitmaps
+    # ------------------------------------------------------------------
+    def _contains(self, facet: str, needle: str) -> int:
+        needle = _key(needle)
+        bitmap = 0
+        for key, posting in self._postings[facet].items():
+            if needle in key:
+                bitmap |= posting
+        return bitmap
+
+    def _salary_range(self, min_salary, max_salary) -> int:
+        bitmap = 0
+        postings = self._postings['salary_band']
+        for low, high, _label in SALARY_BANDS:
+            posting = postings.get(f'{low}-{high or ""}', 0)
+            if not posting:
+                continue
+            band_above_min = min_salary is None or low >= min_salary
+            band_below_max = max_salary is None or (high is not None and high - 1 <= max_salary)
+            if band_above_min and band_below_max:
+                bitmap |= posting
+                continue
+            if (max_salary is not None and low > max_salary) or \
+               (min_salary is not None and high is not None and high <= min_salary):
+                continue
+            # Boundary band: check the individual salaries
+            for ordinal in _iter_bits(posting):
+                salary = self._docs[ordinal][1]
+                if (min_salary is None or salary >= min_salary) and (max_salary is None or salary <= max_salary):
+                    bitmap |= 1 << ordinal
+        return bitmap
+
+    def _filter_bitmaps(self, filters: dict) -> dict:
+        bitmaps = {}
+        for facet in ('location', 'education', 'experience', 'tribe'):
+            if filters.get(facet):
+                bitmaps[facet] = self._contains(facet, filters[facet])
+        if filters.get('accommodation_type'):
+            bitmaps['accommodation_type'] = self._postings['accommodation_type'].get(
+                _key(filters['accommodation_type']), 0
+            )
+        if filters.get('min_salary') is not None or filters.get('max_salary') is not None:
+            bitmaps['salary_band'] = self._salary_range(filters.get('min_salary'), filters.get('max_salary'))
+        for facet in ('skills', 'languages'):
+            if filters.get(facet):
+                bitmap = self._all
+                for term in filters[facet]:
+                    bitmap &= self._postings[facet].get(term, 0)
+                bitmaps[facet] = bitmap
+        return bitmaps
+
+    def counts(self, filters: dict, is_available=True) -> dict:
+        """
+        Return {'total': n, 'facets': {facet: [{'value', 'label', 'count'}]}}.
+
+        `is_available` selects the worker universe: True (default) counts
+        available workers, False unavailable ones, None everyone.
+        """
+        self._ensure_loaded()
+        with self._lock:
+            if is_available is None:
+                universe = self._all
+            elif is_available:
+                universe = self._available
+            else:
+                universe = self._all & ~self._available
+
+            bitmaps = self._filter_bitmaps(filters)
+            matched = universe
+            for bitmap in bitmaps.values():
+                matched &= bitmap
+
+            facets = {}
+            for facet in FACETS:
+                base = universe
+                for other, bitmap in bitmaps.items():
+                    if other != facet:
+                        base &= bitmap
+                buckets = []
+                for key, posting in self._postings[facet].items():
+                    count = (posting & base).bit_count()
+                    if count:
+                        buckets.append({
+                            'value': key,
+                            'label': self._labels[facet].get(key, key),
+                            'count': count
+                        })
+                buckets.sort(key=lambda bucket: (-bucket['count'], bucket['label']))
+                facets[facet] = buckets
+
+            return {'total': matched.bit_count(), 'facets': facets}
+
+
+def _stream_housegirls():
+    """(listing id, profile, user_data) for every worker the housegirl listing can show."""
+    # Import here to avoid circular imports at module load time
+    from app.firebase_init import db
+    from app.utils.firestore_batch import get_all_by_id
+
+    users = {doc.id: doc.to_dict() or {} for doc in db.collection('users').where('user_type', '==', 'housegirl').stream()}
+    profiles = {}
+    for doc in db.collection('housegirl_profiles').stream():
+        profile = doc.to_dict() or {}
+        profiles[profile.get('user_id') or doc.id] = profile
+    users.update(get_all_by_id('users', [user_id for user_id in profiles if user_id not in users]))
+
+    for user_id in users.keys() | profiles.keys():
+        yield user_id, profiles.get(user_id, {}), users.get(user_id, {})
+
+
+housegirl_facets = FacetIndex(source=_stream_housegirls)
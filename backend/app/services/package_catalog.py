@@ -0,0 +1,124 @@
+"""
+In-process cache of the payment package catalog.
+
+Packages change rarely, so every worker keeps the whole catalog in memory.
+A single version document (`system_config/payment_packages`) is checked at
+most once every `check_interval` seconds; when its version differs from the
+one loaded, the catalog is reloaded. Admin edits bump the version so all
+workers pick the change up within one check interval, and a hard max age
+bounds staleness even if a bump is missed.
+"""
+import logging
+import threading
+import time
+from datetime import datetime
+
+from firebase_admin import firestore
+
+from app.firebase_init import db
+
+logger = logging.getLogger(__name__)
+
+PACKAGES = 'payment_packages'
+VERSION_DOC = ('system_config', 'payment_packages')
+
+CHECK_INTERVAL_SECONDS = 30
+MAX_AGE_SECONDS = 60 * 60
+
+
+class PackageCatalog:
+    """Versioned, lazily refreshed snapshot of `payment_packages`."""
+
+    def __init__(self, check_interval: float = CHECK_INTERVAL_SECONDS, max_age: float = MAX_AGE_SECONDS):
+        self.check_interval = check_interval
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._packages = {}
+        self._version = None
+        self._loaded_at = 0.0
+        self._checked_at = 0.0
+
+    @property
+    def version(self):
+        return self._version
+
+    def _version_ref(self):
+        return db.collection(VERSION_DOC[0]).document(VERSION_DOC[1])
+
+    def _remote_version(self) -> int:
+        snapshot = self._version_ref().get()
+        return (snapshot.to_dict() or {}).get('version', 0) if snapshot.exists else 0
+
+    def load(self) -> None:
+        """(Re)load every package; one collection read."""
+        version = self._remote_version()
+        packages = {}
+        for doc in db.collection(PACKAGES).stream():
+            data = doc.to_dict() or {}
+            packages[data.get('id') or doc.id] = data
+        now = time.monotonic()
+        with self._lock:
+            self._packages = packages
+            self._version = version
+            self._loaded_at = now
+            self._checked_at = now
+        logger.info(f'Loaded {len(packages)} payment packages (catalog version {version})')
+
+    def _ensure_fresh(self) -> None:
+        now = time.monotonic()
+        if self._version is not None and now - self._checked_at < self.check_interval:
+            return
+        if self._version is None or now - self._loaded_at >= self.max_age:
+            self.load()
+            return
+        remote = self._remote_version()
+        if remote != self._version:
+            self.load()
+        else:
+            self._checked_at = now
+
+    def get(self, package_id: str):
+        self._ensure_fresh()
+        return self._packages.get(package_id)
+
+    def active(self) -> list:
+        self._ensure_fresh()
+        return [p for p in self._packages.values() if p.get('is_active')]
+
+    def all(self) -> dict:
+        self._ensure_fresh()
+        return dict(self._packages)
+
+    def name_of(self, package_id: str, default: str = 'Unknown Package') -> str:
+        package = self.get(package_id) if package_id else None
+        return (package or {}).get('name', default)
+
+    def contacts_for(self, package_id: str) -> int:
+        package = self.get(package_id) if package_id else None
+        return (package or {}).get('contacts_included', 0)
+
+    def bump_version(self, updated_by: str = None) -> int:
+        """Invalidate every worker's copy; returns the new version."""
+        self._version_ref().set({
+            'version': firestore.Increment(1),
+            'updated_at': datetime.utcnow().isoformat(),
+            'updated_by': updated_by
+        }, merge=True)
+        self.load()
+        return self._version
+
+    def put(self, package: dict, updated_by: str = None) -> dict:
+        """Write a package and bump the catalog version."""
+        db.collection(PACKAGES).document(package['id']).set(package)
+        self.bump_version(updated_by)
+        return package
+
+    def warm(self) -> None:
+        """Best-effort load at startup; requests fall back to lazy loading."""
+        try:
+            self.load()
+        except Exception as e:
+            logger.warning(f'Payment package catalog not preloaded: {str(e)}')
+
+
+package_catalog = PackageCatalog()
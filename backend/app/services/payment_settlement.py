@@ -0,0 +1,157 @@
+"""
+Settle a pending purchase as completed or failed.
+
+Both the M-Pesa callback and the pending-payment reconciler end up here, so a
+purchase settles the same way whichever one sees the outcome first. The
+status flip happens inside the credit transactions (`complete_purchase` /
+`fail_purchase`), which only act on purchases that are still pending; the
+second caller gets OUTCOME_ALREADY_PROCESSED and writes nothing.
+"""
+import logging
+from datetime import datetime
+
+from app.firebase_init import db
+from app.services.credits import complete_purchase, fail_purchase
+from app.services.package_catalog import package_catalog
+from app.services.payment_stages import (
+    STAGES_FIELD, STAGE_CALLBACK_RECEIVED, STAGE_COMPLETED, STAGE_FAILED, STAGE_RECONCILED,
+    observe_stages, stage_field
+)
+from app.utils.audit_log import write_audit_log, ACTION_PAYMENT_COMPLETED, ACTION_PAYMENT_FAILED
+
+logger = logging.getLogger(__name__)
+
+ACTIVATION_PACKAGE_ID = 'high_demand_activation'
+
+OUTCOME_COMPLETED = 'completed'
+OUTCOME_FAILED = 'failed'
+OUTCOME_ALREADY_PROCESSED = 'already_processed'
+
+SOURCE_CALLBACK = 'callback'
+SOURCE_RECONCILER = 'reconciler'
+
+
+def _reactivate_housegirl(user_id: str) -> None:
+    profiles = list(
+        db.collection('profiles')
+        .where('user_id', '==', user_id)
+        .limit(1)
+        .stream()
+    )
+    if not profiles:
+        return
+    profile_id = profiles[0].to_dict().get('id')
+    if not profile_id:
+        return
+    housegirl_profiles = list(
+        db.collection('housegirl_profiles')
+        .where('profile_id', '==', profile_id)
+        .limit(1)
+        .stream()
+    )
+    if housegirl_profiles:
+        db.collection('housegirl_profiles').document(housegirl_profiles[0].id).set({
+            'unlock_count': 0,
+            'is_available': True,
+            'in_demand_alert': False,
+            'activation_fee_paid': True,
+            'updated_at': datetime.utcnow().isoformat()
+        }, merge=True)
+
+
+def _stage_markers(purchase_data: dict, received_stage: str, received_at: str, settled_stage: str,
+                   timestamp: str) -> tuple:
+    """Field-path updates for the new markers, plus the merged map for the histograms."""
+    markers = {received_stage: received_at, settled_stage: timestamp}
+    updates = {stage_field(stage): value for stage, value in markers.items()}
+    return updates, {**(purchase_data.get(STAGES_FIELD) or {}), **markers}
+
+
+def settle_purchase(purchase_doc, result_code, result_desc: str = None, metadata: dict = None,
+                    source: str = SOURCE_CALLBACK, received_at: str = None) -> str:
+    """
+    Apply a Daraja result to a purchase snapshot.
+
+    `metadata` carries the callback's CallbackMetadata items by name (Amount,
+    MpesaReceiptNumber, PhoneNumber); the reconciler has none and the
+    purchase's own amount and phone number are used instead. `received_at`
+    is when the result reached us (defaults to now).
+    """
+    purchase_data = purchase_doc.to_dict() or {}
+    metadata = metadata or {}
+    checkout_request_id = purchase_data.get('checkout_request_id')
+    timestamp = datetime.utcnow().isoformat()
+    received_stage = STAGE_CALLBACK_RECEIVED if source == SOURCE_CALLBACK else STAGE_RECONCILED
+
+    if int(result_code if result_code is not None else 1) != 0:
+        stage_updates, stages = _stage_markers(
+            purchase_data, received_stage, received_at or timestamp, STAGE_FAILED, timestamp
+        )
+        failed = fail_purchase(purchase_doc.reference, {
+            'status': 'failed',
+            'result_code': result_code,
+            'result_desc': result_desc,
+            'settled_by': source,
+            'updated_at': timestamp,
+            **stage_updates
+        })
+        if not failed:
+            return OUTCOME_ALREADY_PROCESSED
+        observe_stages(stages)
+        write_audit_log(
+            user_id=purchase_data.get('user_id', 'unknown'),
+            action=ACTION_PAYMENT_FAILED,
+            details={
+                'purchase_id': purchase_doc.id,
+                'checkout_request_id': checkout_request_id,
+                'result_code': result_code,
+                'source': source,
+            },
+        )
+        return OUTCOME_FAILED
+
+    amount = metadata.get('Amount', purchase_data.get('amount'))
+    receipt = metadata.get('MpesaReceiptNumber')
+    phone_number = metadata.get('PhoneNumber')
+
+    contacts = purchase_data.get('contacts_included')
+    if contacts is None:
+        contacts = package_catalog.contacts_for(purchase_data.get('package_id'))
+
+    stage_updates, stages = _stage_markers(
+        purchase_data, received_stage, received_at or timestamp, STAGE_COMPLETED, timestamp
+    )
+    # Completing the purchase and crediting the balance is one transaction;
+    # a duplicate callback finds the purchase no longer pending and stops.
+    completed = complete_purchase(purchase_doc.reference, {
+        'status': 'completed',
+        'result_code': result_code,
+        'mpesa_receipt_number': receipt,
+        'amount_paid': amount,
+        'phone_number': phone_number or purchase_data.get('phone_number'),
+        'settled_by': source,
+        'completed_at': timestamp,
+        'updated_at': timestamp,
+        **stage_updates
+    }, contacts or 0)
+    if not completed:
+        return OUTCOME_ALREADY_PROCESSED
+    observe_stages(stages)
+
+    user_id = purchase_data.get('user_id')
+    if purchase_data.get('package_id') == ACTIVATION_PACKAGE_ID and user_id:
+        _reactivate_housegirl(user_id)
+
+    write_audit_log(
+        user_id=purchase_data.get('user_id', 'unknown'),
+        action=ACTION_PAYMENT_COMPLETED,
+        details={
+            'purchase_id': purchase_doc.id,
+            'checkout_request_id': checkout_request_id,
+            'mpesa_receipt': receipt,
+            'amount': amount,
+            'package_id': purchase_data.get('package_id'),
+            'source': source,
+        },
+    )
+    return OUTCOME_COMPLETED
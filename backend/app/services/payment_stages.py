@@ -0,0 +1,108 @@
+"""
+Stage markers on purchases and the latency report built from them.
+
+Every purchase carries a `stages` map of ISO timestamps:
+
+    initiated          create_purchase received the request
+    stk_accepted       Daraja accepted the STK push
+    callback_received  the M-Pesa callback arrived (or `reconciled`, when the
+                       reconciler settled it instead)
+    completed / failed the purchase was settled
+
+Intervals between markers are observed into the in-process
+`payment_stage_seconds` histogram as they happen, and the admin report
+recomputes per-day percentiles from the stored markers.
+"""
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from app.firebase_init import db
+from app.utils.latency import observe, percentile
+
+STAGES_FIELD = 'stages'
+
+STAGE_INITIATED = 'initiated'
+STAGE_STK_ACCEPTED = 'stk_accepted'
+STAGE_CALLBACK_RECEIVED = 'callback_received'
+STAGE_RECONCILED = 'reconciled'
+STAGE_COMPLETED = 'completed'
+STAGE_FAILED = 'failed'
+
+# interval name -> (start stages, end stages); the first stage present wins
+INTERVALS = {
+    'stk_push': ((STAGE_INITIATED,), (STAGE_STK_ACCEPTED,)),
+    'customer_to_callback': ((STAGE_STK_ACCEPTED,), (STAGE_CALLBACK_RECEIVED, STAGE_RECONCILED)),
+    'callback_processing': ((STAGE_CALLBACK_RECEIVED, STAGE_RECONCILED), (STAGE_COMPLETED, STAGE_FAILED)),
+    'end_to_end': ((STAGE_INITIATED,), (STAGE_COMPLETED, STAGE_FAILED)),
+}
+
+REPORT_PERCENTILES = (50, 95, 99)
+MAX_REPORT_DAYS = 31
+
+
+def stage_field(stage: str) -> str:
+    """Field path for one marker, usable in update() without replacing the map."""
+    return f'{STAGES_FIELD}.{stage}'
+
+
+def _parse(value):
+    try:
+        return datetime.fromisoformat(value) if value else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _first(stages: dict, names: tuple):
+    for name in names:
+        parsed = _parse(stages.get(name))
+        if parsed:
+            return parsed
+    return None
+
+
+def stage_durations(stages: dict) -> dict:
+    """Seconds for every interval whose start and end markers are both present."""
+    durations = {}
+    for interval, (starts, ends) in INTERVALS.items():
+        start, end = _first(stages, starts), _first(stages, ends)
+        if start and end and end >= start:
+            durations[interval] = (end - start).total_seconds()
+    return durations
+
+
+def observe_stages(stages: dict) -> None:
+    for interval, seconds in stage_durations(stages).items():
+        observe('payment_stage_seconds', seconds, stage=interval)
+
+
+def latency_report(days: int) -> list:
+    """Per-day percentiles (seconds) of each interval, oldest day first."""
+    since = (datetime.utcnow() - timedelta(days=days)).date().isoformat()
+    query = (
+        db.collection('user_purchases')
+        .where('purchase_date', '>=', since)
+        .select(['purchase_date', 'status', STAGES_FIELD])
+    )
+
+    samples = defaultdict(lambda: defaultdict(list))
+    statuses = defaultdict(lambda: defaultdict(int))
+    for doc in query.stream():
+        purchase = doc.to_dict() or {}
+        day = (purchase.get('purchase_date') or '')[:10]
+        if not day:
+            continue
+        statuses[day][purchase.get('status', 'pending')] += 1
+        for interval, seconds in stage_durations(purchase.get(STAGES_FIELD) or {}).items():
+            samples[day][interval].append(seconds)
+
+    report = []
+    for day in sorted(statuses):
+        intervals = {}
+        for interval in INTERVALS:
+            values = sorted(samples[day][interval])
+            intervals[interval] = {
+                'count': len(values),
+                **{f'p{q}': percentile(values, q) for q in REPORT_PERCENTILES}
+            }
+        report.append({'date': day, 'purchases': dict(statuses[day]), 'intervals': intervals})
+    return report
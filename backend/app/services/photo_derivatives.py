@@ -0,0 +1,197 @@
+"""
+Resized WebP/JPEG derivatives of uploaded photos.
+
+After an upload is saved, `submit` queues it on a small process-wide thread
+pool so the request returns straight away. There is one job per stored
+object, however many photo docs point at it. The worker writes one object per
+(size, format) next to the original in the photo storage backend:
+
+    blobs/3f/a2/3fa2...e9.jpg
+    blobs/3f/a2/3fa2...e9.jpg.thumb.webp
+    blobs/3f/a2/3fa2...e9.jpg.thumb.jpg
+    ...
+
+Derivatives are re-encoded from decoded pixels, so EXIF (including GPS) is
+dropped; orientation is applied first. JPEGs are progressive. When Pillow is
+not installed the photo is marked 'unavailable' and the original is served
+for every size.
+"""
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # pragma: no cover - optional dependency
+    Image = None
+    ImageOps = None
+
+logger = logging.getLogger(__name__)
+
+# Longest edge in pixels
+SIZES = {
+    'thumb': 160,
+    'card': 480,
+    'full': 1280,
+}
+FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+MIME_TYPES = {'webp': 'image/webp', 'jpg': 'image/jpeg'}
+
+STATUS_PENDING = 'pending'
+STATUS_READY = 'ready'
+STATUS_FAILED = 'failed'
+STATUS_UNAVAILABLE = 'unavailable'
+
+DEFAULT_WORKERS = 2
+
+
+def available() -> bool:
+    return Image is not None
+
+
+def derivative_name(filename: str, size: str, ext: str) -> str:
+    return f'{filename}.{size}.{ext}'
+
+
+def derivative_names(filename: str) -> list:
+    return [derivative_name(filename, size, ext) for size in SIZES for ext in FORMATS]
+
+
+def derivative_keys(key: str) -> list:
+    """Storage keys of every derivative of the object at `key`."""
+    return [f'{key}.{size}.{ext}' for size in SIZES for ext in FORMATS]
+
+
+def preferred_format(accept_header: str) -> str:
+    return 'webp' if 'image/webp' in (accept_header or '') else 'jpg'
+
+
+def _save_atomic(image, path: str, ext: str) -> None:
+    fmt, options = FORMATS[ext]
+    # Unique per writer: two jobs for the same object must not share a temp file
+    tmp_path = f'{path}.{uuid.uuid4().hex}.tmp'
+    try:
+        image.save(tmp_path, fmt, **options)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def generate(source_path: str, out_dir: str = None) -> dict:
+    """Write every derivative of `source_path` (into `out_dir`, default its own directory).
+
+    Returns {size: {'width', 'height'}}.
+    """
+    directory, filename = os.path.split(source_path)
+    directory = out_dir or directory
+    with Image.open(source_path) as opened:
+        opened.seek(0)  # first frame of animated GIF/WebP
+        image = ImageOps.exif_transpose(opened)
+        has_alpha = image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info)
+        image = image.convert('RGBA' if has_alpha else 'RGB')
+
+    results = {}
+    for size, edge in SIZES.items():
+        resized = image.copy()
+        # Never upscale: small originals keep their own dimensions
+        resized.thumbnail((edge, edge), Image.LANCZOS)
+        for ext in FORMATS:
+            target = resized
+            if ext == 'jpg' and target.mode == 'RGBA':
+                target = Image.new('RGB', target.size, (255, 255, 255))
+                target.paste(resized, mask=resized.split()[-1])
+            _save_atomic(target, os.path.join(directory, derivative_name(filename, size, ext)), ext)
+        results[size] = {'width': resized.width, 'height': resized.height}
+    return results
+
+
+def remove(source_path: str) -> None:
+    directory, filename = os.path.split(source_path)
+    for name in derivative_names(filename):
+        path = os.path.join(directory, name)
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def _record(photo_ids: list, updates: dict) -> None:
+    # Import here to avoid circular imports at module load time
+    from app.firebase_init import db
+
+    batch = db.batch()
+    for photo_id in photo_ids:
+        batch.set(db.collection('photos').document(photo_id), updates, merge=True)
+    batch.commit()
+
+
+def _generate_into_storage(storage, key: str) -> dict:
+    with storage.local_copy(key) as source_path:
+        if not storage.direct_transfers:
+            # Local backend: the copy is the stored file, write alongside it
+            return generate(source_path)
+        out_dir = tempfile.mkdtemp(prefix='derivatives-')
+        try:
+            sizes = generate(source_path, out_dir)
+            filename = os.path.basename(source_path)
+            for size in SIZES:
+                for ext in FORMATS:
+                    storage.put_file(
+                        os.path.join(out_dir, derivative_name(filename, size, ext)),
+                        f'{key}.{size}.{ext}',
+                        MIME_TYPES[ext]
+                    )
+            return sizes
+        finally:
+            shutil.rmtree(out_dir, ignore_errors=True)
+
+
+def process(photo_ids: list, key: str, storage) -> str:
+    """Generate derivatives for one stored object and record the outcome on every photo doc of it."""
+    if not available():
+        _record(photo_ids, {'derivatives_status': STATUS_UNAVAILABLE})
+        return STATUS_UNAVAILABLE
+    try:
+        sizes = _generate_into_storage(storage, key)
+    except Exception as e:
+        logger.error(f'photo derivatives failed for {key}: {str(e)}')
+        _record(photo_ids, {'derivatives_status': STATUS_FAILED})
+        return STATUS_FAILED
+    _record(photo_ids, {
+        'derivatives_status': STATUS_READY,
+        'derivatives': {'sizes': sizes, 'formats': list(FORMATS)},
+    })
+    return STATUS_READY
+
+
+class DerivativeWorkers:
+    """Lazily started process-wide pool for derivative jobs."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pool = None
+
+    def submit(self, photo_ids: list, key: str, storage, max_workers: int = DEFAULT_WORKERS):
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='photo-derivatives')
+            pool = self._pool
+        return pool.submit(self._run, photo_ids, key, storage)
+
+    @staticmethod
+    def _run(photo_ids: list, key: str, storage) -> str:
+        try:
+            return process(photo_ids, key, storage)
+        except Exception as e:
+            logger.error(f'photo derivative job {key} crashed: {str(e)}')
+            return STATUS_FAILED
+
+
+derivative_workers = DerivativeWorkers()
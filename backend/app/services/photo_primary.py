@@ -0,0 +1,216 @@
+"""
+The primary photo of a profile, mirrored onto its read models.
+
+Listings and detail pages show `profile_photo_url` straight from the docs
+they already read (users, profiles, housegirl_profiles, employer_profiles),
+so they never query `photos`. Every change of primary photo updates those
+docs in the same transaction as the `photos` docs:
+
+- upload: the photo flagged primary, or the first photo of a profile that
+  has none, becomes primary and the previous primary is unset;
+- set_primary: an existing photo is made primary;
+- delete_photo: deleting the primary promotes the most recent remaining
+  photo, or clears the mirrored URL when no photo is left.
+
+`primary_photo_id` is written next to the URL so a mirror can be checked
+against the photo it came from. Job postings embed the employer's photo
+(employer_snapshot), so when an employer_profiles doc is re-pointed the
+snapshot is refreshed once the transaction has committed. A profile_photo_url set directly (an
+external avatar) is replaced by uploads and set_primary, but never cleared
+by a delete.
+"""
+import logging
+from datetime import datetime
+
+from firebase_admin import firestore
+
+from app.services import photo_store
+
+logger = logging.getLogger(__name__)
+
+PHOTOS = 'photos'
+PHOTO_URL_FIELD = 'profile_photo_url'
+PRIMARY_ID_FIELD = 'primary_photo_id'
+ROLE_COLLECTIONS = ('housegirl_profiles', 'employer_profiles')
+
+
+class PhotoNotFound(Exception):
+    """Raised by set_primary when the photo is missing or not the caller's."""
+
+
+def _db():
+    # Import here to avoid circular imports at module load time
+    from app.firebase_init import db
+    return db
+
+
+def _read_models(transaction, user_id: str, profile_id: str) -> list:
+    """Existing read-model docs for a profile (reads only; call before any write)."""
+    db = _db()
+    ids = {user_id, profile_id} - {None, ''}
+    refs = [db.collection('users').document(user_id)] if user_id else []
+    if profile_id:
+        refs.append(db.collection('profiles').document(profile_id))
+    for collection in ROLE_COLLECTIONS:
+        for doc_id in ids:
+            refs.append(db.collection(collection).document(doc_id))
+
+    found = {}
+    for snapshot in transaction.get_all(refs):
+        if snapshot.exists:
+            found[snapshot.reference.path] = snapshot
+    # Role docs created before ids were unified are only reachable by user_id
+    for collection in ROLE_COLLECTIONS if user_id else ():
+        query = db.collection(collection).where('user_id', '==', user_id).limit(5)
+        for snapshot in transaction.get(query):
+            found.setdefault(snapshot.reference.path, snapshot)
+    return list(found.values())
+
+
+def _profile_photos(transaction, profile_id: str) -> list:
+    query = _db().collection(PHOTOS).where('profile_id', '==', profile_id)
+    return list(transaction.get(query))
+
+
+def _mirror(transaction, read_models: list, photo: dict = None, replaced: dict = None) -> bool:
+    """
+    Point read models at `photo` (None clears them). With `replaced`, only
+    the ones still showing that photo are touched, so an avatar set by
+    other means survives the deletion of a photo.
+
+    Returns True when an employer_profiles doc was among those updated.
+    """
+    now = datetime.utcnow().isoformat()
+    employer_mirrored = False
+    for snapshot in read_models:
+        data = snapshot.to_dict() or {}
+        shown = (data.get(PHOTO_URL_FIELD) or '').split('?', 1)[0]
+        if replaced is not None and shown and shown != replaced.get('photo_url'):
+            continue
+        transaction.update(snapshot.reference, {
+            PHOTO_URL_FIELD: photo.get('photo_url') if photo else None,
+            PRIMARY_ID_FIELD: photo.get('id') if photo else None,
+            'updated_at': now,
+        })
+        employer_mirrored = employer_mirrored or snapshot.reference.path.startswith('employer_profiles/')
+    return employer_mirrored
+
+
+def refresh_employer_jobs(user_id: str) -> None:
+    """Re-propagate the employer snapshot after a mirrored photo change has committed."""
+    from app.services.employer_snapshot import refresh_employer_snapshot
+
+    refresh_employer_snapshot(user_id)
+
+
+def add_photos(transaction, photos: list, references: dict, user_id: str, profile_id: str,
+               primary_id: str = None):
+    """
+    Create `photos` docs and their blob references inside `transaction`.
+
+    `references` maps sha256 -> {'ext', 'size', 'mime_type', 'count'}.
+    `primary_id` (one of the new photos) becomes primary; without it, the
+    first new photo does when the profile has no primary yet. Sets each
+    photo's `is_primary`. Returns True when an employer_profiles doc was
+    re-pointed: call `refresh_employer_jobs` once the transaction commits.
+    """
+    existing = _profile_photos(transaction, profile_id)
+    read_models = _read_models(transaction, user_id, profile_id)
+    current = [snapshot for snapshot in existing if (snapshot.to_dict() or {}).get('is_primary')]
+
+    chosen = primary_id
+    if chosen is None and not current and photos:
+        chosen = photos[0]['id']
+
+    db = _db()
+    for photo in photos:
+        photo['is_primary'] = photo['id'] == chosen
+        transaction.set(db.collection(PHOTOS).document(photo['id']), photo)
+    for sha256, blob in references.items():
+        photo_store.add_reference(
+            transaction, sha256, blob['ext'], blob['size'], blob['mime_type'], blob.get('count', 1)
+        )
+    if chosen:
+        for snapshot in current:
+            transaction.update(snapshot.reference, {'is_primary': False})
+        return _mirror(transaction, read_models, next(photo for photo in photos if photo['id'] == chosen))
+    return False
+
+
+def commit_photos(photos: list, references: dict, user_id: str, profile_id: str, primary_id: str = None) -> None:
+    """add_photos in a transaction of its own."""
+    @firestore.transactional
+    def run(transaction):
+        return add_photos(transaction, photos, references, user_id, profile_id, primary_id)
+
+    if run(_db().transaction()):
+        refresh_employer_jobs(user_id)
+
+
+def set_primary(photo_id: str, user_id: str, is_admin: bool = False) -> dict:
+    """Make an existing photo its profile's primary; returns the photo."""
+    db = _db()
+    photo_ref = db.collection(PHOTOS).document(photo_id)
+
+    @firestore.transactional
+    def run(transaction):
+        snapshot = photo_ref.get(transaction=transaction)
+        photo = snapshot.to_dict() if snapshot.exists else None
+        if not photo or (photo.get('owner_user_id') != user_id and not is_admin):
+            raise PhotoNotFound(photo_id)
+        siblings = _profile_photos(transaction, photo.get('profile_id'))
+        read_models = _read_models(transaction, photo.get('owner_user_id'), photo.get('profile_id'))
+
+        for sibling in siblings:
+            if sibling.id != photo_id and (sibling.to_dict() or {}).get('is_primary'):
+                transaction.update(sibling.reference, {'is_primary': False})
+        transaction.update(photo_ref, {'is_primary': True})
+        photo['is_primary'] = True
+        return photo, _mirror(transaction, read_models, photo)
+
+    photo, employer_mirrored = run(db.transaction())
+    if employer_mirrored:
+        refresh_employer_jobs(photo.get('owner_user_id'))
+    return photo
+
+
+def delete_photo(photo_ref, sha256: str = None) -> bool:
+    """
+    Delete a photo doc, drop its blob reference and repair the primary.
+
+    Returns True when that was the blob's last reference (the caller should
+    call `photo_store.remove_blob_files`).
+    """
+    db = _db()
+
+    @firestore.transactional
+    def run(transaction):
+        snapshot = photo_ref.get(transaction=transaction)
+        if not snapshot.exists:
+            return False, None
+        current = snapshot.to_dict() or {}
+        blob_snapshot = photo_store.blob_ref(sha256).get(transaction=transaction) if sha256 else None
+        promoted = None
+        read_models = []
+        if current.get('is_primary'):
+            remaining = [
+                {**(sibling.to_dict() or {}), 'id': sibling.id}
+                for sibling in _profile_photos(transaction, current.get('profile_id'))
+                if sibling.id != photo_ref.id
+            ]
+            promoted = max(remaining, key=lambda p: p.get('upload_date') or '', default=None)
+            read_models = _read_models(transaction, current.get('owner_user_id'), current.get('profile_id'))
+
+        transaction.delete(photo_ref)
+        employer_owner = None
+        if current.get('is_primary'):
+            if promoted:
+                transaction.update(db.collection(PHOTOS).document(promoted['id']), {'is_primary': True})
+            if _mirror(transaction, read_models, promoted, replaced={**current, 'id': photo_ref.id}):
+                employer_owner = current.get('owner_user_id')
+        return photo_store.release_reference(transaction, blob_snapshot), employer_owner
+
+    last_reference, employer_owner = run(db.transaction())
+    if employer_owner:
+        refresh_employer_jobs(employer_owner)
+    return last_reference
@@ -0,0 +1,267 @@
+"""
+Where photo bytes live.
+
+`PHOTO_STORAGE_BACKEND` selects the backend:
+
+- 'local' (default): files under `UPLOAD_FOLDER`, served by the app.
+- 's3': any S3-compatible bucket (AWS, MinIO, R2, ...). Clients upload and
+  download directly with presigned URLs, so no image bytes pass through a
+  gunicorn worker. Needs boto3; set S3_ENDPOINT_URL for non-AWS services.
+
+Objects are addressed by key. Blob keys are `blobs/<aa>/<bb>/<sha256>.<ext>`
+and derivative keys add `.<size>.<ext>` (see photo_store and
+photo_derivatives).
+"""
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import uuid
+from contextlib import contextmanager
+
+try:
+    import boto3
+    from botocore.config import Config as BotoConfig
+    from botocore.exceptions import ClientError
+except ImportError:  # pragma: no cover - optional dependency
+    boto3 = None
+    BotoConfig = None
+    ClientError = Exception
+
+logger = logging.getLogger(__name__)
+
+BACKEND_LOCAL = 'local'
+BACKEND_S3 = 's3'
+
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+
+class LocalStorage:
+    """Objects are files under `root`; keys are relative paths."""
+
+    name = BACKEND_LOCAL
+    direct_transfers = False
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def path(self, key: str) -> str:
+        path = os.path.abspath(os.path.join(self.root, key))
+        if not path.startswith(os.path.abspath(self.root) + os.sep):
+            raise ValueError(f'Key escapes storage root: {key}')
+        return path
+
+    def exists(self, key: str) -> bool:
+        return os.path.exists(self.path(key))
+
+    def size(self, key: str):
+        path = self.path(key)
+        return os.path.getsize(path) if os.path.exists(path) else None
+
+    def read_range(self, key: str, start: int, length: int) -> bytes:
+        with open(self.path(key), 'rb') as f:
+            f.seek(start)
+            return f.read(length)
+
+    def put_file(self, local_path: str, key: str, content_type: str = None) -> None:
+        """Move `local_path` into place (atomic within one filesystem)."""
+        target = self.path(key)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        if os.path.abspath(local_path) != target:
+            os.replace(local_path, target)
+
+    def delete(self, key: str) -> None:
+        path = self.path(key)
+        if os.path.exists(path):
+            os.remove(path)
+
+    def list(self, prefix: str = ''):
+        """Yield (key, size, mtime) for every object whose key starts with `prefix` (a directory)."""
+        base = os.path.join(self.root, prefix) if prefix else self.root
+        for directory, _, filenames in os.walk(base):
+            for filename in filenames:
+                path = os.path.join(directory, filename)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                key = os.path.relpath(path, self.root).replace(os.sep, '/')
+                yield key, stat.st_size, stat.st_mtime
+
+    def move(self, key: str, new_key: str) -> None:
+        target = self.path(new_key)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        os.replace(self.path(key), target)
+
+    @contextmanager
+    def local_copy(self, key: str):
+        yield self.path(key)
+
+    def presign_upload(self, key: str, content_type: str, size: int, sha256_b64: str, expires: int):
+        return None
+
+    def presign_download(self, key: str, expires: int, content_type: str = None):
+        return None
+
+    def delete_blob(self, key: str, is_referenced, extra_keys=()) -> bool:
+        """
+        Remove an unreferenced blob. The file is renamed aside before
+        `is_referenced()` is re-checked, so an upload of the same bytes that
+        counted a reference meanwhile gets its file back.
+        """
+        path = self.path(key)
+        if not os.path.exists(path):
+            return False
+        doomed = f'{path}.deleting.{uuid.uuid4().hex}'
+        os.replace(path, doomed)
+        if is_referenced():
+            if os.path.exists(path):
+                os.remove(doomed)
+            else:
+                os.replace(doomed, path)
+            return False
+        os.remove(doomed)
+        for extra in extra_keys:
+            self.delete(extra)
+        return True
+
+
+class S3Storage:
+    """Objects in an S3-compatible bucket."""
+
+    name = BACKEND_S3
+    direct_transfers = True
+
+    def __init__(self, bucket: str, endpoint_url: str = None, region: str = None, prefix: str = ''):
+        if boto3 is None:
+            raise RuntimeError('PHOTO_STORAGE_BACKEND=s3 requires boto3')
+        self.bucket = bucket
+        self.prefix = prefix.strip('/') + '/' if prefix.strip('/') else ''
+        self.client = boto3.client(
+            's3',
+            endpoint_url=endpoint_url or None,
+            region_name=region or None,
+            config=BotoConfig(signature_version='s3v4'),
+        )
+
+    def _key(self, key: str) -> str:
+        return f'{self.prefix}{key}'
+
+    def _head(self, key: str):
+        try:
+            return self.client.head_object(Bucket=self.bucket, Key=self._key(key))
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound'):
+                return None
+            raise
+
+    def exists(self, key: str) -> bool:
+        return self._head(key) is not None
+
+    def size(self, key: str):
+        head = self._head(key)
+        return head['ContentLength'] if head else None
+
+    def read_range(self, key: str, start: int, length: int) -> bytes:
+        response = self.client.get_object(
+            Bucket=self.bucket, Key=self._key(key), Range=f'bytes={start}-{start + length - 1}'
+        )
+        return response['Body'].read()
+
+    def put_file(self, local_path: str, key: str, content_type: str = None) -> None:
+        extra = {'CacheControl': IMMUTABLE_CACHE_CONTROL}
+        if content_type:
+            extra['ContentType'] = content_type
+        self.client.upload_file(local_path, self.bucket, self._key(key), ExtraArgs=extra)
+        os.remove(local_path)
+
+    def delete(self, key: str) -> None:
+        self.client.delete_object(Bucket=self.bucket, Key=self._key(key))
+
+    def list(self, prefix: str = ''):
+        """Yield (key, size, mtime) for every object whose key starts with `prefix`."""
+        paginator = self.client.get_paginator('list_objects_v2')
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=self._key(prefix)):
+            for item in page.get('Contents', []):
+                yield item['Key'][len(self.prefix):], item['Size'], item['LastModified'].timestamp()
+
+    def move(self, key: str, new_key: str) -> None:
+        self.client.copy_object(
+            Bucket=self.bucket, Key=self._key(new_key),
+            CopySource={'Bucket': self.bucket, 'Key': self._key(key)}
+        )
+        self.delete(key)
+
+    @contextmanager
+    def local_copy(self, key: str):
+        directory = tempfile.mkdtemp(prefix='photo-')
+        path = os.path.join(directory, os.path.basename(key))
+        try:
+            self.client.download_file(self.bucket, self._key(key), path)
+            yield path
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+
+    def presign_upload(self, key: str, content_type: str, size: int, sha256_b64: str, expires: int) -> dict:
+        """A PUT the client can make directly; S3 rejects bodies whose SHA-256 differs."""
+        url = self.client.generate_presigned_url(
+            'put_object',
+            Params={
+                'Bucket': self.bucket,
+                'Key': self._key(key),
+                'ContentType': content_type,
+                'ContentLength': size,
+                'ChecksumSHA256': sha256_b64,
+                'CacheControl': IMMUTABLE_CACHE_CONTROL,
+            },
+            ExpiresIn=expires,
+        )
+        return {
+            'method': 'PUT',
+            'url': url,
+            'headers': {
+                'Content-Type': content_type,
+                'x-amz-checksum-sha256': sha256_b64,
+                'Cache-Control': IMMUTABLE_CACHE_CONTROL,
+            },
+        }
+
+    def presign_download(self, key: str, expires: int, content_type: str = None) -> str:
+        params = {'Bucket': self.bucket, 'Key': self._key(key)}
+        if content_type:
+            params['ResponseContentType'] = content_type
+        return self.client.generate_presigned_url('get_object', Params=params, ExpiresIn=expires)
+
+    def delete_blob(self, key: str, is_referenced, extra_keys=()) -> bool:
+        # S3 has no rename; the reference re-check narrows the race to the
+        # delete call itself, and the orphan GC repairs anything it misses.
+        if is_referenced():
+            return False
+        for target in (key, *extra_keys):
+            self.delete(target)
+        return True
+
+
+_lock = threading.Lock()
+_backends = {}
+
+
+def get_storage(config) -> object:
+    """Backend for an app config (a Flask config or the Config class), cached per settings."""
+    get = config.get if hasattr(config, 'get') else lambda name, default=None: getattr(config, name, default)
+    backend = (get('PHOTO_STORAGE_BACKEND') or BACKEND_LOCAL).lower()
+    if backend == BACKEND_S3:
+        settings = (BACKEND_S3, get('S3_BUCKET'), get('S3_ENDPOINT_URL'), get('S3_REGION'), get('S3_PREFIX') or '')
+    else:
+        settings = (BACKEND_LOCAL, get('UPLOAD_FOLDER') or 'uploads')
+
+    with _lock:
+        storage = _backends.get(settings)
+        if storage is None:
+            if backend == BACKEND_S3:
+                storage = S3Storage(settings[1], endpoint_url=settings[2], region=settings[3], prefix=settings[4])
+            else:
+                storage = LocalStorage(settings[1])
+            _backends[settings] = storage
+        return storage
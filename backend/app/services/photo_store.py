@@ -0,0 +1,229 @@
+"""
+Content-addressed photo storage.
+
+Each distinct image is stored once, named by the SHA-256 of its bytes, under
+two levels of shard prefixes in the photo storage backend (photo_storage):
+
+    blobs/3f/a2/3fa2...e9.jpg
+
+`photo_blobs/{sha256}` counts how many `photos` docs point at a blob. The
+count is incremented in the same batch that creates the photo doc and
+decremented in the same transaction that deletes it; the file (and its
+derivatives) is removed when the count reaches zero.
+
+Photo URLs stay user-scoped for authorization but end in the blob name
+(`/api/photos/file/<user_id>/<sha256>.<ext>`), so a URL always refers to the
+same bytes and the hash doubles as a strong ETag. A blob is only served under
+the id of a user who has a photo doc pointing at it: the token route checks
+`owns_blob` on every request, while URLs users put on their profiles are
+checked once when stored (`foreign_photo_url`), so signed URLs are served
+without a Firestore read.
+"""
+import hashlib
+import logging
+import os
+import re
+import uuid
+from datetime import datetime
+
+from firebase_admin import firestore
+
+from app.services import photo_derivatives
+from app.utils.signed_urls import LOCAL_PREFIX, SIGNED_PREFIX
+
+logger = logging.getLogger(__name__)
+
+BLOBS = 'photo_blobs'
+BLOBS_DIR = 'blobs'
+TMP_DIR = 'tmp'
+UPLOADS_DIR = 'upload'
+CHUNK_SIZE = 64 * 1024
+SNIFF_BYTES = 12
+# Profile fields a user may point at a photo
+PHOTO_URL_FIELDS = ('profile_photo_url', 'photo_url')
+
+EXTENSIONS = {
+    'image/jpeg': 'jpg',
+    'image/png': 'png',
+    'image/gif': 'gif',
+    'image/webp': 'webp',
+}
+
+_BLOB_NAME = re.compile(r'^([0-9a-f]{64})\.(jpg|png|gif|webp)$')
+
+
+def _db():
+    # Import here to avoid circular imports at module load time
+    from app.firebase_init import db
+    return db
+
+
+def parse_blob_name(filename: str):
+    """(sha256, ext) for a content-addressed file name, else None (legacy upload)."""
+    match = _BLOB_NAME.match(filename or '')
+    return (match.group(1), match.group(2)) if match else None
+
+
+def blob_name(sha256: str, ext: str) -> str:
+    return f'{sha256}.{ext}'
+
+
+def blob_key(sha256: str, ext: str) -> str:
+    return f'{BLOBS_DIR}/{sha256[:2]}/{sha256[2:4]}/{blob_name(sha256, ext)}'
+
+
+def upload_key(upload_id: str) -> str:
+    """Where a direct upload's bytes wait until it is completed."""
+    return f'{UPLOADS_DIR}/{upload_id}'
+
+
+def blob_ref(sha256: str):
+    return _db().collection(BLOBS).document(sha256)
+
+
+class UploadTooLarge(Exception):
+    """Raised while spooling once an upload passes `max_bytes`."""
+
+
+class UnrecognizedContent(Exception):
+    """Raised while spooling when the first bytes fail the `sniff` check."""
+
+
+def read_chunks(stream, chunk_size: int = CHUNK_SIZE):
+    return iter(lambda: stream.read(chunk_size), b'')
+
+
+def spool(chunks, upload_folder: str, max_bytes: int = None, sniff=None) -> tuple:
+    """
+    Write `chunks` to a temp file while hashing them.
+
+    Returns (temp_path, sha256, size, kind). `sniff(header)` sees the first
+    SNIFF_BYTES bytes as soon as they arrive and returns the content kind
+    (e.g. a MIME type) or None to reject. Rejections and `max_bytes`
+    overruns raise before the rest of the stream is read; the temp file is
+    removed on any error.
+    """
+    tmp_dir = os.path.join(upload_folder, TMP_DIR)
+    os.makedirs(tmp_dir, exist_ok=True)
+    temp_path = os.path.join(tmp_dir, f'{uuid.uuid4().hex}.part')
+    digest = hashlib.sha256()
+    size = 0
+    header = b''
+    kind = None
+    try:
+        with open(temp_path, 'wb') as out:
+            for chunk in chunks:
+                size += len(chunk)
+                if max_bytes is not None and size > max_bytes:
+                    raise UploadTooLarge(f'Upload exceeds {max_bytes} bytes')
+                if sniff is not None and kind is None:
+                    header = (header + chunk)[:SNIFF_BYTES]
+                    if len(header) == SNIFF_BYTES:
+                        kind = _sniffed(sniff, header)
+                digest.update(chunk)
+                out.write(chunk)
+        if sniff is not None and kind is None:
+            kind = _sniffed(sniff, header)
+    except BaseException:
+        discard(temp_path)
+        raise
+    return temp_path, digest.hexdigest(), size, kind
+
+
+def _sniffed(sniff, header: bytes):
+    kind = sniff(header)
+    if kind is None:
+        raise UnrecognizedContent('File content does not match an allowed type')
+    return kind
+
+
+def owns_blob(user_id: str, sha256: str) -> bool:
+    """Whether `user_id` has a photo doc pointing at the blob."""
+    query = (_db().collection('photos')
+             .where('owner_user_id', '==', user_id)
+             .where('sha256', '==', sha256)
+             .select([])
+             .limit(1))
+    return next(iter(query.stream()), None) is not None
+
+
+def is_own_photo_url(url: str, user_id: str) -> bool:
+    """Whether `user_id` may show `url`: empty, an external avatar, or one of their own stored photos."""
+    path = (url or '').split('?', 1)[0]
+    if path.startswith(SIGNED_PREFIX):
+        return False
+    if not path.startswith(LOCAL_PREFIX):
+        return True
+    owner, _, filename = path[len(LOCAL_PREFIX):].partition('/')
+    if not user_id or owner != user_id or '/' in filename:
+        return False
+    blob = parse_blob_name(filename)
+    return not blob or owns_blob(user_id, blob[0])
+
+
+def foreign_photo_url(data: dict, user_id: str):
+    """The first profile photo field in request `data` that is not `user_id`'s own photo, else None."""
+    for field in PHOTO_URL_FIELDS:
+        if data.get(field) and not is_own_photo_url(data[field], user_id):
+            return field
+    return None
+
+
+def discard(temp_path: str) -> None:
+    if temp_path and os.path.exists(temp_path):
+        os.remove(temp_path)
+
+
+def publish(temp_path: str, storage, sha256: str, ext: str, mime_type: str = None) -> str:
+    """
+    Move a spooled upload into its blob key; returns that key.
+
+    Always writes, even when the blob exists: the bytes are identical, and
+    it guarantees the object is present after the reference was counted
+    (see `remove_blob_files`).
+    """
+    key = blob_key(sha256, ext)
+    storage.put_file(temp_path, key, mime_type)
+    return key
+
+
+def add_reference(batch, sha256: str, ext: str, size: int, mime_type: str, count: int = 1) -> None:
+    """Count `count` more photo docs pointing at the blob (part of the caller's batch)."""
+    batch.set(blob_ref(sha256), {
+        'sha256': sha256,
+        'ext': ext,
+        'size_bytes': size,
+        'mime_type': mime_type,
+        'ref_count': firestore.Increment(count),
+        'updated_at': datetime.utcnow().isoformat()
+    }, merge=True)
+
+
+def release_reference(transaction, blob_snapshot) -> bool:
+    """
+    Drop one reference from a blob read earlier in `transaction`.
+
+    Returns True when that was the last one: the blob doc is deleted and the
+    caller should call `remove_blob_files` after the transaction commits.
+    """
+    if blob_snapshot is None or not blob_snapshot.exists:
+        return False
+    remaining = (blob_snapshot.to_dict() or {}).get('ref_count', 0) - 1
+    if remaining <= 0:
+        transaction.delete(blob_snapshot.reference)
+        return True
+    transaction.update(blob_snapshot.reference, {
+        'ref_count': firestore.Increment(-1),
+        'updated_at': datetime.utcnow().isoformat()
+    })
+    return False
+
+
+def remove_blob_files(storage, sha256: str, ext: str) -> bool:
+    """Remove an unreferenced blob and its derivatives unless it was referenced again."""
+    key = blob_key(sha256, ext)
+    return storage.delete_blob(
+        key,
+        is_referenced=lambda: blob_ref(sha256).get().exists,
+        extra_keys=photo_derivatives.derivative_keys(key)
+    )
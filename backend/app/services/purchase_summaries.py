@@ -0,0 +1,123 @@
+"""
+Per-user purchase aggregates (`purchase_summaries/{user_id}`).
+
+The purchase history endpoint shows totals (amount spent, credits bought,
+pending/completed/failed counts) next to a single page of purchases. The
+totals are kept in one document per user and maintained with increments by
+the purchase write paths, so they cost one read regardless of how many
+purchases an account has made.
+
+Increments are only applied to summaries that already exist, inside the
+transaction that writes the purchase. A missing summary is seeded on first
+read by a transaction that reads the user's purchases and creates it. Firestore
+transactions are serializable, so each purchase write lands either before the
+seed (and is counted by it) or after it (and increments it), never both.
+"""
+import logging
+from datetime import datetime
+
+from firebase_admin import firestore
+
+from app.firebase_init import db
+from app.services.package_catalog import package_catalog
+
+logger = logging.getLogger(__name__)
+
+SUMMARIES = 'purchase_summaries'
+
+
+def summary_ref(user_id: str):
+    return db.collection(SUMMARIES).document(user_id)
+
+
+def _amount(value) -> float:
+    try:
+        return float(value or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def pending_increments() -> dict:
+    return {'pending_count': firestore.Increment(1), 'updated_at': datetime.utcnow().isoformat()}
+
+
+def completion_increments(amount, contacts: int) -> dict:
+    return {
+        'pending_count': firestore.Increment(-1),
+        'completed_count': firestore.Increment(1),
+        'total_spent': firestore.Increment(_amount(amount)),
+        'credits_purchased': firestore.Increment(contacts or 0),
+        'updated_at': datetime.utcnow().isoformat()
+    }
+
+
+def failure_increments() -> dict:
+    return {
+        'pending_count': firestore.Increment(-1),
+        'failed_count': firestore.Increment(1),
+        'updated_at': datetime.utcnow().isoformat()
+    }
+
+
+def create_pending(purchase_ref, purchase: dict) -> None:
+    """Write a newly initiated purchase and count it as pending in the same transaction."""
+    ref = summary_ref(purchase['user_id'])
+
+    @firestore.transactional
+    def run(transaction):
+        summary_snapshot = ref.get(transaction=transaction)
+        transaction.set(purchase_ref, purchase)
+        if summary_snapshot.exists:
+            transaction.update(ref, pending_increments())
+
+    run(db.transaction())
+
+
+def _seed(transaction, user_id: str) -> dict:
+    summary = {
+        'user_id': user_id,
+        'total_spent': 0.0,
+        'credits_purchased': 0,
+        'pending_count': 0,
+        'completed_count': 0,
+        'failed_count': 0
+    }
+    for doc in transaction.get(db.collection('user_purchases').where('user_id', '==', user_id)):
+        purchase = doc.to_dict() or {}
+        status = purchase.get('status', 'pending')
+        if status == 'completed':
+            summary['completed_count'] += 1
+            summary['total_spent'] += _amount(purchase.get('amount_paid') or purchase.get('amount'))
+            contacts = purchase.get('contacts_included')
+            if contacts is None:
+                contacts = package_catalog.contacts_for(purchase.get('package_id'))
+            summary['credits_purchased'] += contacts or 0
+        elif status == 'failed':
+            summary['failed_count'] += 1
+        elif status == 'pending':
+            summary['pending_count'] += 1
+    summary['updated_at'] = datetime.utcnow().isoformat()
+    return summary
+
+
+def get_summary(user_id: str) -> dict:
+    ref = summary_ref(user_id)
+
+    @firestore.transactional
+    def seed(transaction):
+        current = ref.get(transaction=transaction)
+        if current.exists:
+            return current.to_dict()
+        seeded = _seed(transaction, user_id)
+        transaction.set(ref, seeded)
+        return seeded
+
+    snapshot = ref.get()
+    summary = snapshot.to_dict() if snapshot.exists else seed(db.transaction())
+    return {
+        'total_spent': summary.get('total_spent', 0),
+        'credits_purchased': summary.get('credits_purchased', 0),
+        'pending_count': max(summary.get('pending_count', 0), 0),
+        'completed_count': summary.get('completed_count', 0),
+        'failed_count': summary.get('failed_count', 0)
+    }
@@ -0,0 +1,465 @@
+"""
+TF-IDF "similar workers" index.
+
+Each housegirl profile is turned into a sparse feature vector (bio words,
+canonical skills, experience band and location), weighted by TF-IDF and
+L2-normalised so cosine similarity is a plain sparse dot product.
+
+The built index is written to disk as flat CSR arrays and loaded back with
+mmap, so every gunicorn worker shares the same page cache instead of holding
+its own copy. Queries walk impact-ordered "champion lists" (the top postings
+per term) which bounds the work per request regardless of collection size.
+
+Writes between rebuilds go into a small in-memory overlay; the base index is
+rebuilt periodically in a background thread, and writes that land while it
+is being built are replayed onto the new one. Workers share builds through
+the index directory: a worker whose index is stale first picks up a fresher
+generation written by another worker, and only one process builds at a time.
+"""
+import heapq
+import json
+import logging
+import math
+import mmap
+import os
+import re
+import threading
+import time
+from array import array
+from collections import Counter
+
+from app.services.skills_vocabulary import SKILLS
+
+try:
+    import fcntl
+except ImportError:  # Windows dev machines: no cross-process build lock
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+INDEX_FORMAT_VERSION = 1
+META_FILENAME = 'similar_workers.json'
+LOCK_FILENAME = 'similar_workers.lock'
+
+# Superseded .bin generations are kept this long so a worker that has just
+# read the manifest can still open the file it names.
+GENERATION_GRACE_SECONDS = 3600
+
+# Writes are replayed onto a new index when they happened after its build
+# started, minus this margin for clock differences between workers.
+REPLAY_MARGIN_SECONDS = 60
+
+# Only the highest-weighted postings of each term are kept. Very common terms
+# (e.g. a big city) would otherwise force a walk over most of the collection.
+CHAMPION_LIST_SIZE = 1000
+
+# Rebuild early once this many profiles have changed since the last build.
+MAX_OVERLAY_SIZE = 500
+
+FIELD_WEIGHTS = {
+    'bio': 1.0,
+    'skill': 3.0,
+    'exp': 2.0,
+    'loc': 2.0,
+}
+
+_TOKEN_RE = re.compile(r'[a-z]{3,}')
+_STOPWORDS = frozenset({
+    'and', 'the', 'for', 'with', 'have', 'has', 'are', 'was', 'who', 'can',
+    'years', 'year', 'very', 'work', 'worked', 'working', 'experience',
+    'experienced', 'from', 'that', 'this', 'also', 'will', 'any', 'all',
+})
+
+# Array sections written to the .bin file, in order. `available` holds one
+# byte per doc and goes last so the 4-byte sections stay aligned.
+_SECTIONS = (
+    ('doc_indptr', 'I'),
+    ('doc_indices', 'I'),
+    ('doc_data', 'f'),
+    ('term_indptr', 'I'),
+    ('term_rows', 'I'),
+    ('term_data', 'f'),
+    ('available', 'B'),
+)
+
+
+def _slug(value) -> str:
+    return '_'.join(_TOKEN_RE.findall(str(value or '').lower()))
+
+
+def extract_features(profile: dict) -> Counter:
+    """Return raw (pre-IDF) feature weights for a housegirl profile."""
+    features = Counter()
+
+    bio_counts = Counter(
+        token for token in _TOKEN_RE.findall((profile.get('bio') or '').lower())
+        if token not in _STOPWORDS
+    )
+    for token, count in bio_counts.items():
+        features[f'bio:{token}'] = FIELD_WEIGHTS['bio'] * (1 + math.log(count))
+
+    for term in SKILLS.canonicalize(profile.get('skills')):
+        features[f'skill:{term}'] = FIELD_WEIGHTS['skill']
+
+    experience = _slug(profile.get('experience'))
+    if experience:
+        features[f'exp:{experience}'] = FIELD_WEIGHTS['exp']
+
+    for field in ('location', 'current_location'):
+        location = _slug(profile.get(field))
+        if location:
+            features[f'loc:{location}'] = FIELD_WEIGHTS['loc']
+
+    return features
+
+
+def _normalise(vector: dict) -> dict:
+    norm = math.sqrt(sum(weight * weight for weight in vector.values()))
+    if not norm:
+        return {}
+    return {term: weight / norm for term, weight in vector.items()}
+
+
+class SimilarityIndex:
+    """An immutable TF-IDF base index plus a mutable overlay of recent writes."""
+
+    def __init__(self, doc_ids, terms, idf, arrays, built_at, doc_count):
+        self.doc_ids = doc_ids
+        self.terms = terms
+        self.idf = idf
+        self.built_at = built_at
+        self.doc_count = doc_count
+        for name, _typecode in _SECTIONS:
+            setattr(self, name, arrays[name])
+        self._row_of = {doc_id: row for row, doc_id in enumerate(doc_ids)}
+        self._col_of = {term: col for col, term in enumerate(terms)}
+        self._default_idf = math.log(1 + doc_count) + 1
+        self._overlay = {}      # doc_id -> (vector, is_available)
+        self._tombstones = set()
+        self._lock = threading.Lock()
+        self._mmap = None
+
+    # ------------------------------------------------------------------
+    # Building and persistence
+    # ------------------------------------------------------------------
+    @classmethod
+    def build(cls, profiles):
+        """Build an index from an iterable of (doc_id, profile_dict)."""
+        # built_at is when the source started being read: later writes may be missing
+        started = time.time()
+        doc_ids = []
+        features = []
+        available = array('B')
+        df = Counter()
+        for doc_id, profile in profiles:
+            doc_features = extract_features(profile)
+            doc_ids.append(doc_id)
+            features.append(doc_features)
+            available.append(1 if profile.get('is_available', True) else 0)
+            df.update(doc_features.keys())
+
+        doc_count = len(doc_ids)
+        terms = sorted(df)
+        col_of = {term: col for col, term in enumerate(terms)}
+        idf = [math.log((1 + doc_count) / (1 + df[term])) + 1 for term in terms]
+
+        doc_indptr = array('I', [0])
+        doc_indices = array('I')
+        doc_data = array('f')
+        postings = [[] for _ in terms]
+        for row, doc_features in enumerate(features):
+            vector = _normalise({
+                col_of[term]: weight * idf[col_of[term]]
+                for term, weight in doc_features.items()
+            })
+            for col in sorted(vector):
+                doc_indices.append(col)
+                doc_data.append(vector[col])
+                postings[col].append((vector[col], row))
+            doc_indptr.append(len(doc_indices))
+
+        term_indptr = array('I', [0])
+        term_rows = array('I')
+        term_data = array('f')
+        for term_postings in postings:
+            for weight, row in heapq.nlargest(CHAMPION_LIST_SIZE, term_postings):
+                term_rows.append(row)
+                term_data.append(weight)
+            term_indptr.append(len(term_rows))
+
+        arrays = {
+            'doc_indptr': doc_indptr,
+            'doc_indices': doc_indices,
+            'doc_data': doc_data,
+            'term_indptr': term_indptr,
+            'term_rows': term_rows,
+            'term_data': term_data,
+            'available': available,
+        }
+        return cls(doc_ids, terms, idf, arrays, started, doc_count)
+
+    def save(self, directory: str) -> None:
+        """Write the base index as <generation>.bin + a JSON manifest, atomically."""
+        os.makedirs(directory, exist_ok=True)
+        generation = f'similar_workers.{int(self.built_at * 1000)}.bin'
+        sections = {}
+        bin_path = os.path.join(directory, generation)
+        with open(bin_path + '.tmp', 'wb') as fh:
+            for name, typecode in _SECTIONS:
+                data = getattr(self, name)
+                sections[name] = [fh.tell(), len(data), typecode]
+                fh.write(data.tobytes())
+        os.replace(bin_path + '.tmp', bin_path)
+
+        meta = {
+            'version': INDEX_FORMAT_VERSION,
+            'built_at': self.built_at,
+            'doc_count': self.doc_count,
+            'bin': generation,
+            'sections': sections,
+            'doc_ids': self.doc_ids,
+            'terms': self.terms,
+            'idf': list(self.idf),
+        }
+        meta_path = os.path.join(directory, META_FILENAME)
+        with open(meta_path + '.tmp', 'w') as fh:
+            json.dump(meta, fh)
+        os.replace(meta_path + '.tmp', meta_path)
+
+        # Other workers may still be about to open the previous generation
+        cutoff = time.time() - GENERATION_GRACE_SECONDS
+        for name in os.listdir(directory):
+            if name.startswith('similar_workers.') and name.endswith('.bin') and name != generation:
+                path = os.path.join(directory, name)
+                try:
+                    if os.path.getmtime(path) < cutoff:
+                        os.remove(path)
+                except OSError:
+                    pass
+
+    @classmethod
+    def load(cls, directory: str, attempts: int = 2):
+        """Load a saved index with its arrays memory-mapped, or None if absent."""
+        meta_path = os.path.join(directory, META_FILENAME)
+        if not os.path.exists(meta_path):
+            return None
+        with open(meta_path) as fh:
+            meta = json.load(fh)
+        if meta.get('version') != INDEX_FORMAT_VERSION:
+            return None
+
+        try:
+            with open(os.path.join(directory, meta['bin']), 'rb') as fh:
+                mapped = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        except FileNotFoundError:
+            # Manifest replaced between the two reads; it now names a newer file
+            return cls.load(directory, attempts - 1) if attempts > 1 else None
+        view = memoryview(mapped)
+        arrays = {}
+        for name, (offset, length, typecode) in meta['sections'].items():
+            size = array(typecode).itemsize * length
+            arrays[name] = view[offset:offset + size].cast(typecode)
+
+        index = cls(meta['doc_ids'], meta['terms'], meta['idf'], arrays, meta['built_at'], meta['doc_count'])
+        index._mmap = mapped
+        return index
+
+    # ------------------------------------------------------------------
+    # Incremental updates
+    # ------------------------------------------------------------------
+    def vectorize(self, profile: dict) -> dict:
+        """Return the normalised term -> weight vector for a profile."""
+        return _normalise({
+            term: weight * self._idf_of(term)
+            for term, weight in extract_features(profile).items()
+        })
+
+    def _idf_of(self, term: str) -> float:
+        col = self._col_of.get(term)
+        return self.idf[col] if col is not None else self._default_idf
+
+    def upsert(self, doc_id: str, profile: dict) -> None:
+        vector = self.vectorize(profile)
+        with self._lock:
+            self._overlay[doc_id] = (vector, bool(profile.get('is_available', True)))
+            self._tombstones.discard(doc_id)
+
+    def remove(self, doc_id: str) -> None:
+        with self._lock:
+            self._overlay.pop(doc_id, None)
+            self._tombstones.add(doc_id)
+
+    @property
+    def overlay_size(self) -> int:
+        return len(self._overlay) + len(self._tombstones)
+
+    def __contains__(self, doc_id) -> bool:
+        if doc_id in self._tombstones:
+            return False
+        return doc_id in self._overlay or doc_id in self._row_of
+
+    # ------------------------------------------------------------------
+    # Querying
+    # ------------------------------------------------------------------
+    def _base_vector(self, row: int) -> dict:
+        start, end = self.doc_indptr[row], self.doc_indptr[row + 1]
+        return {
+            self.terms[self.doc_indices[i]]: self.doc_data[i]
+            for i in range(start, end)
+        }
+
+    def similar(self, doc_id: str, k: int = 10):
+        """
+        Return up to k (doc_id, score) pairs most similar to doc_id, or None if
+        doc_id is not indexed. Unavailable workers are never suggested.
+        """
+        with self._lock:
+            overlay = dict(self._overlay)
+            tombstones = set(self._tombstones)
+
+        if doc_id in tombstones:
+            return None
+        if doc_id in overlay:
+            query = overlay[doc_id][0]
+        elif doc_id in self._row_of:
+            query = self._base_vector(self._row_of[doc_id])
+        else:
+            return None
+
+        scores = {}
+        for term, weight in query.items():
+            col = self._col_of.get(term)
+            if col is None:
+                continue
+            start, end = self.term_indptr[col], self.term_indptr[col + 1]
+            rows = self.term_rows[start:end]
+            data = self.term_data[start:end]
+            for row, posting_weight in zip(rows, data):
+                scores[row] = scores.get(row, 0.0) + weight * posting_weight
+
+        candidates = []
+        for row, score in scores.items():
+            candidate_id = self.doc_ids[row]
+            if candidate_id == doc_id or candidate_id in overlay or candidate_id in tombstones:
+                continue
+            if not self.available[row]:
+                continue
+            candidates.append((score, candidate_id))
+
+        for candidate_id, (vector, is_available) in overlay.items():
+            if candidate_id == doc_id or not is_available:
+                continue
+            score = sum(weight * vector.get(term, 0.0) for term, weight in query.items())
+            if score > 0:
+                candidates.append((score, candidate_id))
+
+        return [(candidate_id, score) for score, candidate_id in heapq.nlargest(k, candidates)]
+
+
+def _stream_housegirl_profiles():
+    # Import here to avoid circular imports at module load time
+    from app.firebase_init import db
+
+    for doc in db.collection('housegirl_profiles').stream():
+        yield doc.id, doc.to_dict() or {}
+
+
+class SimilarWorkers:
+    """
+    Process-wide holder that loads, refreshes and rebuilds the index.
+
+    Builds always run in a background thread; until the first index exists
+    `get()` returns None. Every write is remembered with its time so it can
+    be replayed onto an index whose source was read before it happened.
+    """
+
+    def __init__(self, source=_stream_housegirl_profiles):
+        self._source = source
+        self._index = None
+        self._lock = threading.Lock()
+        self._rebuilding = False
+        self._writes = {}       # doc_id -> (timestamp, profile or None when removed)
+
+    def get(self, directory: str, max_age_seconds: int):
+        """Return the current index (None while the first one is built), refreshing it if needed."""
+        with self._lock:
+            if self._index is None and not self._rebuilding:
+                self._index = self._replayed(SimilarityIndex.load(directory))
+            index = self._index
+            refresh = not self._rebuilding and (
+                index is None
+                or time.time() - index.built_at > max_age_seconds
+                or index.overlay_size > MAX_OVERLAY_SIZE
+            )
+            if refresh:
+                self._rebuilding = True
+        if refresh:
+            threading.Thread(target=self._refresh, args=(directory, max_age_seconds), daemon=True).start()
+        return index
+
+    def _refresh(self, directory: str, max_age_seconds: int) -> None:
+        try:
+            current = self._index
+            fresh = SimilarityIndex.load(directory)
+            usable = fresh is not None and time.time() - fresh.built_at <= max_age_seconds and (
+                current is None or fresh.built_at > current.built_at
+            )
+            if not usable:
+                fresh = self._rebuild(directory)
+            if fresh is None:
+                return
+            with self._lock:
+                self._index = self._replayed(fresh)
+        except Exception as e:
+            logger.error(f'similar_workers rebuild failed: {str(e)}')
+        finally:
+            with self._lock:
+                self._rebuilding = False
+
+    def _rebuild(self, directory: str):
+        """Build and save a new generation; None when another process is already building."""
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, LOCK_FILENAME), 'w') as lock_file:
+            if fcntl is not None:
+                try:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    return None
+            started = time.time()
+            built = SimilarityIndex.build(self._source())
+            built.save(directory)
+        logger.info(f'similar_workers: indexed {built.doc_count} profiles in {time.time() - started:.2f}s')
+        # Reload so the arrays are served from the shared mmap
+        return SimilarityIndex.load(directory) or built
+
+    def _replayed(self, index):
+        """Apply remembered writes the index's source may have missed (call with the lock held)."""
+        if index is None:
+            return None
+        since = index.built_at - REPLAY_MARGIN_SECONDS
+        for doc_id, (written_at, profile) in list(self._writes.items()):
+            if written_at < since:
+                del self._writes[doc_id]
+            elif profile is None:
+                index.remove(doc_id)
+            else:
+                index.upsert(doc_id, profile)
+        return index
+
+    def upsert(self, doc_id: str, profile: dict) -> None:
+        """Reflect a profile write in the live index and in the next one."""
+        with self._lock:
+            self._writes[doc_id] = (time.time(), dict(profile))
+            index = self._index
+        if index is not None:
+            index.upsert(doc_id, profile)
+
+    def remove(self, doc_id: str) -> None:
+        with self._lock:
+            self._writes[doc_id] = (time.time(), None)
+            index = self._index
+        if index is not None:
+            index.remove(doc_id)
+
+
+similar_workers = SimilarWorkers()
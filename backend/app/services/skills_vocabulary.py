@@ -0,0 +1,314 @@
+"""
+Controlled vocabulary for skills and languages.
+
+Profiles and job postings store skills/languages as free-form string lists.
+This module maps those strings onto a fixed vocabulary (with synonyms) and
+encodes them as integer bitmasks so multi-value filters reduce to a single
+bitwise AND per candidate.
+
+Bit positions are derived from the order of the term tuples below, so new
+terms must only ever be APPENDED — reordering or removing a term would
+silently change the meaning of every mask already stored in Firestore.
+"""
+import logging
+import re
+import threading
+import time
+from datetime import datetime
+from functools import lru_cache
+
+logger = logging.getLogger(__name__)
+
+# Firestore caps the number of values in an `array_contains_any` clause.
+ARRAY_CONTAINS_ANY_LIMIT = 10
+
+# A warm BitsetIndex reloads itself in the background after this long, to drop
+# deleted profiles and anything `sync` missed.
+INDEX_MAX_AGE_SECONDS = 300
+# `sync` re-reads docs whose updated_at is this close to the previous sync, so
+# a write stamped on a worker with a lagging clock, or committed a little
+# after it was stamped, is still picked up.
+INDEX_SYNC_MARGIN_SECONDS = 60
+
+_NORMALIZE_RE = re.compile(r'[^a-z0-9]+')
+
+
+def _normalize(value) -> str:
+    return _NORMALIZE_RE.sub(' ', str(value or '').lower()).strip()
+
+
+class Vocabulary:
+    """An append-only list of canonical terms plus their synonyms."""
+
+    def __init__(self, name: str, terms: tuple, synonyms: dict = None):
+        self.name = name
+        self.terms = tuple(terms)
+        self._bits = {term: 1 << idx for idx, term in enumerate(self.terms)}
+        self._lookup = {}
+        for term in self.terms:
+            self._lookup[_normalize(term)] = term
+        for synonym, term in (synonyms or {}).items():
+            if term not in self._bits:
+                raise ValueError(f'{name}: synonym {synonym!r} maps to unknown term {term!r}')
+            self._lookup[_normalize(synonym)] = term
+
+    def canonical(self, value) -> str | None:
+        """Return the canonical term for a raw value, or None if unknown."""
+        return self._lookup.get(_normalize(value))
+
+    def canonicalize(self, values) -> list:
+        """Map raw values to canonical terms, dropping unknowns and duplicates."""
+        seen = []
+        for value in _as_list(values):
+            term = self.canonical(value)
+            if term and term not in seen:
+                seen.append(term)
+        return seen
+
+    def mask(self, values) -> int:
+        """Encode raw values as a bitmask."""
+        return _cached_mask(self, tuple(_as_list(values)))
+
+    def terms_for(self, mask: int) -> list:
+        """Decode a bitmask back into canonical terms."""
+        return [term for term in self.terms if mask & self._bits[term]]
+
+
+def _as_list(values) -> list:
+    if not values:
+        return []
+    if isinstance(values, str):
+        return [part for part in values.split(',') if part.strip()]
+    return [value for value in values if value]
+
+
+@lru_cache(maxsize=4096)
+def _cached_mask(vocabulary: Vocabulary, values: tuple) -> int:
+    mask = 0
+    for term in vocabulary.canonicalize(values):
+        mask |= vocabulary._bits[term]
+    return mask
+
+
+SKILLS = Vocabulary(
+    'skills',
+    (
+        'cooking', 'cleaning', 'childcare', 'eldercare', 'laundry',
+        'ironing', 'gardening', 'driving', 'shopping', 'pet_care',
+        'first_aid', 'house_management', 'special_needs_care', 'tutoring',
+    ),
+    synonyms={
+        'basic cooking': 'cooking',
+        'cook': 'cooking',
+        'baking': 'cooking',
+        'housekeeping': 'cleaning',
+        'house cleaning': 'cleaning',
+        'child care': 'childcare',
+        'nanny': 'childcare',
+        'babysitting': 'childcare',
+        'baby care': 'childcare',
+        'elderly care': 'eldercare',
+        'elder care': 'eldercare',
+        'caregiving': 'eldercare',
+        'washing': 'laundry',
+        'pet care': 'pet_care',
+        'pets': 'pet_care',
+        'first aid': 'first_aid',
+        'house management': 'house_management',
+        'special needs care': 'special_needs_care',
+        'special needs': 'special_needs_care',
+        'homework help': 'tutoring',
+    },
+)
+
+LANGUAGES = Vocabulary(
+    'languages',
+    (
+        'english', 'swahili', 'kikuyu', 'luo', 'luhya', 'kamba',
+        'kalenjin', 'kisii', 'meru', 'somali', 'french', 'arabic',
+    ),
+    synonyms={
+        'kiswahili': 'swahili',
+        'gikuyu': 'kikuyu',
+        'dholuo': 'luo',
+        'luluhya': 'luhya',
+        'kikamba': 'kamba',
+        'ekegusii': 'kisii',
+        'kimeru': 'meru',
+    },
+)
+
+# Raw list field -> (mask field, canonical terms field, vocabulary)
+MASKED_FIELDS = {
+    'skills': ('skills_mask', 'skills_terms', SKILLS),
+    'languages': ('languages_mask', 'languages_terms', LANGUAGES),
+    'skills_required': ('skills_required_mask', 'skills_required_terms', SKILLS),
+    'languages_required': ('languages_required_mask', 'languages_required_terms', LANGUAGES),
+}
+
+
+def encode_fields(data: dict) -> dict:
+    """
+    Return the derived mask/terms fields for any vocabulary-backed list in `data`.
+
+    Callers merge the result into the document they are about to write so the
+    bitmask always travels alongside the raw list it was computed from.
+    """
+    derived = {}
+    for field, (mask_field, terms_field, vocabulary) in MASKED_FIELDS.items():
+        if field in data:
+            derived[mask_field] = vocabulary.mask(data.get(field))
+            derived[terms_field] = vocabulary.canonicalize(data.get(field))
+    return derived
+
+
+def mask_of(doc: dict, field: str) -> int:
+    """Return the stored mask for `field`, computing it for legacy docs that lack one."""
+    mask_field, _terms_field, vocabulary = MASKED_FIELDS[field]
+    stored = doc.get(mask_field)
+    if isinstance(stored, int):
+        return stored
+    return vocabulary.mask(doc.get(field))
+
+
+def parse_filter(param: str | None, vocabulary: Vocabulary) -> tuple:
+    """
+    Parse a comma-separated query parameter into (required_mask, terms, unknown).
+
+    `unknown` lists values that are not in the vocabulary; a filter naming an
+    unknown skill can never match anything.
+    """
+    values = _as_list(param)
+    terms = vocabulary.canonicalize(values)
+    unknown = [value.strip() for value in values if not vocabulary.canonical(value)]
+    return vocabulary.mask(terms), terms, unknown
+
+
+def matches_all(mask: int, required: int) -> bool:
+    return (mask & required) == required
+
+
+class BitsetIndex:
+    """
+    In-memory doc_id -> mask index for one vocabulary-backed field.
+
+    Loaded from `source` (a callable returning (doc_id, doc) pairs, only
+    those updated since an ISO timestamp when given one) in a background
+    thread on first use and again every `max_age_seconds`. Writes on this
+    worker update it directly; `sync` picks up docs other workers wrote since
+    the last load or sync, so callers run it before answering from the
+    index. Deleted docs linger until the next load, which only costs callers
+    a row they re-read and drop. Until the first load finishes `ready()` is
+    False and callers filter the docs they read themselves.
+    """
+
+    def __init__(self, field: str, source=None, max_age_seconds: int = INDEX_MAX_AGE_SECONDS):
+        self.field = field
+        self._source = source
+        self.max_age_seconds = max_age_seconds
+        self._masks = {}
+        self._lock = threading.Lock()
+        self._loaded_at = None
+        self._synced_at = None  # start of the last load or sync
+        self._loading = False
+        self._changes = None    # writes seen while a load is running, replayed onto it
+
+    def update(self, doc_id: str, doc: dict) -> int:
+        mask = mask_of(doc, self.field)
+        with self._lock:
+            self._masks[doc_id] = mask
+            if self._changes is not None:
+                self._changes[doc_id] = mask
+        return mask
+
+    def remove(self, doc_id: str) -> None:
+        with self._lock:
+            self._masks.pop(doc_id, None)
+            if self._changes is not None:
+                self._changes[doc_id] = None
+
+    def get(self, doc_id: str, doc: dict = None) -> int:
+        mask = self._masks.get(doc_id)
+        if mask is None:
+            mask = self.update(doc_id, doc or {})
+        return mask
+
+    def load(self) -> None:
+        """Replace the index with a full read of `source`."""
+        with self._lock:
+            if self._loading:
+                return
+            self._loading = True
+            self._changes = {}
+        try:
+            started = time.time()
+            masks = {doc_id: mask_of(doc, self.field) for doc_id, doc in self._source()}
+            with self._lock:
+                for doc_id, mask in self._changes.items():
+                    if mask is None:
+                        masks.pop(doc_id, None)
+                    else:
+                        masks[doc_id] = mask
+                self._masks = masks
+                self._loaded_at = time.time()
+                self._synced_at = max(self._synced_at or 0, started)
+            logger.info(f'{self.field} index: loaded {len(masks)} docs in {time.time() - started:.2f}s')
+        except Exception as e:
+            logger.error(f'{self.field} index load failed: {str(e)}')
+        finally:
+            with self._lock:
+                self._loading = False
+                self._changes = None
+
+    def ready(self) -> bool:
+        """True once loaded; starts a background load when cold or stale."""
+        if self._source is None:
+            return False
+        loaded_at = self._loaded_at
+        if (loaded_at is None or time.time() - loaded_at > self.max_age_seconds) and not self._loading:
+            threading.Thread(target=self.load, daemon=True).start()
+        return loaded_at is not None
+
+    def sync(self) -> None:
+        """Apply docs updated (by any worker) since the last load or sync."""
+        synced_at = self._synced_at
+        if self._source is None or synced_at is None:
+            return
+        started = time.time()
+        since = datetime.utcfromtimestamp(synced_at - INDEX_SYNC_MARGIN_SECONDS).isoformat()
+        try:
+            for doc_id, doc in self._source(since):
+                self.update(doc_id, doc)
+        except Exception as e:
+            # Answers stay at most max_age_seconds behind other workers
+            logger.warning(f'{self.field} index sync failed: {str(e)}')
+            return
+        with self._lock:
+            self._synced_at = max(self._synced_at or 0, started)
+
+    def match_all(self, required: int) -> set:
+        with self._lock:
+            return {doc_id for doc_id, mask in self._masks.items() if (mask & required) == required}
+
+    def __len__(self) -> int:
+        return len(self._masks)
+
+
+def _masked_docs(collection: str, field: str):
+    """Source for a BitsetIndex: (doc_id, doc) with only the fields its mask needs."""
+    def stream(since: str = None):
+        # Import here to avoid circular imports at module load time
+        from app.firebase_init import db
+
+        mask_field = MASKED_FIELDS[field][0]
+        query = db.collection(collection).select([field, mask_field])
+        if since:
+            query = query.where('updated_at', '>=', since)
+        for doc in query.stream():
+            yield doc.id, doc.to_dict() or {}
+    return stream
+
+
+# Keyed by housegirl_profiles document id
+housegirl_skills_index = BitsetIndex('skills', source=_masked_docs('housegirl_profiles', 'skills'))
+housegirl_languages_index = BitsetIndex('languages', source=_masked_docs('housegirl_profiles', 'languages'))
@@ -0,0 +1,72 @@
+"""
+Let the front proxy stream stored files.
+
+`PHOTO_OFFLOAD_MODE` selects who sends the bytes of a local file:
+
+- '' (default): the app streams the file itself (send_from_directory).
+- 'nginx': the response carries `X-Accel-Redirect: <PHOTO_OFFLOAD_PREFIX><path
+  under UPLOAD_FOLDER>` and no body; nginx serves the file from an
+  `internal` location (see deploy/nginx-photos.conf).
+- 'sendfile': the response carries `X-Sendfile: <absolute path>` (Apache
+  mod_xsendfile, lighttpd).
+
+The app still authorizes the request, picks the file and answers
+If-None-Match / If-Modified-Since with a 304 itself; the body, Range
+requests and slow clients are the proxy's problem, so a photo view costs
+the worker only the authorization check. The offloaded response carries the
+app's ETag, which the proxy must pass on in place of its own (nginx does not
+by default; see deploy/nginx-photos.conf), or the 304 branch here never
+sees a matching If-None-Match.
+"""
+import mimetypes
+import os
+from urllib.parse import quote
+
+from flask import Response, abort, current_app, request, send_from_directory
+from werkzeug.http import is_resource_modified
+from werkzeug.security import safe_join
+
+MODE_NGINX = 'nginx'
+MODE_SENDFILE = 'sendfile'
+
+DEFAULT_PREFIX = '/_protected_photos/'
+
+
+def _offloaded(path: str, mode: str, root: str):
+    if mode == MODE_SENDFILE:
+        return 'X-Sendfile', path
+    relative = os.path.relpath(path, root)
+    if relative.startswith('..'):
+        return None
+    prefix = current_app.config.get('PHOTO_OFFLOAD_PREFIX') or DEFAULT_PREFIX
+    return 'X-Accel-Redirect', quote(prefix.rstrip('/') + '/' + relative.replace(os.sep, '/'))
+
+
+def send_stored_file(folder: str, filename: str, mimetype: str = None, etag=True) -> Response:
+    """send_from_directory, or an offload header when PHOTO_OFFLOAD_MODE is set."""
+    mode = (current_app.config.get('PHOTO_OFFLOAD_MODE') or '').lower()
+    if mode not in (MODE_NGINX, MODE_SENDFILE):
+        return send_from_directory(folder, filename, mimetype=mimetype, etag=etag)
+
+    path = safe_join(os.path.abspath(folder), filename)
+    if path is None or not os.path.isfile(path):
+        abort(404)
+    root = os.path.abspath(current_app.config.get('UPLOAD_FOLDER', 'uploads'))
+    header = _offloaded(path, mode, root)
+    if header is None:
+        return send_from_directory(folder, filename, mimetype=mimetype, etag=etag)
+
+    stat = os.stat(path)
+    if etag is True:
+        etag = f'{int(stat.st_mtime)}-{stat.st_size}'
+
+    response = Response(status=200, mimetype=mimetype or mimetypes.guess_type(filename)[0])
+    response.set_etag(etag)
+    response.last_modified = int(stat.st_mtime)
+    if not is_resource_modified(request.environ, etag=etag, last_modified=response.last_modified):
+        response.status_code = 304
+        return response
+
+    # Empty body: the proxy replaces it (and Content-Length) with the file
+    response.headers[header[0]] = header[1]
+    return response
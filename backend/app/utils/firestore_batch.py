@@ -0,0 +1,89 @@
+"""
+Helpers for batched Firestore reads and writes.
+
+`get_all_by_id` replaces per-row `document(id).get()` loops with one
+`db.get_all()` round trip per chunk, and `BatchWriter` commits writes in
+Firestore-sized batches (500 operations) instead of one RPC per document.
+"""
+import logging
+
+logger = logging.getLogger(__name__)
+
+READ_CHUNK_SIZE = 100
+MAX_BATCH_OPS = 500
+
+
+def get_all_by_id(collection: str, ids, chunk_size: int = READ_CHUNK_SIZE) -> dict:
+    """Fetch many documents by id; returns {doc_id: data} for the ones that exist."""
+    from app.firebase_init import db
+
+    unique_ids = list(dict.fromkeys(doc_id for doc_id in ids if doc_id))
+    found = {}
+    for start in range(0, len(unique_ids), chunk_size):
+        refs = [db.collection(collection).document(doc_id) for doc_id in unique_ids[start:start + chunk_size]]
+        for snapshot in db.get_all(refs):
+            if snapshot.exists:
+                found[snapshot.id] = snapshot.to_dict()
+    return found
+
+
+class BatchWriter:
+    """
+    Accumulates writes and commits every `max_ops` operations.
+
+    Use as a context manager so the final partial batch is committed:
+
+        with BatchWriter() as writer:
+            writer.update(ref, {...})
+    """
+
+    def __init__(self, max_ops: int = MAX_BATCH_OPS, dry_run: bool = False):
+        from app.firebase_init import db
+
+        self._db = db
+        self.max_ops = max_ops
+        self.dry_run = dry_run
+        self._batch = db.batch()
+        self._pending = 0
+        self.committed_ops = 0
+        self.commits = 0
+
+    def _add(self, op: str, *args, ops: int = 1, **kwargs) -> None:
+        if self._pending + ops > self.max_ops:
+            self.commit()
+        getattr(self._batch, op)(*args, **kwargs)
+        self._pending += ops
+
+    def set(self, ref, data: dict, merge: bool = False) -> None:
+        self._add('set', ref, data, merge=merge)
+
+    def update(self, ref, data: dict) -> None:
+        self._add('update', ref, data)
+
+    def delete(self, ref) -> None:
+        self._add('delete', ref)
+
+    def group(self, writes: list) -> None:
+        """Add several (op, ref, data) writes that must land in the same batch."""
+        if self._pending + len(writes) > self.max_ops:
+            self.commit()
+        for op, ref, *data in writes:
+            self._add(op, ref, *data)
+
+    def commit(self) -> None:
+        if not self._pending:
+            return
+        if not self.dry_run:
+            self._batch.commit()
+        self.committed_ops += self._pending
+        self.commits += 1
+        self._batch = self._db.batch()
+        self._pending = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.commit()
+        return False
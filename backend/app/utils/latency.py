@@ -0,0 +1,104 @@
+"""
+In-process latency histograms, rendered in Prometheus text format on
+/api/metrics.
+
+Each worker keeps its own counts (they reset on restart); the scraper sums
+across workers. Histograms are keyed by metric name plus label values:
+
+    observe('daraja_request_seconds', 0.42, endpoint='stk_push', outcome='ok')
+
+    with timed('payment_callback_seconds', route='payments'):
+        ...
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+# Upper bounds in seconds; +Inf is implicit
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+# Customer-facing payment stages include the time to enter an M-Pesa PIN
+STAGE_BUCKETS = (1, 5, 10, 20, 30, 45, 60, 90, 120, 300, 600)
+
+METRIC_HELP = {
+    'daraja_request_seconds': ('Daraja API request duration', DEFAULT_BUCKETS),
+    'payment_callback_seconds': ('M-Pesa callback handling duration', DEFAULT_BUCKETS),
+    'payment_stage_seconds': ('Time between purchase stage markers', STAGE_BUCKETS),
+}
+
+_lock = threading.Lock()
+_series = {}
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+def observe(name: str, seconds: float, **labels) -> None:
+    key = (name, tuple(sorted(labels.items())))
+    with _lock:
+        histogram = _series.get(key)
+        if histogram is None:
+            histogram = _series[key] = Histogram(METRIC_HELP.get(name, ('', DEFAULT_BUCKETS))[1])
+        histogram.observe(max(seconds, 0.0))
+
+
+@contextmanager
+def timed(name: str, **labels):
+    """Observe the duration of the block; adds outcome="error" if it raises."""
+    started = time.perf_counter()
+    outcome = 'ok'
+    try:
+        yield
+    except Exception:
+        outcome = 'error'
+        raise
+    finally:
+        observe(name, time.perf_counter() - started, outcome=outcome, **labels)
+
+
+def _label_text(labels: tuple, extra: tuple = ()) -> str:
+    pairs = list(labels) + list(extra)
+    return '{' + ','.join(f'{k}="{v}"' for k, v in pairs) + '}' if pairs else ''
+
+
+def render_prometheus() -> str:
+    with _lock:
+        snapshot = {
+            key: (h.buckets, list(h.counts), h.sum, h.count)
+            for key, h in _series.items()
+        }
+
+    lines = []
+    for name in sorted({key[0] for key in snapshot}):
+        help_text = METRIC_HELP.get(name, (name, None))[0]
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} histogram')
+        for (series_name, labels), (buckets, counts, total, count) in sorted(snapshot.items()):
+            if series_name != name:
+                continue
+            cumulative = 0
+            for bound, bucket_count in zip(list(buckets) + ['+Inf'], counts):
+                cumulative += bucket_count
+                lines.append(f'{name}_bucket{_label_text(labels, (("le", bound),))} {cumulative}')
+            lines.append(f'{name}_sum{_label_text(labels)} {total:.6f}')
+            lines.append(f'{name}_count{_label_text(labels)} {count}')
+        lines.append('')
+    return '\n'.join(lines)
+
+
+def percentile(sorted_values: list, q: float):
+    """Nearest-rank percentile of an already sorted list (None when empty)."""
+    if not sorted_values:
+        return None
+    rank = max(int(-(-q * len(sorted_values) // 100)), 1)
+    return sorted_values[min(rank, len(sorted_values)) - 1]
@@ -0,0 +1,72 @@
+"""
+Incremental multipart/form-data reading.
+
+Touching `request.files` makes werkzeug receive and spool the whole body
+before the view runs. `MultipartStream` reads `request.stream` chunk by chunk
+instead, so a view can validate and write a file part while it is still
+arriving and stop reading the moment it rejects it.
+"""
+from werkzeug.http import parse_options_header
+from werkzeug.sansio.multipart import Data, Epilogue, Field, File, MultipartDecoder, NeedData
+
+CHUNK_SIZE = 64 * 1024
+MAX_FIELD_BYTES = 16 * 1024
+
+
+class MultipartStream:
+    """Iterate the file parts of a multipart body; plain fields land in `fields`."""
+
+    def __init__(self, stream, content_type: str):
+        mimetype, options = parse_options_header(content_type or '')
+        if mimetype != 'multipart/form-data' or not options.get('boundary'):
+            raise ValueError('Expected a multipart/form-data body')
+        self._stream = stream
+        self._decoder = MultipartDecoder(options['boundary'].encode('latin-1'))
+        self._finished = False
+        self.fields = {}
+
+    def _events(self):
+        while True:
+            event = self._decoder.next_event()
+            if isinstance(event, NeedData):
+                if self._finished:
+                    raise ValueError('Incomplete multipart body')
+                chunk = self._stream.read(CHUNK_SIZE)
+                self._finished = not chunk
+                self._decoder.receive_data(chunk or None)
+            elif isinstance(event, Epilogue):
+                return
+            else:
+                yield event
+
+    @staticmethod
+    def _data(events):
+        for event in events:
+            if not isinstance(event, Data):
+                raise ValueError('Malformed multipart body')
+            if event.data:
+                yield event.data
+            if not event.more_data:
+                return
+
+    def parts(self):
+        """
+        Yield (field_name, filename, chunks) per file part, in body order.
+
+        `chunks` must be consumed (or abandoned along with the whole
+        iteration) before asking for the next part; leftovers are skipped.
+        """
+        events = self._events()
+        for event in events:
+            if isinstance(event, Field):
+                value = b''
+                for chunk in self._data(events):
+                    value += chunk
+                    if len(value) > MAX_FIELD_BYTES:
+                        raise ValueError(f'Form field {event.name} is too large')
+                self.fields[event.name] = value.decode('utf-8', 'replace')
+            elif isinstance(event, File):
+                chunks = self._data(events)
+                yield event.name, event.filename, chunks
+                for _ in chunks:
+                    pass
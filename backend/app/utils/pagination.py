@@ -0,0 +1,122 @@
+"""
+Cursor pagination and index-backed sort orders for Firestore listings.
+
+A cursor is an opaque, URL-safe token holding the sort value and document id
+of the last row on the previous page. Passing it back resumes the query with
+`start_after`, so a page costs `per_page + 1` document reads no matter how
+deep the client has paged. Every sort order also orders by document id so
+ties are broken deterministically.
+
+The composite indexes these queries need live in `firestore.indexes.json`
+at the backend root (deploy with `firebase deploy --only firestore:indexes`).
+"""
+import base64
+import json
+
+DOCUMENT_ID = '__name__'
+ASCENDING = 'ASCENDING'
+DESCENDING = 'DESCENDING'
+
+DEFAULT_SORT = 'newest'
+
+# collection -> sort name -> (field, direction)
+SORT_ORDERS = {
+    'housegirl_profiles': {
+        'newest': ('created_at', DESCENDING),
+        'salary_asc': ('expected_salary', ASCENDING),
+        'salary_desc': ('expected_salary', DESCENDING),
+        'most_unlocked': ('unlock_count', DESCENDING),
+        'recently_active': ('updated_at', DESCENDING),
+    },
+    'job_postings': {
+        'newest': ('created_at', DESCENDING),
+        'salary_asc': ('salary_min', ASCENDING),
+        'salary_desc': ('salary_max', DESCENDING),
+        'most_unlocked': ('applications_count', DESCENDING),
+        'recently_active': ('updated_at', DESCENDING),
+    },
+    'agencies': {
+        'newest': ('created_at', DESCENDING),
+        'salary_asc': ('monthly_fee', ASCENDING),
+        'salary_desc': ('monthly_fee', DESCENDING),
+        'most_unlocked': ('successful_placements', DESCENDING),
+        'recently_active': ('updated_at', DESCENDING),
+    },
+    'job_applications': {
+        'newest': ('applied_at', DESCENDING),
+        'oldest': ('applied_at', ASCENDING),
+    },
+    'user_purchases': {
+        'newest': ('purchase_date', DESCENDING),
+        'oldest': ('purchase_date', ASCENDING),
+    },
+}
+
+
+class InvalidCursor(ValueError):
+    """Raised when a client sends a cursor that cannot be decoded."""
+
+
+def encode_cursor(values: list) -> str:
+    raw = json.dumps(values, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token: str) -> list:
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor(f'Invalid cursor: {e}')
+    if not isinstance(values, list) or not values:
+        raise InvalidCursor('Invalid cursor')
+    return values
+
+
+def resolve_sort(collection: str, sort_name: str | None):
+    """Return (field, direction) for a sort name, or None if it is not supported."""
+    return SORT_ORDERS.get(collection, {}).get(sort_name or DEFAULT_SORT)
+
+
+def apply_order(query, field: str, direction: str, cursor: str | None = None):
+    """Order `query` by field (+ document id) and resume after `cursor` if given."""
+    query = query.order_by(field, direction=direction).order_by(DOCUMENT_ID, direction=direction)
+    if cursor:
+        value, doc_id = decode_cursor(cursor)[:2]
+        query = query.start_after({field: value, DOCUMENT_ID: doc_id})
+    return query
+
+
+def cursor_for(doc: dict, doc_id: str, field: str) -> str:
+    return encode_cursor([doc.get(field), doc_id])
+
+
+def take_page(rows, per_page: int):
+    """
+    Consume at most per_page + 1 items from an iterator of (doc_id, doc) pairs.
+
+    Returns (page, has_next). Stops pulling from the underlying stream as soon
+    as one row past the page has been seen, so `has_next` never needs a count.
+    """
+    page = []
+    for row in rows:
+        if len(page) == per_page:
+            return page, True
+        page.append(row)
+    return page, False
+
+
+def page_info(page: list, per_page: int, has_next: bool, cursor: str | None, field: str, sort_name: str) -> dict:
+    """Build the `pagination` block for a cursor-paginated response."""
+    next_cursor = None
+    if has_next and page:
+        last_id, last_doc = page[-1]
+        next_cursor = cursor_for(last_doc, last_id, field)
+    return {
+        'per_page': per_page,
+        'sort': sort_name,
+        'cursor': cursor,
+        'next_cursor': next_cursor,
+        'has_next': has_next,
+        'has_prev': bool(cursor)
+    }
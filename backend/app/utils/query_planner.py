@@ -0,0 +1,107 @@
+"""
+Decide which listing predicates Firestore can evaluate and which stay in Python.
+
+Equality and array filters are always pushed down (single-field indexes and
+index merging cover them). Range filters are only pushed when a composite
+index declared in `firestore.indexes.json` covers the exact query shape;
+anything else becomes a residual predicate applied lazily while streaming.
+Keeping the decision tied to the shipped index file means a missing index
+degrades to in-memory filtering instead of a FAILED_PRECONDITION at runtime.
+"""
+import json
+import logging
+from functools import lru_cache
+from pathlib import Path
+
+from app.utils.pagination import DOCUMENT_ID
+
+logger = logging.getLogger(__name__)
+
+INDEXES_PATH = Path(__file__).resolve().parents[2] / 'firestore.indexes.json'
+
+_RANGE_OPS = {
+    '>=': lambda value, bound: value >= bound,
+    '>': lambda value, bound: value > bound,
+    '<=': lambda value, bound: value <= bound,
+    '<': lambda value, bound: value < bound,
+}
+
+
+@lru_cache(maxsize=None)
+def declared_indexes(path: str = str(INDEXES_PATH)) -> dict:
+    """
+    Return {collection: {(prefix fields, tail fields)}} from the index file.
+
+    The prefix is the frozenset of equality/array fields; the tail is the
+    ordered tuple of the remaining (order_by and range) fields.
+    """
+    try:
+        with open(path) as fh:
+            spec = json.load(fh)
+    except (OSError, ValueError) as e:
+        logger.warning(f'Could not read {path}: {e}')
+        return {}
+
+    shapes = {}
+    for index in spec.get('indexes', []):
+        fields = [f for f in index.get('fields', []) if f.get('fieldPath') != DOCUMENT_ID]
+        for split in range(len(fields) + 1):
+            prefix = frozenset(f['fieldPath'] for f in fields[:split])
+            tail = tuple(f['fieldPath'] for f in fields[split:])
+            shapes.setdefault(index.get('collectionGroup'), set()).add((prefix, tail))
+    return shapes
+
+
+def has_index(collection: str, prefix_fields, tail_fields) -> bool:
+    return (frozenset(prefix_fields), tuple(tail_fields)) in declared_indexes().get(collection, set())
+
+
+class RangeFilter:
+    """A `field <op> value` predicate; missing fields never match (as in Firestore)."""
+
+    def __init__(self, field: str, op: str, value):
+        self.field = field
+        self.op = op
+        self.value = value
+
+    def matches(self, doc: dict) -> bool:
+        value = doc.get(self.field)
+        if value is None:
+            return False
+        try:
+            return _RANGE_OPS[self.op](value, self.value)
+        except TypeError:
+            return False
+
+    def __repr__(self) -> str:
+        return f'{self.field} {self.op} {self.value!r}'
+
+
+def plan_ranges(collection: str, prefix_fields, order_field: str, ranges: list) -> tuple:
+    """
+    Split range filters into (pushed, residual).
+
+    Tries to push every range filter, then each one on its own, and keeps the
+    first combination backed by a declared index. A range on the ordered field
+    needs no extra index entry, so it is always pushable.
+    """
+    prefix_fields = list(prefix_fields)
+    candidates = [list(ranges)] + [[r] for r in ranges] if len(ranges) > 1 else [list(ranges)]
+
+    for pushed in candidates:
+        tail = [order_field]
+        for r in pushed:
+            if r.field not in tail:
+                tail.append(r.field)
+        if len(tail) == 1 or has_index(collection, prefix_fields, tail):
+            residual = [r for r in ranges if r not in pushed]
+            return pushed, residual
+
+    on_order_field = [r for r in ranges if r.field == order_field]
+    return on_order_field, [r for r in ranges if r.field != order_field]
+
+
+def apply_ranges(query, ranges: list):
+    for r in ranges:
+        query = query.where(r.field, r.op, r.value)
+    return query
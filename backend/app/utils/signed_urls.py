@@ -0,0 +1,78 @@
+"""
+Short-lived HMAC-signed photo URLs.
+
+Endpoints that already decided a viewer may see a profile hand out signed
+URLs for its photos; serving a signed URL only needs a constant-time
+signature check and an expiry check, with no Firebase token verification or
+Firestore read. Photo URLs on profiles are checked to be the owner's own
+photos when they are stored (photo_store.foreign_photo_url), so signing them
+never hands out someone else's image. Profile photos are shown to signed-in users only: public
+endpoints use `photo_url_for`, which signs for an authenticated viewer and
+hands anonymous callers no local photo URL at all.
+
+    /api/photos/file/<user_id>/<filename>
+        -> /api/photos/signed/<user_id>/<filename>?exp=<unix>&sig=<hex>
+
+Expiries are rounded up to a fixed window so the same photo gets the same
+URL for every response in that window, which lets browsers and CDNs reuse
+their cached copy.
+"""
+import hashlib
+import hmac
+import time
+from urllib.parse import urlencode
+
+from flask import current_app
+
+LOCAL_PREFIX = '/api/photos/file/'
+SIGNED_PREFIX = '/api/photos/signed/'
+
+DEFAULT_TTL_SECONDS = 60 * 60
+EXPIRY_WINDOW_SECONDS = 15 * 60
+
+
+def _secret() -> bytes:
+    config = current_app.config
+    return (config.get('PHOTO_URL_SECRET') or config['SECRET_KEY']).encode('utf-8')
+
+
+def signature(path: str, expires: int) -> str:
+    return hmac.new(_secret(), f'{path}:{expires}'.encode('utf-8'), hashlib.sha256).hexdigest()
+
+
+def expiry(ttl: int = None, now: float = None) -> int:
+    ttl = ttl or current_app.config.get('PHOTO_URL_TTL_SECONDS', DEFAULT_TTL_SECONDS)
+    now = time.time() if now is None else now
+    return (int(now) // EXPIRY_WINDOW_SECONDS + 1) * EXPIRY_WINDOW_SECONDS + ttl
+
+
+def sign_photo_url(url: str, ttl: int = None):
+    """Signed form of a local photo URL; other URLs (external avatars, empty) pass through."""
+    if not url or not url.startswith(LOCAL_PREFIX):
+        return url
+    path = url[len(LOCAL_PREFIX):]
+    query = ''
+    if '?' in path:
+        path, query = path.split('?', 1)
+    expires = expiry(ttl)
+    params = urlencode({'exp': expires, 'sig': signature(path, expires)})
+    return f"{SIGNED_PREFIX}{path}?{params}{'&' + query if query else ''}"
+
+
+def photo_url_for(url: str, viewer_id, ttl: int = None):
+    """`sign_photo_url` for a signed-in viewer; anonymous viewers get external avatars only."""
+    if viewer_id:
+        return sign_photo_url(url, ttl)
+    if url and url.startswith(LOCAL_PREFIX):
+        return None
+    return url
+
+
+def verify(path: str, expires, sig: str, now: float = None) -> bool:
+    try:
+        expires = int(expires)
+    except (TypeError, ValueError):
+        return False
+    if expires < (time.time() if now is None else now):
+        return False
+    return hmac.compare_digest(signature(path, expires), sig or '')
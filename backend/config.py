@@ -13,6 +13,25 @@ class Config:
     UPLOAD_FOLDER = os.environ.get('UPLOAD_FOLDER') or 'uploads'
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size
     ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif'}
+    # Background threads generating resized photo derivatives (needs Pillow)
+    PHOTO_DERIVATIVE_WORKERS = int(os.environ.get('PHOTO_DERIVATIVE_WORKERS', 2))
+    # Signed photo URLs (served without a Firebase token); secret defaults to SECRET_KEY
+    PHOTO_URL_SECRET = os.environ.get('PHOTO_URL_SECRET')
+    PHOTO_URL_TTL_SECONDS = int(os.environ.get('PHOTO_URL_TTL_SECONDS', 60 * 60))
+    # Photo bytes: 'local' (UPLOAD_FOLDER) or 's3' (any S3-compatible bucket, needs boto3)
+    PHOTO_STORAGE_BACKEND = os.environ.get('PHOTO_STORAGE_BACKEND') or 'local'
+    S3_BUCKET = os.environ.get('S3_BUCKET')
+    S3_ENDPOINT_URL = os.environ.get('S3_ENDPOINT_URL')
+    S3_REGION = os.environ.get('S3_REGION')
+    S3_PREFIX = os.environ.get('S3_PREFIX') or ''
+    PHOTO_UPLOAD_URL_TTL_SECONDS = int(os.environ.get('PHOTO_UPLOAD_URL_TTL_SECONDS', 15 * 60))
+    # Let the front proxy stream local photo files: '' (app sends them), 'nginx' or 'sendfile'
+    PHOTO_OFFLOAD_MODE = os.environ.get('PHOTO_OFFLOAD_MODE') or ''
+    PHOTO_OFFLOAD_PREFIX = os.environ.get('PHOTO_OFFLOAD_PREFIX') or '/_protected_photos/'
+    
+    # "Similar workers" TF-IDF index (memory-mapped, rebuilt in the background)
+    SIMILARITY_INDEX_DIR = os.environ.get('SIMILARITY_INDEX_DIR') or 'instance/similarity'
+    SIMILARITY_REBUILD_SECONDS = int(os.environ.get('SIMILARITY_REBUILD_SECONDS', 15 * 60))
     
     # CORS configuration
     cors_origins_env = os.environ.get('CORS_ORIGINS')
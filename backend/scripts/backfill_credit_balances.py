@@ -0,0 +1,46 @@
+"""
+Seed `credit_balances` for users who bought or used contact credits before
+the ledger existed.
+
+Balances are also seeded lazily on first read, so this is optional; running
+it right after deploy keeps the first request for each user fast.
+
+Usage:
+    python scripts/backfill_credit_balances.py
+"""
+import sys
+from pathlib import Path
+
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from app.firebase_init import db  # noqa: E402
+from app.services.credits import BALANCES, ensure_balance  # noqa: E402
+
+
+def main() -> None:
+    print("=== Seeding credit_balances ===")
+    user_ids = set()
+    for collection_name in ("user_purchases", "contact_access"):
+        for doc in db.collection(collection_name).select(["user_id"]).stream():
+            user_id = (doc.to_dict() or {}).get("user_id")
+            if user_id:
+                user_ids.add(user_id)
+
+    seeded = 0
+    skipped = 0
+    for user_id in sorted(user_ids):
+        if db.collection(BALANCES).document(user_id).get().exists:
+            skipped += 1
+            continue
+        balance = ensure_balance(user_id)
+        seeded += 1
+        print(f"SEEDED {user_id}: remaining={balance.get('remaining_credits', 0)}")
+
+    print(f"Done credit_balances: seeded={seeded}, skipped={skipped}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+Embed `employer_snapshot` on job postings created before the snapshot existed.
+
+Listings fill missing snapshots lazily, but running this once after deploy
+avoids the slow first render of every legacy job.
+
+Usage:
+    python scripts/backfill_employer_snapshots.py
+"""
+import sys
+from pathlib import Path
+
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from app.firebase_init import db  # noqa: E402
+from app.services.employer_snapshot import SNAPSHOT_FIELD, build_employer_snapshot  # noqa: E402
+
+BATCH_SIZE = 500
+
+
+def main() -> None:
+    print("=== Backfilling job_postings.employer_snapshot ===")
+    snapshots = {}
+    updated = 0
+    skipped = 0
+    batch = db.batch()
+    pending = 0
+
+    for doc in db.collection("job_postings").stream():
+        job = doc.to_dict() or {}
+        employer_id = job.get("employer_id")
+        if job.get(SNAPSHOT_FIELD) or not employer_id:
+            skipped += 1
+            continue
+
+        # One snapshot per employer, however many jobs they have
+        if employer_id not in snapshots:
+            snapshots[employer_id] = build_employer_snapshot(employer_id)
+        batch.update(doc.reference, {SNAPSHOT_FIELD: snapshots[employer_id]})
+        pending += 1
+        updated += 1
+        if pending >= BATCH_SIZE:
+            batch.commit()
+            batch = db.batch()
+            pending = 0
+
+    if pending:
+        batch.commit()
+
+    print(f"Done job_postings: updated={updated}, skipped={skipped}, employers={len(snapshots)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+"""
+Backfill the fields used by index-backed sort orders (`?sort=` on the
+housegirl, job and agency listings, applicant lists and purchase history).
+
+Firestore leaves documents out of an `order_by` query when the ordered field
+is missing, so legacy documents must carry every sort field before the sorted
+listings will show them. Run this once after deploying
+`firestore.indexes.json`.
+
+`applications_count` is recomputed for every job, not only filled in where
+missing: before the apply endpoint seeded it, the first application to a
+legacy job created the field with the value 1.
+
+The sorted housegirl listing walks `housegirl_profiles` only, so housegirl
+users who never got a profile doc are given the same empty one that
+GET /api/housegirls/<id> creates for them.
+
+Usage:
+    python scripts/backfill_sort_fields.py
+"""
+import sys
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from firebase_admin import firestore  # noqa: E402
+
+from app.firebase_init import db  # noqa: E402
+from app.services.applications import count_matching  # noqa: E402
+
+BATCH_SIZE = 500
+
+
+def recount_applications() -> None:
+    print("=== Recounting job_postings.applications_count ===")
+    stats = Counter()
+
+    @firestore.transactional
+    def recount(transaction, job_ref):
+        # Read the job before counting: an application committed after this
+        # read makes the transaction retry, so the count cannot go stale.
+        job = job_ref.get(transaction=transaction).to_dict() or {}
+        job_id = job.get("id") or job_ref.id
+        actual = count_matching(db.collection("job_applications").where("job_id", "==", job_id))
+        if job.get("applications_count") == actual:
+            return False
+        transaction.update(job_ref, {"applications_count": actual})
+        print(f"FIXED {job_id}: {job.get('applications_count')} -> {actual}")
+        return True
+
+    for doc in db.collection("job_postings").select(["id"]).stream():
+        stats["fixed" if recount(db.transaction(), doc.reference) else "correct"] += 1
+
+    print(f"Done applications_count: fixed={stats['fixed']}, correct={stats['correct']}")
+    print()
+
+
+def seed_housegirl_profiles() -> None:
+    print("=== Seeding housegirl_profiles for housegirl users without one ===")
+    linked_users = set()
+    linked_profiles = set()
+    for doc in db.collection("housegirl_profiles").select(["user_id", "profile_id"]).stream():
+        data = doc.to_dict() or {}
+        linked_users.add(data.get("user_id") or doc.id)
+        linked_profiles.add(data.get("profile_id"))
+    profile_of = {
+        (doc.to_dict() or {}).get("user_id"): (doc.to_dict() or {}).get("id") or doc.id
+        for doc in db.collection("profiles").select(["user_id", "id"]).stream()
+    }
+
+    seeded = 0
+    batch = db.batch()
+    users = db.collection("users").where("user_type", "==", "housegirl").select(["created_at"]).stream()
+    for doc in users:
+        if doc.id in linked_users or profile_of.get(doc.id) in linked_profiles - {None}:
+            continue
+        created_at = (doc.to_dict() or {}).get("created_at") or datetime.utcnow().isoformat()
+        batch.set(db.collection("housegirl_profiles").document(doc.id), {
+            "id": doc.id,
+            "user_id": doc.id,
+            "skills": [],
+            "expected_salary": 0,
+            "is_available": True,
+            "unlock_count": 0,
+            "activation_fee_paid": False,
+            "in_demand_alert": False,
+            "created_at": created_at,
+            "updated_at": created_at,
+        })
+        seeded += 1
+        if seeded % BATCH_SIZE == 0:
+            batch.commit()
+            batch = db.batch()
+    batch.commit()
+
+    print(f"Done housegirl_profiles: seeded={seeded}")
+    print()
+
+
+def backfill_collection(collection_name: str, defaults_for) -> None:
+    print(f"=== Backfilling {collection_name} ===")
+    updated = 0
+    skipped = 0
+    batch = db.batch()
+    pending = 0
+
+    for doc in db.collection(collection_name).stream():
+        data = doc.to_dict() or {}
+        missing = {
+            key: value for key, value in defaults_for(doc.id, data).items()
+            if data.get(key) is None
+        }
+        if not missing:
+            skipped += 1
+            continue
+
+        batch.update(doc.reference, missing)
+        pending += 1
+        updated += 1
+        if pending >= BATCH_SIZE:
+            batch.commit()
+            batch = db.batch()
+            pending = 0
+
+    if pending:
+        batch.commit()
+
+    print(f"Done {collection_name}: updated={updated}, skipped={skipped}")
+    print()
+
+
+def timestamps(data: dict) -> dict:
+    created_at = data.get("created_at") or datetime.utcnow().isoformat()
+    return {
+        "created_at": created_at,
+        "updated_at": data.get("updated_at") or created_at,
+    }
+
+
+def main() -> None:
+    seed_housegirl_profiles()
+    backfill_collection("housegirl_profiles", lambda doc_id, data: {
+        **timestamps(data),
+        "expected_salary": 0,
+        "unlock_count": 0,
+    })
+    backfill_collection("job_postings", lambda doc_id, data: {
+        **timestamps(data),
+        "salary_min": 0,
+        "salary_max": data.get("salary_min") or 0,
+    })
+    recount_applications()
+    backfill_collection("agencies", lambda doc_id, data: {
+        **timestamps(data),
+        "monthly_fee": 0,
+        "successful_placements": 0,
+    })
+    backfill_collection("job_applications", lambda doc_id, data: {
+        "applied_at": data.get("created_at") or datetime.utcnow().isoformat(),
+    })
+    backfill_collection("user_purchases", lambda doc_id, data: {
+        "purchase_date": data.get("created_at") or datetime.utcnow().isoformat(),
+    })
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Backfill skills/languages bitmasks on documents written before the
+controlled vocabulary existed.
+
+Jobs without `skills_required_terms` are invisible to the
+`array_contains_any` pushdown used by `GET /api/jobs?skills=...`, so run
+this once after deploying the vocabulary (and again whenever terms or
+synonyms are appended).
+
+Usage:
+    python scripts/backfill_vocabulary_masks.py
+"""
+import sys
+from pathlib import Path
+
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from app.firebase_init import db  # noqa: E402
+from app.services.skills_vocabulary import encode_fields  # noqa: E402
+
+BATCH_SIZE = 500
+
+
+def backfill_collection(collection_name: str, fields: tuple) -> None:
+    print(f"=== Backfilling {collection_name} ===")
+    updated = 0
+    skipped = 0
+    batch = db.batch()
+    pending = 0
+
+    for doc in db.collection(collection_name).stream():
+        data = doc.to_dict() or {}
+        derived = encode_fields({field: data.get(field, []) for field in fields})
+        stale = {
+            key: value for key, value in derived.items()
+            if data.get(key) != value
+        }
+        if not stale:
+            skipped += 1
+            continue
+
+        batch.update(doc.reference, stale)
+        pending += 1
+        updated += 1
+        if pending >= BATCH_SIZE:
+            batch.commit()
+            batch = db.batch()
+            pending = 0
+
+    if pending:
+        batch.commit()
+
+    print(f"Done {collection_name}: updated={updated}, skipped={skipped}")
+    print()
+
+
+def main() -> None:
+    backfill_collection("housegirl_profiles", ("skills", "languages"))
+    backfill_collection("job_postings", ("skills_required", "languages_required"))
+
+
+if __name__ == "__main__":
+    main()
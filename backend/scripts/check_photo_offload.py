@@ -0,0 +1,118 @@
+"""
+Check that photo downloads are offloaded to the front proxy and that Range
+and conditional requests still work through it.
+
+Run the API with PHOTO_OFFLOAD_MODE=nginx behind deploy/nginx-photos.conf,
+take a photo URL from any API response (`signed_url`, or a /api/photos/file/
+URL plus --token), then:
+
+Usage:
+    python scripts/check_photo_offload.py --base-url http://127.0.0.1:8080 --url '/api/photos/signed/...'
+    python scripts/check_photo_offload.py --base-url http://127.0.0.1:8080 \\
+        --app-url http://127.0.0.1:5000 --url '/api/photos/file/<uid>/<name>' --token <id token> --requests 200
+"""
+import argparse
+import statistics
+import sys
+import time
+
+import requests
+
+OFFLOAD_HEADERS = ("X-Accel-Redirect", "X-Sendfile")
+
+
+class Checker:
+    def __init__(self):
+        self.failures = 0
+
+    def check(self, name: str, ok: bool, detail: str = "") -> bool:
+        print(f"{'PASS' if ok else 'FAIL'}  {name}{'  (' + detail + ')' if detail else ''}")
+        if not ok:
+            self.failures += 1
+        return ok
+
+
+def timed_gets(session, url: str, headers: dict, count: int) -> list:
+    timings = []
+    for _ in range(count):
+        started = time.perf_counter()
+        response = session.get(url, headers=headers)
+        response.content
+        timings.append(time.perf_counter() - started)
+    return sorted(timings)
+
+
+def summarize(label: str, timings: list) -> None:
+    if not timings:
+        return
+    p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+    print(f"{label}: {len(timings)} requests, mean {statistics.mean(timings) * 1000:.1f} ms, "
+          f"p95 {p95 * 1000:.1f} ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--base-url", default="http://127.0.0.1:8080", help="Front proxy (nginx)")
+    parser.add_argument("--app-url", help="The API behind the proxy, to inspect the offload response")
+    parser.add_argument("--url", required=True, help="Photo path (signed, or /api/photos/file/... with --token)")
+    parser.add_argument("--token", help="Firebase ID token for /api/photos/file/ URLs")
+    parser.add_argument("--requests", type=int, default=50, help="Requests per timing run")
+    args = parser.parse_args()
+
+    headers = {"Authorization": f"Bearer {args.token}"} if args.token else {}
+    session = requests.Session()
+    checker = Checker()
+    front_url = args.base_url.rstrip("/") + args.url
+
+    if args.app_url:
+        upstream = session.get(args.app_url.rstrip("/") + args.url, headers=headers)
+        offload = next((h for h in OFFLOAD_HEADERS if h in upstream.headers), None)
+        checker.check("API answers with an offload header", upstream.status_code == 200 and offload is not None,
+                      f"status {upstream.status_code}, {offload}: {upstream.headers.get(offload or '', '-')}")
+        checker.check("API sends no body", len(upstream.content) == 0, f"{len(upstream.content)} bytes")
+        if offload == "X-Accel-Redirect":
+            internal = session.get(args.base_url.rstrip("/") + upstream.headers[offload])
+            checker.check("internal location is not public", internal.status_code == 404,
+                          f"status {internal.status_code}")
+
+    full = session.get(front_url, headers=headers)
+    if not checker.check("full download", full.status_code == 200 and len(full.content) > 0,
+                         f"status {full.status_code}, {len(full.content)} bytes, {full.headers.get('Content-Type')}"):
+        sys.exit(1)
+    body = full.content
+    checker.check("offload header not leaked to the client",
+                  not any(h in full.headers for h in OFFLOAD_HEADERS))
+    checker.check("Content-Length matches", full.headers.get("Content-Length") == str(len(body)))
+
+    head = session.get(front_url, headers={**headers, "Range": "bytes=0-99"})
+    checker.check("Range bytes=0-99", head.status_code == 206 and head.content == body[:100],
+                  f"status {head.status_code}, {head.headers.get('Content-Range')}")
+    tail = session.get(front_url, headers={**headers, "Range": "bytes=-50"})
+    checker.check("Range bytes=-50", tail.status_code == 206 and tail.content == body[-50:],
+                  f"status {tail.status_code}, {tail.headers.get('Content-Range')}")
+
+    etag = full.headers.get("ETag")
+    if args.app_url:
+        checker.check("client gets the API's ETag", etag == upstream.headers.get("ETag"),
+                      f"{etag} vs {upstream.headers.get('ETag')}")
+    if checker.check("ETag present", bool(etag), etag or ""):
+        cached = session.get(front_url, headers={**headers, "If-None-Match": etag})
+        checker.check("If-None-Match -> 304", cached.status_code == 304 and not cached.content,
+                      f"status {cached.status_code}")
+    last_modified = full.headers.get("Last-Modified")
+    if checker.check("Last-Modified present", bool(last_modified), last_modified or ""):
+        cached = session.get(front_url, headers={**headers, "If-Modified-Since": last_modified})
+        checker.check("If-Modified-Since -> 304", cached.status_code == 304, f"status {cached.status_code}")
+
+    if args.requests > 0:
+        summarize("through proxy", timed_gets(session, front_url, headers, args.requests))
+        if args.app_url:
+            summarize("API only (worker time)",
+                      timed_gets(session, args.app_url.rstrip("/") + args.url, headers, args.requests))
+
+    print(f"Done: {checker.failures} failure(s)")
+    sys.exit(1 if checker.failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,418 @@
+"""
+Remove photo files no Firestore doc points at, and clear profile photo URLs
+that point at deleted photos.
+
+The tree is reconciled in units. For each unit the keys Firestore expects and
+the keys storage holds are fetched in parallel and compared as sets:
+
+- blobs/<aa> (256 units): content-addressed blobs whose hash starts with
+  <aa>, against `photos` docs in that hash range (a `sha256` range query, so
+  no unit reads the whole collection).
+- legacy: per-user files from before content addressing (local storage).
+- upload: direct uploads whose bytes arrived but that were never completed.
+- tmp: upload temp files left behind by crashed requests.
+- quarantine: orphans moved aside by earlier runs, deleted once older than
+  --quarantine-days.
+- profiles: `profile_photo_url`/`photo_url` on users, housegirl_profiles and
+  employer_profiles pointing at a local photo no `photos` doc has any more
+  (`primary_photo_id` is cleared along with `profile_photo_url`).
+
+Orphans younger than --min-age-hours are left alone (uploads in flight);
+older ones are moved to quarantine/<date>/<key> instead of being deleted, so
+a mistake is undone by moving them back. Files that docs point at but storage
+lacks, and photo_blobs reference counts that disagree with the docs, are
+reported (--fix-refcounts rewrites the counts; run it when uploads are quiet).
+
+Progress is checkpointed after every unit, and --max-units bounds a single
+run, so a large tree is covered by several short scheduled runs:
+    python scripts/gc_photos.py --dry-run
+    python scripts/gc_photos.py --max-units 32
+    python scripts/gc_photos.py --restart --fix-refcounts
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from pathlib import Path
+
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from app.firebase_init import db  # noqa: E402
+from app.services import photo_store  # noqa: E402
+from app.services.photo_derivatives import derivative_keys  # noqa: E402
+from app.services.photo_primary import PHOTO_URL_FIELD, PRIMARY_ID_FIELD  # noqa: E402
+from app.services.photo_storage import LocalStorage, get_storage  # noqa: E402
+from app.utils.firestore_batch import BatchWriter  # noqa: E402
+from app.utils.signed_urls import LOCAL_PREFIX  # noqa: E402
+from config import Config  # noqa: E402
+
+DEFAULT_CHECKPOINT = PROJECT_ROOT / "instance" / "photo_gc_checkpoint.json"
+DEFAULT_MIN_AGE_HOURS = 24
+DEFAULT_QUARANTINE_DAYS = 7
+
+QUARANTINE_DIR = "quarantine"
+RESERVED_DIRS = {photo_store.BLOBS_DIR, photo_store.TMP_DIR, photo_store.UPLOADS_DIR, QUARANTINE_DIR}
+PROFILE_COLLECTIONS = ("users", "housegirl_profiles", "employer_profiles")
+PROFILE_PHOTO_FIELDS = (PHOTO_URL_FIELD, "photo_url")
+
+BLOB_UNITS = [f"{photo_store.BLOBS_DIR}/{i:02x}" for i in range(256)]
+UNITS = BLOB_UNITS + ["legacy", photo_store.UPLOADS_DIR, "tmp", QUARANTINE_DIR, "profiles"]
+
+
+class Checkpoint:
+    """Units finished in the current cycle and their summed stats, persisted as JSON."""
+
+    def __init__(self, path: Path, enabled: bool = True):
+        self.path = path
+        self.enabled = enabled
+        self.state = {"completed": [], "stats": {}}
+        if enabled and path.exists():
+            self.state = json.loads(path.read_text())
+
+    def done(self, unit: str) -> bool:
+        return unit in self.state["completed"]
+
+    def complete(self, unit: str, stats: Counter) -> None:
+        self.state["completed"].append(unit)
+        self.state["stats"] = dict(Counter(self.state["stats"]) + stats)
+        self.state["updated_at"] = datetime.utcnow().isoformat()
+        self._save()
+
+    def finish(self) -> None:
+        if self.enabled and self.path.exists():
+            self.path.unlink()
+
+    def _save(self) -> None:
+        if not self.enabled:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(self.state, indent=2))
+        os.replace(tmp, self.path)
+
+
+def human_bytes(size: int) -> str:
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024 or unit == "GB":
+            return f"{size:.1f} {unit}" if unit != "B" else f"{size} B"
+        size /= 1024
+
+
+def in_parallel(*calls) -> list:
+    with ThreadPoolExecutor(max_workers=len(calls)) as pool:
+        futures = [pool.submit(call) for call in calls]
+        return [future.result() for future in futures]
+
+
+def photo_key(photo_url: str):
+    """Storage key of a local photo URL's original, else None (external avatars, empty)."""
+    path = (photo_url or "").split("?", 1)[0]
+    if not path.startswith(LOCAL_PREFIX):
+        return None
+    user_id, _, filename = path[len(LOCAL_PREFIX):].partition("/")
+    blob = photo_store.parse_blob_name(filename)
+    return photo_store.blob_key(*blob) if blob else f"{user_id}/{os.path.basename(filename)}"
+
+
+def with_derivatives(keys) -> set:
+    expected = set()
+    for key in keys:
+        expected.add(key)
+        expected.update(derivative_keys(key))
+    return expected
+
+
+def in_hash_range(collection: str, prefix: str, fields: list):
+    high = f"{int(prefix, 16) + 1:02x}" if prefix != "ff" else "g"  # "g" sorts after every hex digit
+    query = db.collection(collection).where("sha256", ">=", prefix).where("sha256", "<", high)
+    return list(query.select(fields).stream())
+
+
+def listing(storage, prefix: str) -> dict:
+    return {key: (size, mtime) for key, size, mtime in storage.list(prefix)}
+
+
+def quarantine_orphans(storage, orphans: dict, args, stats: Counter, still_referenced=None) -> None:
+    cutoff = time.time() - args.min_age_hours * 3600
+    day = datetime.utcnow().date().isoformat()
+    for key, (size, mtime) in sorted(orphans.items()):
+        if mtime > cutoff:
+            stats["young_skipped"] += 1
+            continue
+        stats["orphans"] += 1
+        stats["orphan_bytes"] += size
+        if args.dry_run:
+            print(f"  orphan {key} ({human_bytes(size)})")
+            continue
+        # Re-check right before moving: an upload may have referenced it since the listing
+        if still_referenced and still_referenced(key):
+            stats["orphans_rereferenced"] += 1
+            continue
+        storage.move(key, f"{QUARANTINE_DIR}/{day}/{key}")
+        stats["quarantined"] += 1
+
+
+def blob_still_referenced(key: str) -> bool:
+    blob = photo_store.parse_blob_name(os.path.basename(key))
+    return bool(blob) and photo_store.blob_ref(blob[0]).get().exists
+
+
+def reconcile_blobs(unit: str, storage, args) -> Counter:
+    stats = Counter()
+    prefix = unit.split("/", 1)[1]
+    photos, blob_docs, stored = in_parallel(
+        lambda: in_hash_range("photos", prefix, ["sha256", "photo_url"]),
+        lambda: in_hash_range(photo_store.BLOBS, prefix, ["sha256", "ext", "ref_count"]),
+        lambda: listing(storage, f"{unit}/"),
+    )
+
+    references = Counter()
+    originals = set()
+    for snapshot in photos:
+        photo = snapshot.to_dict() or {}
+        references[photo.get("sha256")] += 1
+        key = photo_key(photo.get("photo_url"))
+        if key:
+            originals.add(key)
+
+    expected = with_derivatives(originals)
+    stats["files_scanned"] += len(stored)
+    stats["bytes_scanned"] += sum(size for size, _ in stored.values())
+    stats["missing"] += len(originals - stored.keys())
+    for key in sorted(originals - stored.keys()):
+        print(f"  missing {key}")
+    orphans = {key: stored[key] for key in stored.keys() - expected}
+    quarantine_orphans(storage, orphans, args, stats, still_referenced=blob_still_referenced)
+
+    counted = {}
+    for snapshot in blob_docs:
+        counted[snapshot.id] = snapshot
+    with BatchWriter(dry_run=args.dry_run or not args.fix_refcounts) as writer:
+        for sha256 in set(counted) | (set(references) - {None}):
+            actual = references.get(sha256, 0)
+            snapshot = counted.get(sha256)
+            recorded = (snapshot.to_dict() or {}).get("ref_count", 0) if snapshot else 0
+            if recorded == actual:
+                continue
+            stats["refcount_drift"] += 1
+            print(f"  ref_count {sha256}: recorded {recorded}, actual {actual}")
+            ref = photo_store.blob_ref(sha256)
+            if actual == 0:
+                writer.delete(ref)
+            else:
+                writer.set(ref, {
+                    "sha256": sha256,
+                    "ref_count": actual,
+                    "updated_at": datetime.utcnow().isoformat(),
+                }, merge=True)
+            if not writer.dry_run:
+                stats["refcounts_fixed"] += 1
+    return stats
+
+
+def reconcile_legacy(storage, args) -> Counter:
+    stats = Counter()
+    if not isinstance(storage, LocalStorage):
+        return stats  # legacy per-user files only ever lived on local disk
+
+    def expected_keys():
+        keys = set()
+        for snapshot in db.collection("photos").select(["sha256", "photo_url"]).stream():
+            photo = snapshot.to_dict() or {}
+            key = photo_key(photo.get("photo_url"))
+            if key and not photo.get("sha256"):
+                keys.add(key)
+        return keys
+
+    def stored_keys():
+        stored = {}
+        if not os.path.isdir(storage.root):
+            return stored
+        for name in os.listdir(storage.root):
+            if name not in RESERVED_DIRS and os.path.isdir(os.path.join(storage.root, name)):
+                stored.update(listing(storage, name))
+        return stored
+
+    originals, stored = in_parallel(expected_keys, stored_keys)
+    stats["files_scanned"] += len(stored)
+    stats["bytes_scanned"] += sum(size for size, _ in stored.values())
+    stats["missing"] += len(originals - stored.keys())
+    for key in sorted(originals - stored.keys()):
+        print(f"  missing {key}")
+    expected = with_derivatives(originals)
+    quarantine_orphans(storage, {key: stored[key] for key in stored.keys() - expected}, args, stats)
+    return stats
+
+
+def purge_tmp(upload_folder: str, args) -> Counter:
+    """Spooled uploads always live on local disk, whatever the storage backend."""
+    stats = Counter()
+    local = LocalStorage(upload_folder)
+    cutoff = time.time() - args.min_age_hours * 3600
+    for key, (size, mtime) in listing(local, photo_store.TMP_DIR).items():
+        if mtime > cutoff:
+            continue
+        stats["stale_tmp"] += 1
+        stats["stale_tmp_bytes"] += size
+        if not args.dry_run:
+            local.delete(key)
+    return stats
+
+
+def purge_staged_uploads(storage, args) -> Counter:
+    """Direct uploads are moved into their blob key on completion; what is left was abandoned."""
+    stats = Counter()
+    cutoff = time.time() - args.min_age_hours * 3600
+    for key, (size, mtime) in listing(storage, f"{photo_store.UPLOADS_DIR}/").items():
+        if mtime > cutoff:
+            continue
+        stats["stale_uploads"] += 1
+        stats["stale_upload_bytes"] += size
+        if not args.dry_run:
+            storage.delete(key)
+    return stats
+
+
+def purge_quarantine(storage, args) -> Counter:
+    stats = Counter()
+    cutoff = (datetime.utcnow().date() - timedelta(days=args.quarantine_days)).isoformat()
+    for key, (size, _) in listing(storage, f"{QUARANTINE_DIR}/").items():
+        day = key.split("/", 2)[1]
+        if day >= cutoff:
+            stats["quarantine_held_bytes"] += size
+            continue
+        stats["purged"] += 1
+        stats["purged_bytes"] += size
+        if not args.dry_run:
+            storage.delete(key)
+    return stats
+
+
+def clear_dangling_profile_urls(args) -> Counter:
+    stats = Counter()
+
+    def photo_keys():
+        return {
+            photo_key((snapshot.to_dict() or {}).get("photo_url"))
+            for snapshot in db.collection("photos").select(["photo_url"]).stream()
+        }
+
+    def profile_urls(collection):
+        return lambda: list(db.collection(collection).select([*PROFILE_PHOTO_FIELDS, PRIMARY_ID_FIELD]).stream())
+
+    # Profiles first, photo keys after: photo_primary writes a photo doc and
+    # its mirrored URL in one transaction, so every URL read here has its
+    # photo doc visible to the later read. Read in parallel, an upload
+    # landing between the two reads would look dangling.
+    profiles = in_parallel(*(profile_urls(name) for name in PROFILE_COLLECTIONS))
+    known = photo_keys()
+    with BatchWriter(dry_run=args.dry_run) as writer:
+        for collection, snapshots in zip(PROFILE_COLLECTIONS, profiles):
+            for snapshot in snapshots:
+                data = snapshot.to_dict() or {}
+                updates = {}
+                for field in PROFILE_PHOTO_FIELDS:
+                    key = photo_key(data.get(field))
+                    if key and key not in known:
+                        updates[field] = None
+                if not updates:
+                    continue
+                stats["dangling_profile_urls"] += len(updates)
+                # The mirrored primary goes with its URL (see photo_primary)
+                if PHOTO_URL_FIELD in updates and data.get(PRIMARY_ID_FIELD):
+                    updates[PRIMARY_ID_FIELD] = None
+                print(f"  {collection}/{snapshot.id}: clearing {', '.join(updates)}")
+                updates["updated_at"] = datetime.utcnow().isoformat()
+                writer.update(snapshot.reference, updates)
+    return stats
+
+
+def run_unit(unit: str, storage, args) -> Counter:
+    if unit in BLOB_UNITS:
+        return reconcile_blobs(unit, storage, args)
+    if unit == "legacy":
+        return reconcile_legacy(storage, args)
+    if unit == photo_store.UPLOADS_DIR:
+        return purge_staged_uploads(storage, args)
+    if unit == "tmp":
+        return purge_tmp(args.upload_folder, args)
+    if unit == QUARANTINE_DIR:
+        return purge_quarantine(storage, args)
+    return clear_dangling_profile_urls(args)
+
+
+def report(stats: dict) -> None:
+    reclaimable = (stats.get("orphan_bytes", 0) + stats.get("stale_tmp_bytes", 0)
+                   + stats.get("stale_upload_bytes", 0))
+    print(f"Scanned {stats.get('files_scanned', 0)} files ({human_bytes(stats.get('bytes_scanned', 0))})")
+    print(f"Orphans: {stats.get('orphans', 0)} ({human_bytes(stats.get('orphan_bytes', 0))}), "
+          f"quarantined {stats.get('quarantined', 0)}, too young {stats.get('young_skipped', 0)}")
+    print(f"Stale temp files: {stats.get('stale_tmp', 0)} ({human_bytes(stats.get('stale_tmp_bytes', 0))}); "
+          f"abandoned uploads: {stats.get('stale_uploads', 0)} "
+          f"({human_bytes(stats.get('stale_upload_bytes', 0))})")
+    print(f"Quarantine purged: {stats.get('purged', 0)} ({human_bytes(stats.get('purged_bytes', 0))}), "
+          f"still held {human_bytes(stats.get('quarantine_held_bytes', 0))}")
+    print(f"Missing files: {stats.get('missing', 0)}; ref_count drift: {stats.get('refcount_drift', 0)} "
+          f"(fixed {stats.get('refcounts_fixed', 0)}); dangling profile URLs: "
+          f"{stats.get('dangling_profile_urls', 0)}")
+    print(f"Reclaimable: {human_bytes(reclaimable)} found, {human_bytes(stats.get('purged_bytes', 0))} freed, "
+          f"{human_bytes(stats.get('quarantine_held_bytes', 0))} waiting out the quarantine window")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--dry-run", action="store_true", help="Report without moving, deleting or writing")
+    parser.add_argument("--min-age-hours", type=float, default=DEFAULT_MIN_AGE_HOURS,
+                        help="Leave files younger than this alone (default: %(default)s)")
+    parser.add_argument("--quarantine-days", type=int, default=DEFAULT_QUARANTINE_DAYS,
+                        help="Delete quarantined files after this many days (default: %(default)s)")
+    parser.add_argument("--max-units", type=int, default=0, help="Stop after this many units (0 = all)")
+    parser.add_argument("--only", choices=("blobs", "legacy", photo_store.UPLOADS_DIR, "tmp", QUARANTINE_DIR,
+                                           "profiles"),
+                        help="Run only one kind of unit")
+    parser.add_argument("--fix-refcounts", action="store_true", help="Rewrite photo_blobs ref_count from the docs")
+    parser.add_argument("--upload-folder", default=Config.UPLOAD_FOLDER)
+    parser.add_argument("--checkpoint", type=Path, default=DEFAULT_CHECKPOINT)
+    parser.add_argument("--restart", action="store_true", help="Ignore any saved checkpoint")
+    args = parser.parse_args()
+
+    if args.restart and args.checkpoint.exists() and not args.dry_run:
+        args.checkpoint.unlink()
+    # A dry run never persists progress, otherwise the real run would skip work
+    checkpoint = Checkpoint(args.checkpoint, enabled=not args.dry_run)
+    if checkpoint.state["completed"]:
+        print(f"Resuming from checkpoint {args.checkpoint}: {len(checkpoint.state['completed'])} units done")
+
+    storage = get_storage(Config)
+    units = [unit for unit in UNITS if not args.only or unit.split("/", 1)[0] == args.only]
+    pending = [unit for unit in units if not checkpoint.done(unit)]
+    if args.max_units:
+        pending = pending[:args.max_units]
+
+    started = time.monotonic()
+    run_stats = Counter()
+    for unit in pending:
+        stats = +run_unit(unit, storage, args)  # drop zero counts
+        run_stats += stats
+        checkpoint.complete(unit, stats)
+        if stats:
+            print(f"{unit}: {dict(stats)}")
+
+    print(f"=== {len(pending)} units in {time.monotonic() - started:.1f}s ===")
+    if all(checkpoint.done(unit) for unit in units) and checkpoint.enabled:
+        print("Cycle complete:")
+        report(checkpoint.state["stats"])
+        checkpoint.finish()
+    else:
+        report(run_stats)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Generate thumbnail/card/full derivatives for photos uploaded before the
+derivative pipeline existed (or whose background job failed).
+
+Usage:
+    python scripts/generate_photo_derivatives.py
+    python scripts/generate_photo_derivatives.py --workers 4 --force
+"""
+import argparse
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from collections import Counter
+from pathlib import Path
+
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from app.firebase_init import db  # noqa: E402
+from app.services import photo_derivatives, photo_store  # noqa: E402
+from app.services.photo_storage import get_storage  # noqa: E402
+from config import Config  # noqa: E402
+
+
+def source_key(photo: dict):
+    """Storage key of a photo's original (legacy uploads live under <user_id>/)."""
+    parts = (photo.get("photo_url") or "").split("/")
+    if len(parts) < 2:
+        return None
+    blob = photo_store.parse_blob_name(parts[-1])
+    if blob:
+        return photo_store.blob_key(*blob)
+    return f"{parts[-2]}/{os.path.basename(parts[-1])}"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--workers", type=int, default=Config.PHOTO_DERIVATIVE_WORKERS)
+    parser.add_argument("--force", action="store_true", help="Regenerate photos that are already ready")
+    args = parser.parse_args()
+    storage = get_storage(Config)
+
+    if not photo_derivatives.available():
+        print("Pillow is not installed; nothing to do")
+        return
+
+    jobs = {}
+    stats = Counter()
+    for doc in db.collection("photos").stream():
+        photo = doc.to_dict() or {}
+        if photo.get("derivatives_status") == photo_derivatives.STATUS_READY and not args.force:
+            stats["skipped"] += 1
+            continue
+        key = source_key(photo)
+        if not key or not storage.exists(key):
+            stats["missing_file"] += 1
+            continue
+        # Photos sharing a blob get one job: concurrent writers of the same derivatives would collide
+        jobs.setdefault(key, []).append(doc.id)
+
+    print(f"=== Generating derivatives for {sum(map(len, jobs.values()))} photos ({len(jobs)} files) ===")
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        futures = [(pool.submit(photo_derivatives.process, photo_ids, key, storage), photo_ids)
+                   for key, photo_ids in jobs.items()]
+        for future, photo_ids in futures:
+            stats[future.result()] += len(photo_ids)
+
+    print(f"Done: {dict(stats)}")
+
+
+if __name__ == "__main__":
+    main()
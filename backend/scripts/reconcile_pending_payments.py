@@ -0,0 +1,164 @@
+"""
+Settle purchases whose M-Pesa callback never arrived.
+
+Pending purchases older than `--min-age-minutes` are read in pages ordered by
+`purchase_date`, and Daraja's STK push query is asked for each one with a
+bounded worker pool and a global request rate limit. Completed and failed
+results go through `settle_purchase`, the same idempotent path the callback
+uses, so a callback arriving mid-run cannot double credit. Purchases Daraja
+still reports as processing (or cannot find) are left alone until they are
+older than `--give-up-hours`, after which they are marked failed.
+
+Run on a schedule, or as a long-lived worker with --loop:
+    python scripts/reconcile_pending_payments.py
+    python scripts/reconcile_pending_payments.py --dry-run
+    python scripts/reconcile_pending_payments.py --loop 300
+    python scripts/reconcile_pending_payments.py --daraja-url http://127.0.0.1:8089
+
+The last form points at scripts/stub_daraja.py for local testing.
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from pathlib import Path
+
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from app.firebase_init import db  # noqa: E402
+from app.services.daraja import (  # noqa: E402
+    DarajaClient, DARAJA_BASE_URL, STATUS_COMPLETED, STATUS_FAILED
+)
+from app.services.payment_settlement import SOURCE_RECONCILER, settle_purchase  # noqa: E402
+from app.utils.pagination import ASCENDING, DOCUMENT_ID  # noqa: E402
+
+PAGE_SIZE = 100
+DEFAULT_MIN_AGE_MINUTES = int(os.environ.get("PAYMENT_RECONCILE_MIN_AGE_MINUTES", 5))
+DEFAULT_GIVE_UP_HOURS = int(os.environ.get("PAYMENT_RECONCILE_GIVE_UP_HOURS", 24))
+DEFAULT_CONCURRENCY = 4
+# Daraja throttles per consumer key; stay well under it
+DEFAULT_RATE = 5.0
+
+
+class RateLimiter:
+    """Spaces calls at least 1/rate seconds apart across all threads."""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._lock = threading.Lock()
+        self._next_at = 0.0
+
+    def wait(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_at)
+            self._next_at = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+
+def iter_stale_pending(cutoff: str):
+    """Yield pages of pending purchases created before `cutoff`, oldest first."""
+    query = (
+        db.collection("user_purchases")
+        .where("status", "==", "pending")
+        .where("purchase_date", "<", cutoff)
+        .order_by("purchase_date", direction=ASCENDING)
+        .order_by(DOCUMENT_ID, direction=ASCENDING)
+    )
+    cursor = None
+    while True:
+        page_query = query
+        if cursor:
+            page_query = page_query.start_after({"purchase_date": cursor[0], DOCUMENT_ID: cursor[1]})
+        page = list(page_query.limit(PAGE_SIZE).stream())
+        if not page:
+            return
+        yield page
+        last = page[-1]
+        cursor = (last.to_dict().get("purchase_date"), last.id)
+
+
+def reconcile_one(doc, client: DarajaClient, limiter: RateLimiter, give_up_before: str, dry_run: bool) -> str:
+    purchase = doc.to_dict() or {}
+    checkout_request_id = purchase.get("checkout_request_id")
+
+    if checkout_request_id:
+        limiter.wait()
+        try:
+            result = client.stk_query(checkout_request_id)
+        except Exception as e:
+            print(f"  {doc.id}: query failed ({e})")
+            return "error"
+    else:
+        result = {"status": None, "result_code": None, "result_desc": "No CheckoutRequestID"}
+
+    status = result["status"]
+    if status in (STATUS_COMPLETED, STATUS_FAILED):
+        result_code, result_desc = result["result_code"], result["result_desc"]
+    elif (purchase.get("purchase_date") or "") < give_up_before:
+        status = "expired"
+        result_code, result_desc = None, f"No M-Pesa confirmation ({result['result_desc']})"
+    else:
+        return "still_pending"
+
+    if dry_run:
+        print(f"  would settle {doc.id} as {status} (code={result_code}, {result_desc})")
+        return status
+    outcome = settle_purchase(doc, result_code, result_desc=result_desc, source=SOURCE_RECONCILER)
+    print(f"  {doc.id}: {outcome} (code={result_code}, {result_desc})")
+    return outcome if outcome != "failed" else status
+
+
+def reconcile(client: DarajaClient, min_age_minutes: int, give_up_hours: int, concurrency: int,
+              rate: float, dry_run: bool) -> Counter:
+    now = datetime.utcnow()
+    cutoff = (now - timedelta(minutes=min_age_minutes)).isoformat()
+    give_up_before = (now - timedelta(hours=give_up_hours)).isoformat()
+    print(f"=== Reconciling pending purchases created before {cutoff} ===")
+
+    stats = Counter()
+    limiter = RateLimiter(rate)
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for page in iter_stale_pending(cutoff):
+            outcomes = pool.map(lambda doc: reconcile_one(doc, client, limiter, give_up_before, dry_run), page)
+            stats.update(outcomes)
+            stats["checked"] += len(page)
+
+    elapsed = time.monotonic() - started
+    print(f"Done in {elapsed:.1f}s: {dict(stats)}")
+    return stats
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--dry-run", action="store_true", help="Query Daraja but do not settle anything")
+    parser.add_argument("--min-age-minutes", type=int, default=DEFAULT_MIN_AGE_MINUTES,
+                        help="Only look at purchases pending longer than this (default: %(default)s)")
+    parser.add_argument("--give-up-hours", type=int, default=DEFAULT_GIVE_UP_HOURS,
+                        help="Fail purchases still unconfirmed after this long (default: %(default)s)")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY)
+    parser.add_argument("--rate", type=float, default=DEFAULT_RATE, help="Max Daraja queries per second")
+    parser.add_argument("--daraja-url", default=DARAJA_BASE_URL, help="Daraja base URL (default: %(default)s)")
+    parser.add_argument("--loop", type=int, metavar="SECONDS",
+                        help="Keep running, starting a new pass every SECONDS")
+    args = parser.parse_args()
+
+    client = DarajaClient(base_url=args.daraja_url)
+    while True:
+        reconcile(client, args.min_age_minutes, args.give_up_hours, args.concurrency, args.rate, args.dry_run)
+        if not args.loop:
+            break
+        time.sleep(args.loop)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+Minimal local stand-in for the Daraja API, for exercising the payment flow
+and the reconciler without Safaricom.
+
+Implements the three endpoints the backend calls:
+    GET  /oauth/v1/generate               -> a fixed access token
+    POST /mpesa/stkpush/v1/processrequest -> a new CheckoutRequestID
+    POST /mpesa/stkpushquery/v1/query     -> the configured outcome
+
+The outcome of a query is looked up by CheckoutRequestID, falling back to
+--default-result. An outcome is a ResultCode (0 = paid, 1032 = cancelled,
+...) or "processing". Outcomes can be set at runtime:
+    POST /stub/outcomes {"ws_CO_123": 0, "ws_CO_456": "processing"}
+
+Usage:
+    python scripts/stub_daraja.py --port 8089 --default-result 0 --latency-ms 200
+    DARAJA_BASE_URL=http://127.0.0.1:8089 python run.py
+    python scripts/reconcile_pending_payments.py --daraja-url http://127.0.0.1:8089
+"""
+import argparse
+import json
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+RESULT_DESCRIPTIONS = {
+    0: "The service request is processed successfully.",
+    1: "The balance is insufficient for the transaction.",
+    1032: "Request cancelled by user",
+    1037: "DS timeout user cannot be reached",
+}
+
+
+class StubState:
+    def __init__(self, default_result, latency_ms: int):
+        self.default_result = default_result
+        self.latency = latency_ms / 1000.0
+        self.outcomes = {}
+        self.queries = 0
+        self.lock = threading.Lock()
+
+    def outcome_for(self, checkout_request_id: str):
+        with self.lock:
+            self.queries += 1
+            return self.outcomes.get(checkout_request_id, self.default_result)
+
+
+def make_handler(state: StubState):
+    class Handler(BaseHTTPRequestHandler):
+        def _send(self, status: int, body: dict) -> None:
+            payload = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def _body(self) -> dict:
+            length = int(self.headers.get("Content-Length") or 0)
+            return json.loads(self.rfile.read(length) or b"{}")
+
+        def do_GET(self):
+            time.sleep(state.latency)
+            if self.path.startswith("/oauth/v1/generate"):
+                self._send(200, {"access_token": "stub-token", "expires_in": "3599"})
+            elif self.path == "/stub/stats":
+                self._send(200, {"queries": state.queries, "outcomes": state.outcomes})
+            else:
+                self._send(404, {"errorMessage": "Not found"})
+
+        def do_POST(self):
+            time.sleep(state.latency)
+            body = self._body()
+            if self.path == "/mpesa/stkpush/v1/processrequest":
+                self._send(200, {
+                    "MerchantRequestID": f"stub-{uuid.uuid4().hex[:10]}",
+                    "CheckoutRequestID": f"ws_CO_{uuid.uuid4().hex}",
+                    "ResponseCode": "0",
+                    "ResponseDescription": "Success. Request accepted for processing",
+                    "CustomerMessage": "Success. Request accepted for processing",
+                })
+            elif self.path == "/mpesa/stkpushquery/v1/query":
+                checkout_request_id = body.get("CheckoutRequestID")
+                outcome = state.outcome_for(checkout_request_id)
+                if outcome == "processing":
+                    self._send(500, {
+                        "requestId": uuid.uuid4().hex,
+                        "errorCode": "500.001.1001",
+                        "errorMessage": "The transaction is being processed",
+                    })
+                    return
+                code = int(outcome)
+                self._send(200, {
+                    "ResponseCode": "0",
+                    "ResponseDescription": "The service request has been accepted successsfully",
+                    "MerchantRequestID": f"stub-{uuid.uuid4().hex[:10]}",
+                    "CheckoutRequestID": checkout_request_id,
+                    "ResultCode": str(code),
+                    "ResultDesc": RESULT_DESCRIPTIONS.get(code, "Transaction failed"),
+                })
+            elif self.path == "/stub/outcomes":
+                with state.lock:
+                    state.outcomes.update(body)
+                self._send(200, {"outcomes": state.outcomes})
+            else:
+                self._send(404, {"errorMessage": "Not found"})
+
+        def log_message(self, format, *args):
+            print(f"stub_daraja: {self.command} {self.path}")
+
+    return Handler
+
+
+def parse_outcome(value: str):
+    return value if value == "processing" else int(value)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--default-result", type=parse_outcome, default=0,
+                        help='ResultCode or "processing" for unknown CheckoutRequestIDs (default: %(default)s)')
+    parser.add_argument("--latency-ms", type=int, default=0, help="Delay added to every response")
+    args = parser.parse_args()
+
+    state = StubState(args.default_result, args.latency_ms)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(state))
+    print(f"Stub Daraja listening on http://{args.host}:{args.port} (default result {args.default_result})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+"""
+Close job postings whose application deadline has passed and archive old
+closed jobs (with their applications) out of the hot collections.
+
+Phase 1 (close): active jobs with `application_deadline` before today get
+    status 'closed', `closed_at` and `closed_reason: 'deadline'`. Jobs saved
+    with a blank deadline never expire.
+Phase 2 (archive): closed jobs whose `closed_at` is older than the retention
+    window are copied to `job_postings_archive`, their applications to
+    `job_applications_archive`, and the originals are deleted. Closed jobs
+    without `closed_at` (closed by their employer before update_job stamped
+    it) first get their `updated_at` as `closed_at`.
+
+Both phases walk an ordered query in pages and record the last processed
+document in a checkpoint file after every committed page, so an interrupted
+run resumes where it stopped. Every write is idempotent (archive copies use
+`set`), so re-processing a page after a crash is harmless.
+
+Meant to run on a schedule (e.g. a daily Railway cron):
+    python scripts/sweep_expired_jobs.py
+    python scripts/sweep_expired_jobs.py --dry-run
+    python scripts/sweep_expired_jobs.py --retention-days 30 --phase archive
+"""
+import argparse
+import json
+import os
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from app.firebase_init import db  # noqa: E402
+from app.utils.firestore_batch import MAX_BATCH_OPS, BatchWriter  # noqa: E402
+from app.utils.pagination import ASCENDING, DOCUMENT_ID  # noqa: E402
+
+PAGE_SIZE = 200
+DEFAULT_RETENTION_DAYS = int(os.environ.get("JOB_ARCHIVE_RETENTION_DAYS", 90))
+DEFAULT_CHECKPOINT = PROJECT_ROOT / "instance" / "job_sweeper_checkpoint.json"
+
+JOBS = "job_postings"
+APPLICATIONS = "job_applications"
+JOBS_ARCHIVE = "job_postings_archive"
+APPLICATIONS_ARCHIVE = "job_applications_archive"
+
+
+class Checkpoint:
+    """Last processed (sort value, doc id) per phase, persisted as JSON."""
+
+    def __init__(self, path: Path, enabled: bool = True):
+        self.path = path
+        self.enabled = enabled
+        self.state = {}
+        if enabled and path.exists():
+            self.state = json.loads(path.read_text())
+
+    def position(self, phase: str):
+        entry = self.state.get(phase)
+        return (entry["value"], entry["doc_id"]) if entry else None
+
+    def advance(self, phase: str, value, doc_id: str, stats: dict) -> None:
+        self.state[phase] = {
+            "value": value,
+            "doc_id": doc_id,
+            "stats": stats,
+            "updated_at": datetime.utcnow().isoformat(),
+        }
+        self._save()
+
+    def finish(self, phase: str) -> None:
+        self.state.pop(phase, None)
+        self._save()
+
+    def _save(self) -> None:
+        if not self.enabled:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(self.state, indent=2))
+        os.replace(tmp, self.path)
+
+
+def iter_pages(query, field: str, start=None):
+    """Yield lists of snapshots from `query` ordered by (field, id), resuming after `start`."""
+    query = query.order_by(field, direction=ASCENDING).order_by(DOCUMENT_ID, direction=ASCENDING)
+    cursor = start
+    while True:
+        page_query = query
+        if cursor:
+            page_query = page_query.start_after({field: cursor[0], DOCUMENT_ID: cursor[1]})
+        page = list(page_query.limit(PAGE_SIZE).stream())
+        if not page:
+            return
+        yield page
+        last = page[-1]
+        cursor = (last.to_dict().get(field), last.id)
+
+
+def close_expired(checkpoint: Checkpoint, dry_run: bool) -> dict:
+    today = datetime.utcnow().date().isoformat()
+    print(f"=== Closing active jobs with application_deadline before {today} ===")
+    stats = {"closed": 0}
+    # '' sorts before every date, so blank deadlines must be excluded explicitly
+    query = (db.collection(JOBS).where("status", "==", "active")
+             .where("application_deadline", ">", "").where("application_deadline", "<", today))
+
+    for page in iter_pages(query, "application_deadline", checkpoint.position("close")):
+        timestamp = datetime.utcnow().isoformat()
+        with BatchWriter(dry_run=dry_run) as writer:
+            for doc in page:
+                writer.update(doc.reference, {
+                    "status": "closed",
+                    "closed_at": timestamp,
+                    "closed_reason": "deadline",
+                    "updated_at": timestamp,
+                })
+                stats["closed"] += 1
+                if dry_run:
+                    print(f"  would close {doc.id} (deadline {doc.to_dict().get('application_deadline')})")
+        last = page[-1]
+        checkpoint.advance("close", last.to_dict().get("application_deadline"), last.id, stats)
+
+    checkpoint.finish("close")
+    print(f"Done closing: {stats}")
+    return stats
+
+
+def archive_job(doc, writer: BatchWriter, stats: dict, dry_run: bool) -> None:
+    job = doc.to_dict() or {}
+    archived_at = datetime.utcnow().isoformat()
+
+    # Applications first: if the run dies half way the job is still in the hot
+    # collection, so the next run picks it up and finishes moving the rest.
+    apps = list(db.collection(APPLICATIONS).where("job_id", "==", job.get("id") or doc.id).stream())
+    for app_doc in apps:
+        writer.group([
+            ("set", db.collection(APPLICATIONS_ARCHIVE).document(app_doc.id),
+             {**app_doc.to_dict(), "archived_at": archived_at}),
+            ("delete", app_doc.reference),
+        ])
+    writer.group([
+        ("set", db.collection(JOBS_ARCHIVE).document(doc.id), {**job, "archived_at": archived_at}),
+        ("delete", doc.reference),
+    ])
+    stats["jobs_archived"] += 1
+    stats["applications_archived"] += len(apps)
+    if dry_run:
+        print(f"  would archive {doc.id} with {len(apps)} applications")
+
+
+def stamp_closed_at(dry_run: bool) -> int:
+    """Give closed jobs that lack `closed_at` their last update time, so they can be archived."""
+    stamped = 0
+    query = db.collection(JOBS).where("status", "==", "closed").select(["closed_at", "updated_at", "created_at"])
+    with BatchWriter(dry_run=dry_run) as writer:
+        for doc in query.stream():
+            job = doc.to_dict() or {}
+            if job.get("closed_at"):
+                continue
+            closed_at = job.get("updated_at") or job.get("created_at") or datetime.utcnow().isoformat()
+            writer.update(doc.reference, {"closed_at": closed_at})
+            stamped += 1
+            if dry_run:
+                print(f"  would stamp {doc.id} closed_at={closed_at}")
+    return stamped
+
+
+def archive_closed(checkpoint: Checkpoint, retention_days: int, dry_run: bool) -> dict:
+    if not checkpoint.position("archive"):
+        print(f"Stamped closed_at on {stamp_closed_at(dry_run)} closed jobs")
+    cutoff = (datetime.utcnow() - timedelta(days=retention_days)).isoformat()
+    print(f"=== Archiving jobs closed before {cutoff} ({retention_days} day retention) ===")
+    stats = {"jobs_archived": 0, "applications_archived": 0}
+    query = db.collection(JOBS).where("status", "==", "closed").where("closed_at", "<", cutoff)
+
+    for page in iter_pages(query, "closed_at", checkpoint.position("archive")):
+        with BatchWriter(max_ops=MAX_BATCH_OPS, dry_run=dry_run) as writer:
+            for doc in page:
+                archive_job(doc, writer, stats, dry_run)
+        last = page[-1]
+        checkpoint.advance("archive", last.to_dict().get("closed_at"), last.id, stats)
+
+    checkpoint.finish("archive")
+    print(f"Done archiving: {stats}")
+    return stats
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--dry-run", action="store_true", help="Report what would change without writing")
+    parser.add_argument("--phase", choices=("all", "close", "archive"), default="all")
+    parser.add_argument("--retention-days", type=int, default=DEFAULT_RETENTION_DAYS,
+                        help="Archive jobs closed longer ago than this (default: %(default)s)")
+    parser.add_argument("--checkpoint", type=Path, default=DEFAULT_CHECKPOINT)
+    parser.add_argument("--restart", action="store_true", help="Ignore any saved checkpoint")
+    args = parser.parse_args()
+
+    if args.restart and args.checkpoint.exists() and not args.dry_run:
+        args.checkpoint.unlink()
+    # A dry run never persists progress, otherwise the real run would skip work
+    checkpoint = Checkpoint(args.checkpoint, enabled=not args.dry_run)
+    if checkpoint.state:
+        print(f"Resuming from checkpoint {args.checkpoint}: {checkpoint.state}")
+
+    if args.phase in ("all", "close"):
+        close_expired(checkpoint, args.dry_run)
+    if args.phase in ("all", "archive"):
+        archive_closed(checkpoint, args.retention_days, args.dry_run)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,100 +1,280 @@
 #!/usr/bin/env python3
 """
-Standalone Diagnostic & Repair Script for Profile Photos
-Synchronizes photos from specialized profile documents back to the core user records.
+Bulk repair of profile photos mirrored onto profile documents.
+
+Uploads keep `profile_photo_url` / `primary_photo_id` in sync as they happen
+(app/services/photo_primary.py); this backfills and repairs data written
+before that, or by hand. For every housegirl_profiles / employer_profiles
+doc, together with its users doc and profiles doc:
+
+- when the owner has a primary photo, every doc that shows no photo, or a
+  stale local photo URL, or lacks `primary_photo_id`, is pointed at it;
+- otherwise a photo found on one doc (role doc first, then users) is copied
+  onto the ones that have none.
+
+External avatars (URLs not served by /api/photos) are never overwritten.
+
+Profiles are read one page at a time, ordered by document id. Each page costs
+one `get_all` per 100 users / profiles and one primary-photo query per 30
+owners. Its writes go out in batches of up to 500 operations. Pages are
+processed by a small thread pool (--workers). The checkpoint records the last
+page finished in order, after all earlier pages, so an interrupted run
+resumes without skipping work. Every write is idempotent.
+
+Usage:
+    python sync_photos.py --dry-run
+    python sync_photos.py --workers 8
+    python sync_photos.py --collection employer_profiles --restart
 """
+import argparse
 import json
 import os
-import firebase_admin
-from firebase_admin import credentials, firestore
+import sys
+import time
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from pathlib import Path
+
+
+PROJECT_ROOT = Path(__file__).resolve().parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from app.firebase_init import db  # noqa: E402
+from app.services.photo_primary import PHOTOS, PHOTO_URL_FIELD, PRIMARY_ID_FIELD, ROLE_COLLECTIONS  # noqa: E402
+from app.utils.firestore_batch import BatchWriter, get_all_by_id  # noqa: E402
+from app.utils.pagination import ASCENDING, DOCUMENT_ID  # noqa: E402
+from app.utils.signed_urls import LOCAL_PREFIX  # noqa: E402
+
+PAGE_SIZE = 300
+IN_QUERY_LIMIT = 30
+DEFAULT_WORKERS = 4
+DEFAULT_CHECKPOINT = PROJECT_ROOT / "instance" / "photo_sync_checkpoint.json"
+
+ROLE_FIELDS = ["user_id", PHOTO_URL_FIELD, "photo_url", PRIMARY_ID_FIELD]
+
+
+class Checkpoint:
+    """Last document id finished in order per collection, persisted as JSON."""
+
+    def __init__(self, path: Path, enabled: bool = True):
+        self.path = path
+        self.enabled = enabled
+        self.state = {}
+        if enabled and path.exists():
+            self.state = json.loads(path.read_text())
+
+    def position(self, collection: str):
+        entry = self.state.get(collection)
+        return entry["doc_id"] if entry else None
+
+    def stats(self, collection: str) -> dict:
+        return (self.state.get(collection) or {}).get("stats", {})
+
+    def advance(self, collection: str, doc_id: str, stats: dict) -> None:
+        self.state[collection] = {
+            "doc_id": doc_id,
+            "stats": stats,
+            "updated_at": datetime.utcnow().isoformat(),
+        }
+        self._save()
+
+    def finish(self, collection: str) -> None:
+        self.state.pop(collection, None)
+        self._save()
+
+    def _save(self) -> None:
+        if not self.enabled:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(self.state, indent=2))
+        os.replace(tmp, self.path)
+
+
+def iter_pages(collection: str, after: str = None, page_size: int = PAGE_SIZE):
+    """Yield lists of role-doc snapshots ordered by id, resuming after `after`."""
+    query = (db.collection(collection)
+             .select(ROLE_FIELDS)
+             .order_by(DOCUMENT_ID, direction=ASCENDING)
+             .limit(page_size))
+    while True:
+        page_query = query.start_after({DOCUMENT_ID: after}) if after else query
+        page = list(page_query.stream())
+        if not page:
+            return
+        yield page
+        after = page[-1].id
+
+
+def primary_photos(user_ids) -> dict:
+    """{owner_user_id: [primary photo dicts]} in one query per IN_QUERY_LIMIT owners."""
+    ids = list(dict.fromkeys(user_id for user_id in user_ids if user_id))
+    found = {}
+    for start in range(0, len(ids), IN_QUERY_LIMIT):
+        query = (db.collection(PHOTOS)
+                 .where("owner_user_id", "in", ids[start:start + IN_QUERY_LIMIT])
+                 .where("is_primary", "==", True)
+                 .select(["owner_user_id", "profile_id", "photo_url"]))
+        for snapshot in query.stream():
+            photo = {**(snapshot.to_dict() or {}), "id": snapshot.id}
+            found.setdefault(photo.get("owner_user_id"), []).append(photo)
+    return found
+
 
-def initialize_firebase():
-    # Try to find service account in environment or local file
-    firebase_env = os.environ.get('FIREBASE_SERVICE_ACCOUNT', '').strip()
-    
-    if firebase_env:
-        try:
-            cred_dict = json.loads(firebase_env)
-        except:
-            start = firebase_env.find('{')
-            end = firebase_env.rfind('}') + 1
-            cred_dict = json.loads(firebase_env[start:end])
-        cred = credentials.Certificate(cred_dict)
+def shown_url(data: dict) -> str:
+    return (data.get(PHOTO_URL_FIELD) or "").split("?", 1)[0]
+
+
+def is_external(url: str) -> bool:
+    return bool(url) and not url.startswith(LOCAL_PREFIX)
+
+
+def plan_updates(docs: list, primary: dict, stats: Counter) -> list:
+    """(path, ref, data, updates) for the docs of one profile that need a write."""
+    planned = []
+    if primary:
+        for path, ref, data in docs:
+            shown = shown_url(data)
+            if is_external(shown) and shown != primary.get("photo_url"):
+                stats["external_kept"] += 1
+                continue
+            if shown == primary.get("photo_url") and data.get(PRIMARY_ID_FIELD) == primary["id"]:
+                continue
+            planned.append((path, ref, data, {
+                PHOTO_URL_FIELD: primary.get("photo_url"),
+                PRIMARY_ID_FIELD: primary["id"],
+            }))
+        return planned
+
+    fallback = next((data.get(PHOTO_URL_FIELD) or data.get("photo_url")
+                     for _, _, data in docs if data.get(PHOTO_URL_FIELD) or data.get("photo_url")), None)
+    if not fallback:
+        stats["no_photo"] += 1
+        return planned
+    for path, ref, data in docs:
+        if not data.get(PHOTO_URL_FIELD):
+            planned.append((path, ref, data, {PHOTO_URL_FIELD: fallback}))
+    return planned
+
+
+def sync_page(collection: str, page: list, dry_run: bool):
+    """Repair one page of role docs; returns (stats, diff lines)."""
+    stats = Counter(scanned=len(page))
+    owners = {snapshot.id: (snapshot.to_dict() or {}).get("user_id") or snapshot.id for snapshot in page}
+    users = get_all_by_id("users", owners.values())
+    profiles = get_all_by_id("profiles", owners)
+    photos = primary_photos(owners.values())
+    stats["lookups"] += len(set(owners.values())) + len(owners)
+
+    diffs = []
+    with BatchWriter(dry_run=dry_run) as writer:
+        for snapshot in page:
+            user_id = owners[snapshot.id]
+            docs = [(f"{collection}/{snapshot.id}", snapshot.reference, snapshot.to_dict() or {})]
+            if user_id in users:
+                docs.append((f"users/{user_id}", db.collection("users").document(user_id), users[user_id]))
+            else:
+                stats["users_missing"] += 1
+            if snapshot.id in profiles:
+                docs.append((f"profiles/{snapshot.id}", db.collection("profiles").document(snapshot.id),
+                             profiles[snapshot.id]))
+
+            candidates = photos.get(user_id, [])
+            # Prefer the primary of this very profile when the owner has several
+            primary = next((photo for photo in candidates if photo.get("profile_id") in (snapshot.id, user_id)),
+                           candidates[0] if candidates else None)
+            if primary:
+                stats["with_primary"] += 1
+
+            timestamp = datetime.utcnow().isoformat()
+            for path, ref, data, updates in plan_updates(docs, primary, stats):
+                for field, value in updates.items():
+                    diffs.append(f"  {path}: {field} {data.get(field)!r} -> {value!r}")
+                writer.update(ref, {**updates, "updated_at": timestamp})
+                stats[f"updated_{path.split('/', 1)[0]}"] += 1
+    stats["writes"] += writer.committed_ops
+    stats["commits"] += writer.commits
+    return stats, diffs
+
+
+def sync_collection(collection: str, pool, checkpoint: Checkpoint, args) -> Counter:
+    print(f"=== Syncing {collection} ===")
+    total = Counter(checkpoint.stats(collection))
+    run_stats = Counter()
+    in_flight = deque()
+
+    def drain(limit: int) -> None:
+        # Results are taken in page order so the checkpoint never passes a page still running
+        while in_flight and (len(in_flight) > limit or in_flight[0][1].done()):
+            last_id, future = in_flight.popleft()
+            stats, diffs = future.result()
+            if args.dry_run or args.verbose:
+                for line in diffs:
+                    print(line)
+            run_stats.update(stats)
+            total.update(stats)
+            checkpoint.advance(collection, last_id, dict(total))
+
+    for page in iter_pages(collection, checkpoint.position(collection), args.page_size):
+        in_flight.append((page[-1].id, pool.submit(sync_page, collection, page, args.dry_run)))
+        drain(args.workers * 2)
+    drain(0)
+
+    checkpoint.finish(collection)
+    print(f"Done {collection}: {dict(total)}")
+    return run_stats
+
+
+def report(stats: Counter, elapsed: float, dry_run: bool) -> None:
+    updated = sum(count for key, count in stats.items() if key.startswith("updated_"))
+    rate = stats["scanned"] / elapsed if elapsed else 0
+    print(f"Scanned {stats['scanned']} profiles in {elapsed:.1f}s ({rate:.0f} profiles/s); "
+          f"{stats['with_primary']} with a primary photo, {stats['no_photo']} without any photo, "
+          f"{stats['users_missing']} without a users doc")
+    print(f"{'Would update' if dry_run else 'Updated'} {updated} docs "
+          f"(users {stats['updated_users']}, profiles {stats['updated_profiles']}, "
+          f"role docs {sum(stats[f'updated_{name}'] for name in ROLE_COLLECTIONS)}); "
+          f"external avatars kept: {stats['external_kept']}")
+    if dry_run:
+        throughput = "dry run, nothing committed"
     else:
-        # Assumes being run from backend/ directory
-        cred_path = 'firebase-service-account.json'
-        if not os.path.exists(cred_path):
-            cred_path = os.path.join('app', 'firebase-service-account.json')
-        
-        if not os.path.exists(cred_path):
-            print(f"Error: Service account not found at {cred_path}")
-            return None
-        cred = credentials.Certificate(cred_path)
-    
-    firebase_admin.initialize_app(cred)
-    return firestore.client()
-
-def sync_photos():
-    db = initialize_firebase()
-    if not db:
-        return
-
-    print("Starting photo synchronization...")
-    
-    # 1. Sync Housegirls
-    housegirls = db.collection('housegirl_profiles').stream()
-    hg_count = 0
-    hg_synced = 0
-    
-    for hg in housegirls:
-        hg_count += 1
-        data = hg.to_dict()
-        photo = data.get('profile_photo_url') or data.get('photo_url')
-        user_id = data.get('user_id') or hg.id
-        
-        if photo and user_id:
-            user_ref = db.collection('users').document(user_id)
-            user_doc = user_ref.get()
-            
-            if user_doc.exists:
-                user_data = user_doc.to_dict()
-                if not user_data.get('profile_photo_url'):
-                    user_ref.update({
-                        'profile_photo_url': photo,
-                        'updated_at': datetime.utcnow().isoformat()
-                    })
-                    hg_synced += 1
-                    print(f"Synced photo for Housegirl: {user_id}")
-    
-    # 2. Sync Employers
-    employers = db.collection('employer_profiles').stream()
-    emp_count = 0
-    emp_synced = 0
-    
-    for emp in employers:
-        emp_count += 1
-        data = emp.to_dict()
-        photo = data.get('profile_photo_url') or data.get('photo_url')
-        user_id = data.get('user_id') or emp.id
-        
-        if photo and user_id:
-            user_ref = db.collection('users').document(user_id)
-            user_doc = user_ref.get()
-            
-            if user_doc.exists:
-                user_data = user_doc.to_dict()
-                if not user_data.get('profile_photo_url'):
-                    user_ref.update({
-                        'profile_photo_url': photo,
-                        'updated_at': datetime.utcnow().isoformat()
-                    })
-                    emp_synced += 1
-                    print(f"Synced photo for Employer: {user_id}")
-                    
-    print("\nSync Complete!")
-    print(f"Housegirls: {hg_count} checked, {hg_synced} updated.")
-    print(f"Employers: {emp_count} checked, {emp_synced} updated.")
+        throughput = f"{stats['writes'] / elapsed if elapsed else 0:.0f} writes/s"
+    print(f"Reads: {stats['lookups']} docs looked up; writes: {stats['writes']} in {stats['commits']} batches "
+          f"({throughput})")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--dry-run", action="store_true", help="Print the changes without writing")
+    parser.add_argument("--verbose", action="store_true", help="Print every change on a real run too")
+    parser.add_argument("--collection", choices=ROLE_COLLECTIONS, help="Sync only this collection")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                        help="Pages processed in parallel (default: %(default)s)")
+    parser.add_argument("--page-size", type=int, default=PAGE_SIZE,
+                        help="Profiles per page (default: %(default)s)")
+    parser.add_argument("--checkpoint", type=Path, default=DEFAULT_CHECKPOINT)
+    parser.add_argument("--restart", action="store_true", help="Ignore any saved checkpoint")
+    args = parser.parse_args()
+    args.workers = max(1, args.workers)
+
+    if args.restart and args.checkpoint.exists() and not args.dry_run:
+        args.checkpoint.unlink()
+    # A dry run never persists progress, otherwise the real run would skip work
+    checkpoint = Checkpoint(args.checkpoint, enabled=not args.dry_run)
+    if checkpoint.state:
+        print(f"Resuming from checkpoint {args.checkpoint}: "
+              f"{ {name: entry['doc_id'] for name, entry in checkpoint.state.items()} }")
+
+    started = time.monotonic()
+    stats = Counter()
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        for collection in ROLE_COLLECTIONS:
+            if not args.collection or collection == args.collection:
+                stats += sync_collection(collection, pool, checkpoint, args)
+    report(stats, time.monotonic() - started, args.dry_run)
+
 
 if __name__ == "__main__":
-    sync_photos()
+    main()